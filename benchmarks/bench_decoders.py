@@ -0,0 +1,111 @@
+"""Compares the JSON decoders on the busiest commands of a pcap.
+
+    python benchmarks/generate_traffic.py --out farm.pcap
+    python benchmarks/bench_decoders.py farm.pcap --out decoders.json
+
+"dict" is the old path, json.loads and a GameEvent around the "o" dict,
+"+typed" rows are a decoder plus the typed struct built from its dict, and
+"msgspec+struct" decodes each command straight into its struct.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.backends import PcapFileBackend  # noqa: E402
+from src.decoders import DECODERS, TYPED_COMMANDS, get_decoder, get_typed_decoders  # noqa: E402
+from src.framing import FrameExtractor  # noqa: E402
+from src.packet_capture import _OBJ_CMD_PATTERN, _PACKET_TYPES, GameEvent  # noqa: E402
+from src.reassembly import TCPStreamReassembler  # noqa: E402
+
+
+def load_frames(path: str) -> Dict[str, List[bytes]]:
+    """Frames of the typed commands, by command."""
+    reassembler = TCPStreamReassembler()
+    framers: Dict[Any, FrameExtractor] = {}
+    frames: Dict[str, List[bytes]] = defaultdict(list)
+    for record in PcapFileBackend(path).records():
+        key = (record.src, record.sport, record.dst, record.dport)
+        data = reassembler.feed(key, record.seq, record.payload)
+        if not data:
+            continue
+        for frame in framers.setdefault(key, FrameExtractor()).feed(data):
+            match = _OBJ_CMD_PATTERN.search(frame)
+            if frame[:1] == b"{" and match is not None:
+                cmd = match.group(1).decode()
+                if cmd in TYPED_COMMANDS:
+                    frames[cmd].append(frame)
+    return frames
+
+
+def dict_path(loads: Callable[[bytes], Any]) -> Callable[[bytes], Any]:
+    def decode(frame: bytes) -> Any:
+        obj = loads(frame).get("b", {}).get("o", {})
+        cmd = obj.get("cmd", "unknown")
+        return GameEvent(type=_PACKET_TYPES[cmd], data=obj, timestamp=time.time(), cmd=cmd)
+
+    return decode
+
+
+def typed_path(loads: Callable[[bytes], Any]) -> Callable[[bytes], Any]:
+    def decode(frame: bytes) -> Any:
+        obj = loads(frame).get("b", {}).get("o", {})
+        return TYPED_COMMANDS[obj.get("cmd", "unknown")](obj)
+
+    return decode
+
+
+def struct_path(typed: Dict[str, Callable[[bytes], Any]]) -> Callable[[bytes], Any]:
+    def decode(frame: bytes) -> Any:
+        return typed[_OBJ_CMD_PATTERN.search(frame).group(1).decode()](frame)
+
+    return decode
+
+
+def best_of(decode: Callable[[bytes], Any], frames: List[bytes], repeat: int) -> float:
+    """Fastest mean microseconds per frame over repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for frame in frames:
+            decode(frame)
+        best = min(best, time.perf_counter() - start)
+    return best / len(frames) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON decoders")
+    parser.add_argument("pcap")
+    parser.add_argument("--out", default="bench_decoders.json", help="where to write the JSON results")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per decoder, the best is kept")
+    args = parser.parse_args()
+
+    frames = load_frames(args.pcap)
+    paths = {"dict": dict_path(get_decoder("json")[1])}
+    for name in DECODERS:
+        try:
+            paths[f"{name}+typed"] = typed_path(get_decoder(name)[1])
+        except ValueError:
+            print(f"{name} is not installed, skipped")
+    typed = get_typed_decoders(get_decoder()[0])
+    if typed:
+        paths["msgspec+struct"] = struct_path(typed)
+
+    results: Dict[str, Dict[str, float]] = {}
+    for cmd, cmd_frames in frames.items():
+        results[cmd] = {name: best_of(decode, cmd_frames, args.repeat) for name, decode in paths.items()}
+        timings = "  ".join(f"{name} {us:7.2f}us" for name, us in results[cmd].items())
+        print(f"{cmd:12} {len(cmd_frames):7} frames  {timings}")
+
+    with open(args.out, "w") as f:
+        json.dump({"pcap": os.path.abspath(args.pcap), "frames": {cmd: len(cmd_frames) for cmd, cmd_frames in frames.items()}, "mean_us": results}, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
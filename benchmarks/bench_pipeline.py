@@ -0,0 +1,294 @@
+"""Measures throughput and per-stage latency of the capture pipeline on a pcap.
+
+    python benchmarks/generate_traffic.py --out farm.pcap
+    python benchmarks/bench_pipeline.py farm.pcap --out results.json
+
+Results are written as JSON so two runs can be diffed or compared with
+compare_results().
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import toml  # noqa: E402
+
+from src import ClassSkillsPage, DropsPage, PacketCapture  # noqa: E402
+from src.backends import PacketRecord, PcapFileBackend  # noqa: E402
+from src.config import load_config  # noqa: E402
+from src.framing import FrameExtractor  # noqa: E402
+from src.reassembly import TCPStreamReassembler  # noqa: E402
+
+# Nothing that writes to disk in the background, it would run during the timed
+# sections and leave files behind
+OVERRIDES = {
+    "capture": {"independent_instancing": False, "process": False},
+    "store": {"enabled": False},
+    "class_cache": {"enabled": False},
+    "servers": {"path": os.path.join(ROOT, "servers.json"), "resolve": False},
+}
+
+
+def use_bench_config(directory: str):
+    """Point load_config() at a copy of config.toml with OVERRIDES applied, inside directory."""
+    conf = toml.load(os.path.join(ROOT, "config.toml"))
+    for section, values in OVERRIDES.items():
+        conf.setdefault(section, {}).update(values)
+    with open(os.path.join(directory, "config.toml"), "w") as f:
+        toml.dump(conf, f)
+    # Pages and PacketCapture read ./config.toml, relative output paths land here too
+    os.chdir(directory)
+    load_config.cache_clear()
+
+
+def extract_json_objects(data: str) -> tuple[list[str], str]:
+    """The string scanner PacketCapture used before frames were split on NUL, kept for comparison."""
+    objects = []
+    depth = 0
+    start = 0
+    in_string = False
+    escaped = False
+
+    for i, char in enumerate(data):
+        if char == '"' and not escaped:
+            in_string = not in_string
+
+        if in_string:
+            if char == "\\" and not escaped:
+                escaped = True
+            else:
+                escaped = False
+            continue
+
+        if char == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                objects.append(data[start : i + 1])
+                start = i + 1
+
+    return objects, data[start:]
+
+
+class NullWindow:
+    """Stands in for a curses window so pages can be built without a terminal."""
+
+    def getmaxyx(self):
+        return (60, 200)
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples: List[int] = []
+
+    def time(self, fn: Callable, *args):
+        start = time.perf_counter_ns()
+        result = fn(*args)
+        self.samples.append(time.perf_counter_ns() - start)
+        return result
+
+    def wrap(self, fn: Callable) -> Callable:
+        def timed(*args):
+            return self.time(fn, *args)
+
+        return timed
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.samples:
+            return {"calls": 0}
+        ordered = sorted(self.samples)
+        total = sum(ordered)
+
+        def pct(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(len(ordered) * p))] / 1000
+
+        return {
+            "calls": len(ordered),
+            "total_ms": total / 1e6,
+            "mean_us": total / len(ordered) / 1000,
+            "p50_us": pct(0.5),
+            "p99_us": pct(0.99),
+            "max_us": ordered[-1] / 1000,
+        }
+
+
+def load_packets(path: str) -> List[PacketRecord]:
+    return list(PcapFileBackend(path).records())
+
+
+def new_capture() -> PacketCapture:
+    capture = PacketCapture()
+    # Replay traffic is not tied to a selected server
+    capture.selected_server = None
+    return capture
+
+
+def bench_stages(packets: List[PacketRecord]) -> Dict[str, Dict[str, Any]]:
+    stages: Dict[str, StageTimer] = {}
+
+    def stage(name: str) -> StageTimer:
+        return stages.setdefault(name, StageTimer())
+
+    capture = new_capture()
+    try:
+        window = NullWindow()
+        drops_page = DropsPage(window, capture)
+        ClassSkillsPage(window, capture)
+        # Kills and drops reach the trackers through these, not through callbacks
+        for cmd, handler in capture.handlers.items():
+            capture.handlers[cmd] = stage(f"PacketCapture.{handler.__name__}").wrap(handler)
+        for packet_type, callbacks in capture.callbacks.items():
+            capture.callbacks[packet_type] = [
+                stage(f"{type(cb.__self__).__name__}.{cb.__name__}").wrap(cb) for cb in callbacks
+            ]
+
+        callback = stage("_packet_callback")
+        for packet in packets:
+            callback.time(capture._packet_callback, packet)
+        accepted = []
+        while not capture.packet_queue.empty():
+            accepted.append(capture.packet_queue.get())
+
+        # Same reassembled stream through the old string scanner and the framer
+        reassembler = TCPStreamReassembler()
+        streams = []
+        for record in accepted:
+            key = (record.src, record.sport, record.dst, record.dport)
+            data = stage("reassembly").time(reassembler.feed, key, record.seq, record.payload)
+            if data:
+                streams.append((key, data))
+
+        legacy_buffers: Dict[Any, str] = {}
+        for key, data in streams:
+            text = legacy_buffers.get(key, "") + data.replace(b"\x00", b"").decode("utf-8", errors="ignore")
+            _, legacy_buffers[key] = stage("extract_json_objects").time(extract_json_objects, text)
+
+        framers: Dict[Any, FrameExtractor] = {}
+        frames = []
+        for key, data in streams:
+            framer = framers.setdefault(key, FrameExtractor())
+            frames.extend(stage("frame_extractor").time(framer.feed, data))
+
+        decoded = []
+        for frame in frames:
+            if frame[:1] == b"{":
+                decoded.append(stage("json_decode").time(capture.loads, frame))
+
+        # DropsPage has no callbacks since tracking moved into the capture, what
+        # it does per redraw is update_boxes, timed after every frame that changed
+        # the trackers
+        update_boxes = stage("DropsPage.update_boxes")
+        for data in decoded:
+            event = stage("parse_data").time(capture.parse_data, data)
+            capture._notify_callbacks(event)
+            if data.get("b", {}).get("o", {}).get("cmd") in capture.handlers:
+                update_boxes.time(drops_page.update_boxes)
+    finally:
+        capture.stop()
+
+    return {name: timer.summary() for name, timer in stages.items()}
+
+
+def bench_end_to_end(packets: List[PacketRecord]) -> Dict[str, Any]:
+    capture = new_capture()
+    try:
+        window = NullWindow()
+        DropsPage(window, capture)
+        ClassSkillsPage(window, capture)
+
+        start = time.perf_counter()
+        for packet in packets:
+            capture._packet_callback(packet)
+            while not capture.packet_queue.empty():
+                capture._process_packet(capture.packet_queue.get())
+        elapsed = time.perf_counter() - start
+    finally:
+        capture.stop()
+    frames = sum(capture.command_counts.values())
+
+    return {
+        "packets": len(packets),
+        "frames": frames,
+        "seconds": elapsed,
+        "packets_per_second": len(packets) / elapsed if elapsed else 0.0,
+        "frames_per_second": frames / elapsed if elapsed else 0.0,
+        "decoded": dict(capture.decoded_counts),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, float]:
+    """Ratio of new/old mean latency per stage, below 1 means faster."""
+    ratios = {}
+    for name, stats in new["stages"].items():
+        before = old["stages"].get(name, {}).get("mean_us")
+        if before and stats.get("mean_us"):
+            ratios[name] = stats["mean_us"] / before
+    return ratios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the packet pipeline")
+    parser.add_argument("pcap")
+    parser.add_argument("--out", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--repeat", type=int, default=3, help="end to end runs, the best is kept")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="print latency ratios against an earlier run")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out)
+    compare = os.path.abspath(args.compare) if args.compare else None
+    packets = load_packets(args.pcap)
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        use_bench_config(directory)
+        try:
+            runs = [bench_end_to_end(packets) for _ in range(args.repeat)]
+            results = {
+                "pcap": os.path.abspath(os.path.join(cwd, args.pcap)),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "timestamp": time.time(),
+                "end_to_end": max(runs, key=lambda run: run["packets_per_second"]),
+                "stages": bench_stages(packets),
+            }
+        finally:
+            os.chdir(cwd)
+
+    with open(out, "w") as f:
+        json.dump(results, f, indent=4)
+
+    e2e = results["end_to_end"]
+    print(f"{e2e['packets_per_second']:.0f} packets/s, {e2e['frames_per_second']:.0f} frames/s")
+    for name, stats in results["stages"].items():
+        if stats["calls"]:
+            print(f"  {name:40} {stats['calls']:8} calls  mean {stats['mean_us']:9.2f}us  p99 {stats['p99_us']:9.2f}us")
+
+    if compare:
+        with open(compare) as f:
+            old = json.load(f)
+        for name, ratio in compare_results(old, results).items():
+            print(f"  {name:40} x{ratio:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Measures how long the TUI takes to appear and what importing it costs.
+
+    python benchmarks/bench_startup.py --replay farm.pcap --out startup.json
+    python benchmarks/bench_startup.py --replay farm.pcap --compare startup.json
+
+Time to first frame runs main.py under a pseudo terminal and waits for the
+first page's title to be drawn, then presses Enter and waits for the
+Resource Monitor. Without --replay the first frame is the server list, the
+first server is picked before timing the Resource Monitor.
+Import costs come from python -X importtime.
+"""
+import argparse
+import fcntl
+import json
+import os
+import platform
+import pty
+import select
+import struct
+import subprocess
+import sys
+import termios
+import time
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules worth tracking even when they're not the slowest
+WATCHED = ["main", "src", "src.packet_capture", "src.pages", "src.backends", "toml", "numpy", "scapy", "scapy.all"]
+
+
+def import_costs() -> Dict[str, int]:
+    """Cumulative import time in microseconds per module for `import main`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    costs = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        costs[name.strip()] = int(cumulative)
+    return costs
+
+
+class Terminal:
+    """main.py running under a pty, output is accumulated as it arrives."""
+
+    def __init__(self, args: List[str], rows: int = 60, cols: int = 200):
+        self.started = time.perf_counter()
+        self.pid, self.fd = pty.fork()
+        if self.pid == 0:
+            os.chdir(ROOT)
+            os.environ["TERM"] = "xterm-256color"
+            os.execv(sys.executable, [sys.executable, "main.py", *args])
+        fcntl.ioctl(self.fd, termios.TIOCSWINSZ, struct.pack("HHHH", rows, cols, 0, 0))
+        self.output = b""
+
+    def wait_for(self, text: str, timeout: float) -> Optional[float]:
+        """Seconds since start until text was drawn, None on timeout."""
+        needle = text.encode()
+        deadline = time.perf_counter() + timeout
+        while needle not in self.output:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if ready:
+                try:
+                    self.output += os.read(self.fd, 65536)
+                except OSError:
+                    return None
+        return time.perf_counter() - self.started
+
+    def send(self, keys: bytes):
+        os.write(self.fd, keys)
+
+    def close(self):
+        try:
+            self.send(b"q")
+            self.wait_for("\x00never\x00", 1.0)
+        except OSError:
+            pass
+        try:
+            os.kill(self.pid, 9)
+        except ProcessLookupError:
+            pass
+        os.waitpid(self.pid, 0)
+        os.close(self.fd)
+
+
+def time_to_frames(replay: Optional[str], timeout: float) -> Dict[str, Optional[float]]:
+    args = ["--replay", os.path.abspath(replay)] if replay else []
+    first_title = "Current Class Data" if replay else "Select Server"
+    terminal = Terminal(args)
+    try:
+        first = terminal.wait_for(first_title, timeout)
+        monitor = None
+        ready = first is not None
+        if ready and not replay:
+            # Enter on the server list picks the highlighted server and opens Class Data
+            terminal.send(b"\n")
+            ready = terminal.wait_for("Current Class Data", timeout) is not None
+        if ready:
+            sent = time.perf_counter() - terminal.started
+            terminal.send(b"\n")
+            shown = terminal.wait_for("Resource Monitor", timeout)
+            if shown is not None:
+                monitor = shown - sent
+        return {"first_frame": first, "resource_monitor": monitor}
+    finally:
+        terminal.close()
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_results(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, float]:
+    """Ratio of new/old for each timing, below 1 means faster."""
+    ratios = {}
+    for section in ("frames", "imports"):
+        for name, value in new[section].items():
+            before = old.get(section, {}).get(name)
+            if before and value:
+                ratios[f"{section}.{name}"] = value / before
+    return ratios
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark startup time")
+    parser.add_argument("--replay", metavar="FILE", help="start main.py replaying this capture")
+    parser.add_argument("--out", default="bench_results_startup.json", help="where to write the JSON results")
+    parser.add_argument("--repeat", type=int, default=5, help="startups to time, the median is kept")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to print")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="print ratios against an earlier run")
+    args = parser.parse_args()
+
+    runs = [time_to_frames(args.replay, args.timeout) for _ in range(args.repeat)]
+    frames = {}
+    for name in ("first_frame", "resource_monitor"):
+        times = sorted(run[name] for run in runs if run[name] is not None)
+        frames[name] = times[len(times) // 2] if times else None
+
+    costs = import_costs()
+    imports = {name: costs[name] / 1_000_000 for name in WATCHED if name in costs}
+    results = {
+        "replay": os.path.abspath(args.replay) if args.replay else None,
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "frames": frames,
+        "imports": imports,
+        "slowest_imports": dict(sorted(costs.items(), key=lambda item: -item[1])[: args.top]),
+    }
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=4)
+
+    for name, seconds in frames.items():
+        print(f"  {name:40} {'timed out' if seconds is None else f'{seconds * 1000:9.1f}ms'}")
+    for name, seconds in imports.items():
+        print(f"  import {name:33} {seconds * 1000:9.1f}ms")
+    print("  slowest imports:")
+    for name, micros in results["slowest_imports"].items():
+        print(f"    {name:38} {micros / 1000:9.1f}ms")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        for name, ratio in compare_results(old, results).items():
+            print(f"  {name:40} x{ratio:.2f}")
+
+
+if __name__ == "__main__":
+    main()
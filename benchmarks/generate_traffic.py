@@ -0,0 +1,221 @@
+"""Writes a synthetic AQW session to a pcap file for replay and benchmarking.
+
+    python benchmarks/generate_traffic.py --out farm.pcap --kills 2000 --ct-per-kill 8
+"""
+import argparse
+import json
+import random
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List, Tuple
+
+SERVER_IP = "172.65.160.131"
+SERVER_PORT = 5588
+CLIENT_IP = "192.168.1.20"
+
+PCAP_GLOBAL_HEADER = struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)
+ETHERNET_HEADER = b"\x00\x11\x22\x33\x44\x55" + b"\x66\x77\x88\x99\xaa\xbb" + b"\x08\x00"
+
+ITEMS = [
+    ("Void Aura", 0.04),
+    ("Dark Spirit Orb", 0.5),
+    ("Blinding Light Fragment", 0.01),
+    ("Legion Token", 0.25),
+    ("Bone Dust", 0.6),
+    ("Unidentified 13", 0.002),
+]
+SKILL_NAMES = ["Auto Attack", "Soul Drain", "Shadow Strike", "Eclipse", "Doom"]
+STATS = ["STR", "INT", "DEX", "END", "WIS", "LCK", "tha", "tdo", "tcr", "tcm"]
+
+
+def xt(obj: Dict[str, Any]) -> bytes:
+    return json.dumps({"t": "xt", "b": {"r": -1, "o": obj}}, separators=(",", ":")).encode() + b"\x00"
+
+
+def aura(name: str, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "nam": name,
+        "t": "s",
+        "dur": rng.randint(3, 10),
+        "isNew": rng.random() < 0.5,
+        "e": [{"sta": rng.choice(STATS), "val": round(rng.uniform(0.05, 0.5), 2), "typ": "+"}],
+    }
+
+
+def skill_data(rng: random.Random) -> bytes:
+    active = [
+        {
+            "nam": name,
+            "ref": f"a{i + 1}" if i else "aa",
+            "damage": round(rng.uniform(0.5, 3.0), 2),
+            "dsrc": "AP2",
+            "cd": rng.choice([2000, 4000, 8000, 12000]),
+            "mp": rng.choice([0, 10, 20, 30]),
+            "tgt": "h",
+            "desc": "x" * 120,
+            "icon": "iwd1",
+        }
+        for i, name in enumerate(SKILL_NAMES)
+    ]
+    return xt({"cmd": "sAct", "actions": {"active": active, "passive": []}})
+
+
+def passives(rng: random.Random) -> bytes:
+    return xt({"cmd": "aura+p", "tInf": "p:1", "auras": [aura(f"Passive {i}", rng) for i in range(1, 3)]})
+
+
+def stat_update(rng: random.Random) -> bytes:
+    return xt({"cmd": "stu", "sta": {f"${s}": rng.randint(0, 500) for s in STATS}})
+
+
+def combat(rng: random.Random, crowd: int) -> bytes:
+    actions = []
+    for _ in range(rng.randint(1, 3 + crowd)):
+        if rng.random() < 0.5:
+            actions.append({"cmd": "aura+", "cInf": f"p:{rng.randint(1, 99999)}", "auras": [aura("Eclipse", rng)]})
+        else:
+            actions.append({"cmd": "aura-", "cInf": f"m:{rng.randint(1, 20)}", "aura": {"nam": "Eclipse"}})
+    players = {
+        f"Player{rng.randint(1, 9999)}": {"intHP": rng.randint(0, 4000), "intMP": rng.randint(0, 100)}
+        for _ in range(crowd)
+    }
+    monsters = {str(rng.randint(1, 20)): {"intHP": rng.randint(0, 20000)}}
+    return xt({"cmd": "ct", "a": actions, "p": players, "m": monsters, "sarsa": [{"cInf": "p:1", "a": []}]})
+
+
+def monster_death(rng: random.Random) -> bytes:
+    return xt(
+        {
+            "cmd": "addGoldExp",
+            "id": rng.randint(1, 20),
+            "typ": "m",
+            "intGold": rng.randint(50, 2500),
+            "intExp": rng.randint(100, 9000),
+            "iRep": rng.choice([0, 0, 250, 500]),
+        }
+    )
+
+
+def drop_item(rng: random.Random, name: str) -> bytes:
+    item_id = str(zlib.crc32(name.encode()) % 100000)
+    return xt({"cmd": "dropItem", "items": {item_id: {"ItemID": int(item_id), "sName": name, "iQty": rng.randint(1, 3)}}})
+
+
+def session_messages(args: argparse.Namespace, rng: random.Random) -> Iterator[Tuple[float, bytes]]:
+    t = 0.0
+    yield t, skill_data(rng)
+    yield t, passives(rng)
+    for _ in range(args.kills):
+        for _ in range(args.ct_per_kill):
+            t += rng.uniform(0.05, 0.3)
+            yield t, combat(rng, args.crowd)
+        if rng.random() < 0.2:
+            yield t, stat_update(rng)
+        t += rng.uniform(0.05, 0.2)
+        yield t, monster_death(rng)
+        for name, rate in ITEMS:
+            if rng.random() < rate:
+                yield t, drop_item(rng, name)
+        if rng.random() < 0.01:
+            yield t, skill_data(rng)
+
+
+def checksum(header: bytes) -> int:
+    total = sum(struct.unpack(f"!{len(header) // 2}H", header))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def ipv4(src: str, dst: str, payload_len: int, ident: int) -> bytes:
+    def pack(ip: str) -> bytes:
+        return bytes(int(p) for p in ip.split("."))
+
+    header = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 20 + payload_len, ident & 0xFFFF, 0x4000, 64, 6, 0, pack(src), pack(dst))
+    return header[:10] + struct.pack("!H", checksum(header)) + header[12:]
+
+
+def tcp(sport: int, dport: int, seq: int, flags: int) -> bytes:
+    return struct.pack("!HHIIBBHHH", sport, dport, seq & 0xFFFFFFFF, 1, 5 << 4, flags, 65535, 0, 0)
+
+
+def segment(args: argparse.Namespace, rng: random.Random, data: bytes) -> List[bytes]:
+    """Cut a burst of messages the way the server's TCP stack would."""
+    segments = []
+    pos = 0
+    while pos < len(data):
+        size = args.mss
+        if rng.random() < args.split:
+            size = rng.randint(1, args.mss)
+        segments.append(data[pos : pos + size])
+        pos += size
+    return segments
+
+
+def write_pcap(args: argparse.Namespace):
+    rng = random.Random(args.seed)
+    clients = [(CLIENT_IP, 50000 + i, rng.randint(0, 0xFFFFFFFF)) for i in range(args.clients)]
+    # Interleave the clients' sessions by timestamp
+    merged = sorted(
+        (t, client, msg)
+        for client in range(args.clients)
+        for t, msg in session_messages(args, random.Random(args.seed + client))
+    )
+
+    ident = 0
+    packets = 0
+    with open(args.out, "wb") as f:
+        f.write(PCAP_GLOBAL_HEADER)
+
+        def emit(ts: float, frame: bytes):
+            nonlocal packets
+            sec = int(args.start + ts)
+            usec = int(((args.start + ts) - sec) * 1_000_000)
+            f.write(struct.pack("<IIII", sec, usec, len(frame), len(frame)))
+            f.write(frame)
+            packets += 1
+
+        held = None
+        for t, client, message in merged:
+            ip, port, seq = clients[client]
+            for payload in segment(args, rng, message):
+                ident += 1
+                frame = ETHERNET_HEADER + ipv4(SERVER_IP, ip, 20 + len(payload), ident) + tcp(SERVER_PORT, port, seq, 0x18) + payload
+                seq += len(payload)
+
+                if held is None and rng.random() < args.reorder:
+                    # Let the next segment overtake this one on the wire
+                    held = (t, frame)
+                    continue
+                emit(t, frame)
+                if held is not None:
+                    emit(*held)
+                    held = None
+                if rng.random() < args.retransmit:
+                    emit(t, frame)
+            clients[client] = (ip, port, seq)
+
+        if held is not None:
+            emit(*held)
+
+    print(f"Wrote {packets} packets to {args.out}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate synthetic AQW traffic")
+    parser.add_argument("--out", default="synthetic.pcap")
+    parser.add_argument("--kills", type=int, default=1000)
+    parser.add_argument("--ct-per-kill", type=int, default=6, help="combat frames between kills")
+    parser.add_argument("--crowd", type=int, default=4, help="other players in the map, grows ct frames")
+    parser.add_argument("--clients", type=int, default=1, help="concurrent game connections")
+    parser.add_argument("--mss", type=int, default=1460)
+    parser.add_argument("--split", type=float, default=0.1, help="chance a segment is cut short")
+    parser.add_argument("--retransmit", type=float, default=0.01, help="chance a segment is sent twice")
+    parser.add_argument("--reorder", type=float, default=0.01, help="chance a segment overtakes the previous one")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start", type=float, default=1_700_000_000.0, help="timestamp of the first packet")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    write_pcap(parse_args())
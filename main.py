@@ -1,21 +1,46 @@
+import argparse
 import curses
+import os
+import selectors
+import sys
 import time
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Set
 import logging
 from src import PacketCapture, ServerSelectionPage, ClassSkillsPage, packet_capture
-from src import DropsPage
-import toml
+from src import DropsPage, PipelinePage
+from src.config import load_config
+from src.file_writer import BackgroundWriter, WriterHandler
+from src.headless import HeadlessReporter
 
 
 class GameMonitor:
-    def __init__(self):
+    def __init__(self, replay_file: Optional[str] = None, replay_speed: float = 1.0):
         self.packet_capture = PacketCapture()
+        # Pages are built the first time they're shown, see page()
+        self.page_factories = {
+            "server_selection": ServerSelectionPage,
+            "class_data": ClassSkillsPage,
+            "resource_monitor": DropsPage,
+            "pipeline": PipelinePage,
+        }
         self.pages = {}
-        self.page_order = ["class_data", "resource_monitor"]  
+        self.stdscr: Optional["curses.window"] = None
+        self.page_order = ["class_data", "resource_monitor", "pipeline"]  
         self.current_page_index = 0
+        self.replay_file = replay_file
+        self.replay_speed = replay_speed
 
-        conf = toml.load("./config.toml")
-        self.is_select = conf['drops'].get("select_server", False)
+        conf = load_config()
+        # Nothing to pick when the packets come from a file
+        self.is_select = conf['drops'].get("select_server", False) and not replay_file
+        self.max_fps = conf.get("ui", {}).get("max_fps", 10)
+        # Rates change with time alone, redraw at least this often (seconds)
+        self.tick = conf.get("ui", {}).get("tick", 1.0)
+        # Windows can't select() on stdin, fall back to getch timeouts there
+        self.selector: Optional[selectors.BaseSelector] = None
+        # Page and nav bar currently on screen, anything else needs a full redraw
+        self.drawn_page = None
+        self.drawn_nav_bar: Optional[str] = None
 
     def init_curses(self, stdscr: "curses.window"):
         curses.curs_set(0)  
@@ -27,41 +52,121 @@ class GameMonitor:
         curses.init_pair(2, curses.COLOR_GREEN, -1 )
 
 
-        stdscr.timeout(100)  
+        stdscr.timeout(0)
         return stdscr
 
     def run(self):
         curses.wrapper(self._run)
 
-    def _run(self, stdscr: "curses.window"):
-        stdscr = self.init_curses(stdscr)
+    def page(self, name: str):
+        page = self.pages.get(name)
+        if page is None:
+            page = self.pages[name] = self.page_factories[name](self.stdscr, self.packet_capture)
+            logging.debug(f"Built page: {name}")
+        return page
 
-        self.pages = {
-            "server_selection": ServerSelectionPage(stdscr, self.packet_capture),
-            "class_data": ClassSkillsPage(stdscr, self.packet_capture),
-            "resource_monitor": DropsPage(stdscr, self.packet_capture),
-        }
+    def _run(self, stdscr: "curses.window"):
+        self.stdscr = stdscr = self.init_curses(stdscr)
 
         if self.is_select:
 
-            self.current_page = self.pages["server_selection"]
+            self.current_page = self.page("server_selection")
         else:
-            self.current_page = self.pages["class_data"]
-            self.packet_capture.start()
+            self.current_page = self.page("class_data")
+            self.packet_capture.start(replay_file=self.replay_file, replay_speed=self.replay_speed)
 
+        notifier = self.packet_capture.notifier
+        if os.name != "nt":
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(sys.stdin, selectors.EVENT_READ, "input")
+            self.selector.register(notifier, selectors.EVENT_READ, "data")
+
+        frame_interval = 1 / self.max_fps
+        last_frame = float("-inf")
+        next_tick = 0.0
+        pending = True
         while True:
-            self.current_page.draw()
+            now = time.monotonic()
+            if now >= next_tick:
+                pending = True
+                next_tick = now + self.tick
+            if pending and now - last_frame >= frame_interval:
+                self.draw_frame(stdscr)
+                last_frame = now
+                pending = False
+
+            # Sleep until a key, new data or the next tick, but when a redraw
+            # is waiting on the frame cap only until that frame is allowed
+            timeout = next_tick - now
+            if pending:
+                timeout = min(timeout, last_frame + frame_interval - now)
+            events = self.wait(max(timeout, 0))
+            if "data" in events:
+                notifier.drain()
+                pending = True
+            if "input" in events:
+                pending = True
+                if self.handle_keys() == "quit":
+                    break
+
+        if self.selector is not None:
+            self.selector.close()
+
+        self.packet_capture.stop()
 
-            if self.current_page != self.pages["server_selection"]:
-                self.draw_navigation_bar(stdscr)
+    def wait(self, timeout: float) -> Set[str]:
+        """Blocks until input or new data, or for timeout seconds."""
+        if self.selector is not None:
+            return {key.data for key, _ in self.selector.select(timeout)}
 
+        self.stdscr.timeout(int(timeout * 1000))
+        key = self.stdscr.getch()
+        self.stdscr.timeout(0)
+        events = set()
+        if key != -1:
+            curses.ungetch(key)
+            events.add("input")
+        if self.packet_capture.notifier.ready():
+            events.add("data")
+        return events
+
+    def handle_keys(self) -> Optional[str]:
+        # curses may have read several keys off stdin at once, handle them all
+        while (key := self.stdscr.getch()) != -1:
+            if key == curses.KEY_RESIZE:
+                self.resize()
+                continue
+            curses.ungetch(key)
             next_page = self.handle_input()
             if next_page == "quit":
-                break
-            elif next_page in self.pages:
-                self.current_page = self.pages[next_page]
+                return "quit"
+            elif next_page in self.page_factories:
+                self.current_page = self.page(next_page)
+        return None
+
+    def resize(self):
+        """Lays every built page out again for the new terminal size."""
+        curses.update_lines_cols()
+        for page in self.pages.values():
+            # Server selection works out its layout on every draw
+            if hasattr(page, "setup_boxes"):
+                page.setup_boxes()
+        self.current_page.invalidate()
+        self.drawn_nav_bar = None
+        logging.debug(f"Terminal resized to {self.stdscr.getmaxyx()}")
 
-            time.sleep(0.0005)
+    def draw_frame(self, stdscr: "curses.window"):
+        if self.current_page is not self.drawn_page:
+            self.current_page.invalidate()
+            self.drawn_page = self.current_page
+            self.drawn_nav_bar = None
+
+        # Pages only write what changed and leave the physical update to doupdate
+        self.current_page.draw()
+        if self.current_page is not self.pages.get("server_selection"):
+            self.draw_navigation_bar(stdscr)
+            stdscr.noutrefresh()
+        curses.doupdate()
 
     def draw_navigation_bar(self, stdscr: "curses.window"):
         height, width = stdscr.getmaxyx()
@@ -74,6 +179,9 @@ class GameMonitor:
             ]
         )
 
+        if nav_bar == self.drawn_nav_bar:
+            return
+        self.drawn_nav_bar = nav_bar
         nav_bar_x = (width - len(nav_bar)) // 2
 
         try:
@@ -87,14 +195,14 @@ class GameMonitor:
         if isinstance(page_or_key, int):
 
             if page_or_key == ord("\n"): 
-                if self.current_page == self.pages["server_selection"]:
+                if self.current_page is self.pages.get("server_selection"):
                     logging.debug("Navigating from server_selection to the first page in page_order.")
-                    self.current_page = self.pages[self.page_order[0]]
+                    self.current_page = self.page(self.page_order[0])
                     self.current_page_index = 0
                     return None
                 else:
                     self.current_page_index = (self.current_page_index + 1) % len(self.page_order)
-                    self.current_page = self.pages[self.page_order[self.current_page_index]]
+                    self.current_page = self.page(self.page_order[self.current_page_index])
                     logging.debug(f"Switched to page: {self.page_order[self.current_page_index]}")
                     return None
 
@@ -103,14 +211,17 @@ class GameMonitor:
             
             elif page_or_key == ord("p"):
                 logging.debug(f"OUTPUTTED BUFFER: {self.packet_capture.get_buffer()}")
+                for log in self.packet_capture.get_recent_logs(10):
+                    logging.debug(f"RECENT FRAME: {log}")
+                logging.debug(f"BUFFER USAGE: {self.packet_capture.get_buffer_usage()}")
                 return None
 
         if isinstance(page_or_key, str):
             if page_or_key == "quit": 
                 return "quit"
 
-            if page_or_key in self.pages:
-                self.current_page = self.pages[page_or_key]
+            if page_or_key in self.page_factories:
+                self.current_page = self.page(page_or_key)
                 if page_or_key in self.page_order:
                     self.current_page_index = self.page_order.index(page_or_key)
                 logging.debug(f"Page switched via page-specific logic to: {page_or_key}")
@@ -118,17 +229,89 @@ class GameMonitor:
 
         return None
 
-def main():
-    monitor = GameMonitor()
-    monitor.run()
+def replay_without_ui(replay_file: str, replay_speed: float):
+    capture = PacketCapture()
 
-if __name__ == "__main__":
-    import sys
+    started = time.perf_counter()
+    capture.start(replay_file=replay_file, replay_speed=replay_speed)
+    capture.wait_until_done()
+    capture.stop()
+    elapsed = time.perf_counter() - started
 
-    if '--logging' in sys.argv:
+    print(f"Replayed {replay_file} in {elapsed:.2f}s")
+    for cmd, stats in capture.get_decode_stats().items():
+        print(f"  {cmd}: {stats['decoded']}/{stats['seen']} decoded")
+    for name, usage in capture.get_buffer_usage().items():
+        print(f"  {name}: {usage['items']}/{usage['capacity']} entries, {usage['bytes']} bytes (peak {usage['peak_bytes']})")
+    print(f"  rejected packets: {capture.rejected_packets}")
+    print(f"  dropped packets: {capture.dropped_packets}")
+    print(f"  queue high water mark: {capture.queue_high_water}")
+
+
+def run_headless(args: argparse.Namespace):
+    capture = PacketCapture()
+    reporter = HeadlessReporter.from_config(
+        capture, load_config(), interval=args.interval, fmt=args.format, output=args.output
+    )
+    capture.start(replay_file=args.replay, replay_speed=args.speed)
+    try:
+        reporter.run()
+    finally:
+        capture.stop()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AQW packet monitor")
+    parser.add_argument("--logging", action="store_true", help="write debug log to game_monitor_debug.log")
+    parser.add_argument("--replay", metavar="FILE", help="read packets from a pcap/pcapng file instead of sniffing")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        metavar="N",
+        help="replay speed multiplier, 0 replays as fast as possible",
+    )
+    parser.add_argument("--no-ui", action="store_true", help="replay without the curses UI and print a summary")
+    parser.add_argument(
+        "--headless", action="store_true", help="no UI, write resource monitor snapshots instead (see [headless])"
+    )
+    parser.add_argument("--interval", type=float, metavar="SECONDS", help="seconds between headless snapshots")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="headless snapshot format")
+    parser.add_argument("--output", metavar="FILE", help="rotating file for headless snapshots instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+
+    if args.logging:
+        output = load_config().get("output", {})
+        # Every frame is logged at debug level, the writes happen off the parse thread
+        writer = BackgroundWriter(
+            'game_monitor_debug.log',
+            batch_size=output.get("batch_size", 200),
+            flush_interval=output.get("flush_interval", 1.0),
+            max_bytes=output.get("max_bytes", 10 << 20),
+            backups=output.get("backups", 5),
+        )
         logging.basicConfig(
-            filename='game_monitor_debug.log',
+            handlers=[WriterHandler(writer)],
             level=logging.DEBUG,
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
+
+    if args.headless:
+        run_headless(args)
+        return
+
+    if args.no_ui:
+        if not args.replay:
+            raise SystemExit("--no-ui needs --replay FILE")
+        replay_without_ui(args.replay, args.speed)
+        return
+
+    monitor = GameMonitor(replay_file=args.replay, replay_speed=args.speed)
+    monitor.run()
+
+if __name__ == "__main__":
     main()
@@ -0,0 +1,419 @@
+import logging
+import mmap
+import select
+import socket
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Iterator, List, Optional, Sequence, Tuple
+
+
+@dataclass(slots=True)
+class PacketRecord:
+    """The only parts of a packet the pipeline cares about."""
+
+    timestamp: float
+    src: str
+    sport: int
+    dst: str
+    dport: int
+    seq: int
+    flags: int
+    payload: bytes
+    # perf_counter() when the pipeline got hold of it, for latency metrics
+    received: float = 0.0
+    # src as an integer, what the server filter compares against
+    src_addr: int = 0
+
+
+PacketHandler = Callable[[PacketRecord], None]
+StopCheck = Callable[[], bool]
+
+_IPV4 = struct.Struct("!BBHHHBBH4s4s")
+_TCP = struct.Struct("!HHIIBB")
+
+
+def parse_ipv4_tcp(buf, offset: int, timestamp: float) -> Optional[PacketRecord]:
+    """Pull a PacketRecord out of an IPv4/TCP packet starting at offset."""
+    if len(buf) - offset < 40:
+        return None
+    ver_ihl, _, total_len, _, frag, _, proto, _, src, dst = _IPV4.unpack_from(buf, offset)
+    if ver_ihl >> 4 != 4 or proto != 6 or frag & 0x1FFF:
+        return None
+
+    tcp_offset = offset + (ver_ihl & 0x0F) * 4
+    sport, dport, seq, _, data_offset, flags = _TCP.unpack_from(buf, tcp_offset)
+    # total_len trims ethernet padding on short frames
+    end = min(offset + total_len, len(buf))
+    start = tcp_offset + (data_offset >> 4) * 4
+    return PacketRecord(
+        timestamp,
+        socket.inet_ntoa(src),
+        sport,
+        socket.inet_ntoa(dst),
+        dport,
+        seq,
+        flags,
+        bytes(buf[start:end]) if end > start else b"",
+        src_addr=int.from_bytes(src, "big"),
+    )
+
+
+def build_bpf_filter(ips: Sequence[str], port: int) -> str:
+    if not ips:
+        return f"tcp src port {port}"
+    hosts = " or ".join(f"src host {ip}" for ip in ips)
+    return f"tcp src port {port} and ({hosts})"
+
+
+class CaptureBackend:
+    name = "base"
+
+    def __init__(self, ips: Sequence[str], port: int):
+        self.ips = list(ips)
+        self.port = port
+
+    def run(self, handler: PacketHandler, should_stop: StopCheck):
+        """Feed records to handler until the source ends or should_stop() is True."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class ScapyBackend(CaptureBackend):
+    name = "scapy"
+
+    def run(self, handler: PacketHandler, should_stop: StopCheck):
+        from scapy.all import IP, TCP, Raw, sniff
+
+        def convert(packet):
+            ip = packet.getlayer(IP)
+            tcp = packet.getlayer(TCP)
+            if ip is None or tcp is None:
+                return
+            raw = packet.getlayer(Raw)
+            handler(
+                PacketRecord(
+                    float(packet.time),
+                    ip.src,
+                    tcp.sport,
+                    ip.dst,
+                    tcp.dport,
+                    tcp.seq,
+                    int(tcp.flags),
+                    bytes(raw.load) if raw is not None else b"",
+                    src_addr=int.from_bytes(socket.inet_aton(ip.src), "big"),
+                )
+            )
+
+        bpf = build_bpf_filter(self.ips, self.port)
+        logging.debug(f"Sniffing with scapy, filter {bpf}")
+        sniff(filter=bpf, prn=convert, store=0, stop_filter=lambda _: should_stop())
+
+
+# linux/if_packet.h
+SOL_PACKET = 263
+PACKET_RX_RING = 5
+PACKET_STATISTICS = 6
+PACKET_VERSION = 10
+TPACKET_V3 = 2
+TP_STATUS_KERNEL = 0
+TP_STATUS_USER = 1
+ETH_P_IP = 0x0800
+SO_ATTACH_FILTER = 26
+
+_BLOCK_STATUS = struct.Struct("=I")
+_BLOCK_HEADER = struct.Struct("=III")  # block_status, num_pkts, offset_to_first_pkt
+_PACKET_HEADER = struct.Struct("=IIIIIIHH")  # next_offset, sec, nsec, snaplen, len, status, mac, net
+
+
+def compile_bpf(ips: Sequence[str], port: int) -> List[Tuple[int, int, int, int]]:
+    """Classic BPF for 'tcp src port <port> and src host in <ips>'.
+
+    Offsets are from the IP header since the socket is SOCK_DGRAM.
+    """
+    accept, drop = "accept", "drop"
+    # (code, jt, jf, k) with jt/jf as labels resolved below
+    program: List[Tuple[int, object, object, int]] = [
+        (0x30, 0, 0, 9),  # ldb [9]  protocol
+        (0x15, 0, drop, 6),  # jeq #6
+    ]
+    program.append((0x20, 0, 0, 12))  # ld [12]  source address
+    for i, ip in enumerate(ips):
+        value = struct.unpack("!I", socket.inet_aton(ip))[0]
+        last = i == len(ips) - 1
+        program.append((0x15, "ports", drop if last else 0, value))  # jeq #ip
+    ports = len(program)
+    program += [
+        (0x28, 0, 0, 6),  # ldh [6]  fragment offset
+        (0x45, drop, 0, 0x1FFF),  # jset #0x1fff
+        (0xB1, 0, 0, 0),  # ldxb 4*([0]&0xf)
+        (0x48, 0, 0, 0),  # ldh [x+0]  source port
+        (0x15, accept, drop, port),  # jeq #port
+    ]
+    labels = {"ports": ports, accept: len(program), drop: len(program) + 1}
+    program += [(0x06, 0, 0, 0x40000), (0x06, 0, 0, 0)]  # ret #262144 / ret #0
+
+    resolved = []
+    for pc, (code, jt, jf, k) in enumerate(program):
+        jt = labels[jt] - pc - 1 if isinstance(jt, str) else jt
+        jf = labels[jf] - pc - 1 if isinstance(jf, str) else jf
+        resolved.append((code, jt, jf, k))
+    return resolved
+
+
+class AFPacketBackend(CaptureBackend):
+    """Linux packet socket reading from an mmap'd TPACKET_V3 ring.
+
+    The kernel filters with classic BPF and batches packets into blocks, so
+    Python only touches packets from the game servers and wakes up once per
+    block instead of once per packet.
+    """
+
+    name = "afpacket"
+
+    def __init__(
+        self,
+        ips: Sequence[str],
+        port: int,
+        interface: Optional[str] = None,
+        block_size: int = 1 << 20,
+        block_count: int = 16,
+        block_timeout_ms: int = 50,
+    ):
+        super().__init__(ips, port)
+        self.interface = interface
+        self.block_size = block_size
+        self.block_count = block_count
+        self.block_timeout_ms = block_timeout_ms
+        self.sock: Optional[socket.socket] = None
+        self.ring: Optional[mmap.mmap] = None
+
+    @staticmethod
+    def available() -> bool:
+        return sys.platform.startswith("linux") and hasattr(socket, "AF_PACKET")
+
+    def open(self):
+        """Create the socket and ring, raises OSError without CAP_NET_RAW."""
+        import ctypes
+
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_DGRAM, socket.htons(ETH_P_IP))
+        try:
+            program = compile_bpf(self.ips, self.port)
+            filters = ctypes.create_string_buffer(b"".join(struct.pack("HBBI", *ins) for ins in program))
+            fprog = struct.pack("HL", len(program), ctypes.addressof(filters))
+            sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, fprog)
+
+            sock.setsockopt(SOL_PACKET, PACKET_VERSION, TPACKET_V3)
+            frame_size = 1 << 11
+            req = struct.pack(
+                "IIIIIII",
+                self.block_size,
+                self.block_count,
+                frame_size,
+                self.block_size * self.block_count // frame_size,
+                self.block_timeout_ms,
+                0,
+                0,
+            )
+            sock.setsockopt(SOL_PACKET, PACKET_RX_RING, req)
+            if self.interface:
+                sock.bind((self.interface, ETH_P_IP))
+            ring = mmap.mmap(
+                sock.fileno(),
+                self.block_size * self.block_count,
+                mmap.MAP_SHARED,
+                mmap.PROT_READ | mmap.PROT_WRITE,
+            )
+        except OSError:
+            sock.close()
+            raise
+        self.sock, self.ring = sock, ring
+
+    def run(self, handler: PacketHandler, should_stop: StopCheck):
+        if self.sock is None:
+            self.open()
+        sock, ring = self.sock, self.ring
+        poller = select.poll()
+        poller.register(sock.fileno(), select.POLLIN | select.POLLERR)
+        view = memoryview(ring)
+        block = 0
+        logging.debug(f"AF_PACKET ring ready, {self.block_count} blocks of {self.block_size} bytes")
+
+        try:
+            while not should_stop():
+                base = block * self.block_size
+                status, num_pkts, first = _BLOCK_HEADER.unpack_from(view, base + 8)
+                if not status & TP_STATUS_USER:
+                    poller.poll(500)
+                    continue
+
+                offset = base + first
+                for _ in range(num_pkts):
+                    next_offset, sec, nsec, snaplen, _, _, _, net = _PACKET_HEADER.unpack_from(view, offset)
+                    start = offset + net
+                    record = parse_ipv4_tcp(view[start : start + snaplen], 0, sec + nsec / 1e9)
+                    if record is not None:
+                        handler(record)
+                    offset += next_offset
+
+                # Hand the block back to the kernel
+                _BLOCK_STATUS.pack_into(view, base + 8, TP_STATUS_KERNEL)
+                block = (block + 1) % self.block_count
+        finally:
+            view.release()
+            ring.close()
+            sock.close()
+            self.sock, self.ring = None, None
+
+    def stats(self) -> dict:
+        if self.sock is None:
+            return {}
+        packets, drops, _ = struct.unpack("III", self.sock.getsockopt(SOL_PACKET, PACKET_STATISTICS, 12))
+        return {"kernel_packets": packets, "kernel_drops": drops}
+
+
+# Link types we know how to skip to the IP header, value is header length
+_LINK_HEADERS = {0: 4, 1: 14, 12: 0, 101: 0, 113: 16, 228: 0, 276: 20}
+
+_PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+_PCAPNG_SHB = b"\x0a\x0d\x0d\x0a"
+
+
+def _link_offset(linktype: int, frame: bytes) -> Optional[int]:
+    header = _LINK_HEADERS.get(linktype)
+    if header is None:
+        return None
+    if linktype == 1 and frame[12:14] == b"\x81\x00":
+        # 802.1Q tag
+        return 18
+    return header
+
+
+class PcapFileBackend(CaptureBackend):
+    """Streams records from a pcap or pcapng file without loading it all."""
+
+    name = "pcap"
+
+    def __init__(self, path: str, speed: float = 0.0, ips: Sequence[str] = (), port: int = 0):
+        super().__init__(ips, port)
+        self.path = path
+        self.speed = speed
+        self.records_read = 0
+
+    def run(self, handler: PacketHandler, should_stop: StopCheck):
+        first_time: Optional[float] = None
+        started = time.monotonic()
+        for record in self.records():
+            if should_stop():
+                break
+            if self.speed > 0:
+                if first_time is None:
+                    first_time = record.timestamp
+                delay = started + (record.timestamp - first_time) / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            handler(record)
+
+    def records(self) -> Iterator[PacketRecord]:
+        with open(self.path, "rb") as f:
+            magic = f.read(4)
+            if magic in _PCAP_MAGIC:
+                yield from self._read_pcap(f, magic)
+            elif magic == _PCAPNG_SHB:
+                f.seek(0)
+                yield from self._read_pcapng(f)
+            else:
+                raise ValueError(f"{self.path} is not a pcap or pcapng file")
+
+    def _read_pcap(self, f: BinaryIO, magic: bytes) -> Iterator[PacketRecord]:
+        endian, resolution = _PCAP_MAGIC[magic]
+        # Rest of the global header, the link type is the last field
+        linktype = struct.unpack(endian + "16xI", f.read(20))[0] & 0x0FFFFFFF
+        header = struct.Struct(endian + "IIII")
+
+        while True:
+            raw = f.read(header.size)
+            if len(raw) < header.size:
+                return
+            sec, frac, caplen, _ = header.unpack(raw)
+            frame = f.read(caplen)
+            record = self._record(linktype, frame, sec + frac * resolution)
+            if record is not None:
+                yield record
+
+    def _read_pcapng(self, f: BinaryIO) -> Iterator[PacketRecord]:
+        endian = "<"
+        # (linktype, seconds per timestamp unit) per interface id
+        interfaces: List[Tuple[int, float]] = []
+
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                return
+            if head[:4] == _PCAPNG_SHB:
+                endian = "<" if f.read(4) == b"\x4d\x3c\x2b\x1a" else ">"
+                length = struct.unpack(endian + "I", head[4:])[0]
+                f.seek(length - 12, 1)
+                interfaces = []
+                continue
+
+            block_type, length = struct.unpack(endian + "II", head)
+            body = f.read(length - 8)
+
+            if block_type == 1:
+                linktype = struct.unpack_from(endian + "H", body)[0]
+                interfaces.append((linktype, self._tsresol(body[8:-4], endian)))
+            elif block_type == 6:
+                iface, high, low, caplen = struct.unpack_from(endian + "IIII", body)
+                linktype, unit = interfaces[iface]
+                frame = body[20 : 20 + caplen]
+                record = self._record(linktype, frame, ((high << 32) | low) * unit)
+                if record is not None:
+                    yield record
+            elif block_type == 3 and interfaces:
+                linktype, _ = interfaces[0]
+                record = self._record(linktype, body[4:-4], 0.0)
+                if record is not None:
+                    yield record
+
+    @staticmethod
+    def _tsresol(options: bytes, endian: str) -> float:
+        pos = 0
+        while pos + 4 <= len(options):
+            code, length = struct.unpack_from(endian + "HH", options, pos)
+            if code == 0:
+                break
+            if code == 9 and length == 1:
+                value = options[pos + 4]
+                return 2.0 ** -(value & 0x7F) if value & 0x80 else 10.0 ** -value
+            pos += 4 + ((length + 3) & ~3)
+        return 1e-6
+
+    def _record(self, linktype: int, frame: bytes, timestamp: float) -> Optional[PacketRecord]:
+        self.records_read += 1
+        offset = _link_offset(linktype, frame)
+        if offset is None:
+            return None
+        return parse_ipv4_tcp(frame, offset, timestamp)
+
+
+def create_backend(name: str, ips: Sequence[str], port: int, interface: Optional[str] = None) -> CaptureBackend:
+    """Live capture backend by config name, 'auto' prefers AF_PACKET on Linux."""
+    if name in ("auto", "afpacket") and AFPacketBackend.available():
+        backend = AFPacketBackend(ips, port, interface=interface or None)
+        try:
+            backend.open()
+            return backend
+        except OSError as e:
+            logging.warning(f"Could not open AF_PACKET ring ({e}), falling back to scapy")
+    elif name == "afpacket":
+        logging.warning("AF_PACKET is only available on Linux, falling back to scapy")
+    return ScapyBackend(ips, port)
@@ -0,0 +1,165 @@
+import logging
+import socket
+import struct
+import time
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+from .backends import PacketRecord, PcapFileBackend, create_backend
+from .framing import FrameExtractor
+from .reassembly import FlowKey, TCPStreamReassembler
+from .servers import pack_ip
+from .shm_ring import SharedRing
+
+_KEY = struct.Struct("<4sH4sH")
+# Packed flow key, perf_counter when captured, capture timestamp, kind, then
+# the frame itself
+RECORD_HEADER = struct.Struct(f"<{_KEY.size}sddB")
+_TRAILER = struct.Struct("<ddB")
+KIND_FRAME = 0
+KIND_CLOSED = 1
+
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
+
+
+def pack_key(key: FlowKey) -> bytes:
+    src, sport, dst, dport = key
+    return _KEY.pack(socket.inet_aton(src), sport, socket.inet_aton(dst), dport)
+
+
+@lru_cache(maxsize=1024)
+def unpack_key(packed: bytes) -> FlowKey:
+    src, sport, dst, dport = _KEY.unpack(packed)
+    return (socket.inet_ntoa(src), sport, socket.inet_ntoa(dst), dport)
+
+
+def unpack_record(record: bytes) -> Tuple[FlowKey, float, float, int, bytes]:
+    packed, received, timestamp, kind = RECORD_HEADER.unpack_from(record)
+    return unpack_key(packed), received, timestamp, kind, record[RECORD_HEADER.size :]
+
+
+class CaptureWorker:
+    """Capture, reassembly and framing, run in a process of its own by capture_main.
+
+    Only complete JSON frames are written to the ring, decoding stays with
+    the handlers in the parent. perf_counter is system wide on the platforms
+    we capture on, so latency is still measured from the moment of capture.
+    """
+
+    def __init__(self, ring: SharedRing, options: Dict[str, Any], stop, data_ready):
+        self.ring = ring
+        self.options = options
+        self.stop = stop
+        self.data_ready = data_ready
+        self.sources = frozenset(pack_ip(ip) for ip in options["ips"])
+        self.port = options["port"]
+        self.replay = bool(options.get("replay_file"))
+        self.reassembler = TCPStreamReassembler(
+            max_pending_bytes=options.get("max_pending_bytes", 1 << 20),
+            flow_timeout=options.get("flow_timeout", 600),
+            gap_timeout=options.get("gap_timeout", 1.0),
+            max_pending_segments=options.get("max_pending_segments", 128),
+        )
+        self.max_buffer_size = options.get("max_buffer_size", 1 << 20)
+        self.framers: Dict[FlowKey, FrameExtractor] = {}
+        self.last_gap_check = time.time()
+        # Capture time of the newest packet, for frames a skipped gap releases
+        self.clock = 0.0
+        self.stop_checked = 0.0
+
+    def should_stop(self) -> bool:
+        # Event.is_set() is a semaphore round trip, once every 100ms is plenty
+        now = time.monotonic()
+        if now - self.stop_checked < 0.1:
+            return False
+        self.stop_checked = now
+        # Polled while the link is quiet too, so held segments still get released
+        self.expire_flows()
+        return self.stop.is_set()
+
+    def run(self):
+        options = self.options
+        if self.replay:
+            backend = PcapFileBackend(options["replay_file"], options.get("replay_speed", 0.0), options["ips"], self.port)
+        else:
+            backend = create_backend(options.get("backend", "auto"), options["ips"], self.port, options.get("interface", ""))
+        logging.debug(f"Capture process using {backend.name} capture backend")
+        backend.run(self.handle, self.should_stop)
+
+    def handle(self, record: PacketRecord):
+        ring = self.ring
+        ring.add("packets")
+        if record.src_addr not in self.sources or record.sport != self.port:
+            return
+        flags = record.flags
+        if not (record.payload or flags & (TCP_SYN | TCP_FIN | TCP_RST)):
+            return
+
+        received = time.perf_counter()
+        self.clock = record.timestamp
+        key: FlowKey = (record.src, record.sport, record.dst, record.dport)
+        closing = bool(flags & (TCP_FIN | TCP_RST))
+        data = self.reassembler.feed(key, record.seq, record.payload, syn=bool(flags & TCP_SYN), fin=closing)
+        if data:
+            self.send_frames(key, data, received, record.timestamp)
+        if closing:
+            self.close_flow(key)
+        self.expire_flows()
+
+    def send_frames(self, key: FlowKey, data: bytes, received: float, timestamp: float):
+        self.ring.add("bytes", len(data))
+        framer = self.framers.get(key)
+        if framer is None:
+            framer = self.framers[key] = FrameExtractor(self.max_buffer_size)
+        prefix = pack_key(key)
+        for frame in framer.feed(data):
+            # Only JSON messages are handled, skip %xt% and xml ones
+            if frame[:1] == b"{":
+                self.send(prefix + _TRAILER.pack(received, timestamp, KIND_FRAME) + frame)
+
+    def close_flow(self, key: FlowKey):
+        self.framers.pop(key, None)
+        self.send(pack_key(key) + _TRAILER.pack(0.0, 0.0, KIND_CLOSED))
+
+    def expire_flows(self):
+        now = time.time()
+        if now - self.last_gap_check < self.reassembler.gap_timeout:
+            return
+        self.last_gap_check = now
+        received = time.perf_counter()
+        for key, data in self.reassembler.expire(now).items():
+            self.send_frames(key, data, received, self.clock or now)
+        for key in [k for k in self.framers if k not in self.reassembler.flows]:
+            self.close_flow(key)
+
+    def send(self, record: bytes):
+        if len(record) > self.ring.max_record:
+            # Would never fit, even once the parent has read everything
+            self.ring.add("oversized")
+            return
+        while not self.ring.write(record):
+            if not self.replay:
+                # Same as a full queue, live traffic can't wait for the parser
+                self.ring.add("dropped")
+                return
+            if self.stop.is_set():
+                return
+            self.data_ready.set()
+            time.sleep(0.001)
+        if not self.data_ready.is_set():
+            self.data_ready.set()
+
+
+def capture_main(ring_name: str, options: Dict[str, Any], stop, done, data_ready):
+    """Entry point of the capture process."""
+    ring = SharedRing(ring_name)
+    try:
+        CaptureWorker(ring, options, stop, data_ready).run()
+    except Exception as e:
+        logging.error(f"Capture process stopped: {e}", exc_info=True)
+    finally:
+        done.set()
+        data_ready.set()
+        ring.close()
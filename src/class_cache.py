@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from threading import Lock
+from typing import Any, Dict, Optional
+
+# Commands the Class Data page is built from
+CLASS_COMMANDS = ("sAct", "aura+p", "seia")
+
+
+def content_hash(obj: Any) -> str:
+    """Same hash for the same data, whatever order its keys arrived in."""
+    return hashlib.sha1(json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def class_key(skills: Dict[str, Any]) -> str:
+    """sAct doesn't name the class, its skill names identify it well enough."""
+    names = [skill.get("nam") for skill in skills.get("actions", {}).get("active", [])]
+    return content_hash(names)[:16]
+
+
+class ClassDataCache:
+    """Last skill, passive and potion messages seen for each class, kept on disk.
+
+    Nothing is read until the first call that needs it. record() only
+    writes the file when a message hashes differently from the cached one.
+    """
+
+    def __init__(self, path: str = "class_cache.json"):
+        self.path = path
+        self._data: Optional[Dict[str, Any]] = None
+        self._lock = Lock()
+        self.writes = 0
+
+    @classmethod
+    def from_config(cls, conf: Dict[str, Any]) -> Optional["ClassDataCache"]:
+        cache = conf.get("class_cache", {})
+        if not cache.get("enabled", True):
+            return None
+        return cls(cache.get("path", "class_cache.json"))
+
+    def _load(self) -> Dict[str, Any]:
+        if self._data is None:
+            try:
+                with open(self.path) as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+            self._data.setdefault("last", None)
+            self._data.setdefault("classes", {})
+        return self._data
+
+    def last(self) -> Dict[str, Dict[str, Any]]:
+        """cmd -> {"hash", "data"} for the class used last."""
+        with self._lock:
+            data = self._load()
+            return dict(data["classes"].get(data["last"], {}))
+
+    def record(self, event: Any):
+        """Subscriber for CLASS_COMMANDS, runs off the parse thread.
+
+        Events have to arrive in order, passives and potions are filed under
+        the class the sAct before them named.
+        """
+        with self._lock:
+            data = self._load()
+            if event.cmd == "sAct":
+                # Only skills say which class is equipped
+                key = class_key(event.data)
+            else:
+                # Passives and potions belong to whatever class was last equipped
+                key = data["last"]
+                if key is None:
+                    return
+            entry = data["classes"].setdefault(key, {})
+            digest = content_hash(event.data)
+            if entry.get(event.cmd, {}).get("hash") == digest and data["last"] == key:
+                return
+            entry[event.cmd] = {"hash": digest, "data": event.data, "seen": time.time()}
+            data["last"] = key
+            self._save(data)
+
+    def _save(self, data: Dict[str, Any]):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.warning(f"Couldn't write {self.path}: {e}")
+            return
+        self.writes += 1
@@ -0,0 +1,12 @@
+from functools import lru_cache
+from typing import Any, Dict
+
+import toml
+
+CONFIG_PATH = "config.toml"
+
+
+@lru_cache(maxsize=None)
+def load_config(path: str = CONFIG_PATH) -> Dict[str, Any]:
+    """Parsed config.toml, read from disk once and shared by everything."""
+    return toml.load(path)
@@ -0,0 +1,137 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Loads = Callable[[bytes], Any]
+
+DECODERS = ("msgspec", "orjson", "json")
+
+
+def get_decoder(name: str = "auto") -> Tuple[str, Loads, Tuple[type, ...]]:
+    """Name, loads function and the exceptions it raises on bad input.
+
+    auto picks the fastest one installed, msgspec then orjson then the
+    standard library.
+    """
+    names = DECODERS if name == "auto" else (name,)
+    for candidate in names:
+        if candidate == "msgspec":
+            try:
+                import msgspec
+            except ImportError:
+                continue
+            return candidate, msgspec.json.Decoder().decode, (msgspec.DecodeError, UnicodeDecodeError)
+        if candidate == "orjson":
+            try:
+                import orjson
+            except ImportError:
+                continue
+            return candidate, orjson.loads, (orjson.JSONDecodeError,)
+        if candidate == "json":
+            return candidate, json.loads, (json.JSONDecodeError, UnicodeDecodeError)
+    if name != "auto":
+        raise ValueError(f"Unknown or unavailable decoder: {name}")
+    return "json", json.loads, (json.JSONDecodeError, UnicodeDecodeError)
+
+
+# The busiest commands are turned into these once, instead of every handler
+# walking the raw dicts with .get chains
+
+
+@dataclass(slots=True)
+class MonsterDeath:
+    """addGoldExp, sent for every kill and quest turn in."""
+
+    monster_id: Any
+    typ: str
+    gold: int
+    exp: int
+    rep: int
+
+    @classmethod
+    def from_obj(cls, obj: Dict[str, Any]) -> "MonsterDeath":
+        return cls(obj.get("id"), obj.get("typ", ""), obj.get("intGold", 0), obj.get("intExp", 0), obj.get("iRep", 0))
+
+
+@dataclass(slots=True)
+class DroppedItem:
+    item_id: Any
+    name: str
+    quantity: int
+
+
+@dataclass(slots=True)
+class ItemDrop:
+    """dropItem, items without a name can't be tracked and are left out."""
+
+    items: List[DroppedItem]
+
+    @classmethod
+    def from_obj(cls, obj: Dict[str, Any]) -> "ItemDrop":
+        return cls(
+            [
+                DroppedItem(item.get("ItemID", item_id), item["sName"], item.get("iQty", 1))
+                for item_id, item in obj.get("items", {}).items()
+                if "sName" in item
+            ]
+        )
+
+
+@dataclass(slots=True)
+class Combat:
+    """ct, only which auras were added or removed, in order, plus the message itself."""
+
+    aura_changes: List[str]
+    message: Optional[Dict[str, Any]] = None
+    # Typed decoders keep the frame instead, obj decodes it when it's needed
+    frame: bytes = b""
+
+    @property
+    def obj(self) -> Dict[str, Any]:
+        if self.message is None:
+            self.message = json.loads(self.frame).get("b", {}).get("o", {})
+        return self.message
+
+    @classmethod
+    def from_obj(cls, obj: Dict[str, Any]) -> "Combat":
+        changes = []
+        for action in obj.get("a", []):
+            cmd = action.get("cmd")
+            if cmd == "aura-":
+                changes.append(action.get("aura", {}).get("nam"))
+            elif cmd == "aura+":
+                changes.extend(aura.get("nam") for aura in action.get("auras", []) if aura.get("isNew", False))
+        return cls(changes, obj)
+
+
+@dataclass(slots=True)
+class StatUpdate:
+    """stu, the player's current stats."""
+
+    stats: Dict[str, Any]
+
+    @classmethod
+    def from_obj(cls, obj: Dict[str, Any]) -> "StatUpdate":
+        return cls(obj.get("sta", {}))
+
+
+# cmd -> builder, handlers registered for these get the struct instead of the dict
+TYPED_COMMANDS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "addGoldExp": MonsterDeath.from_obj,
+    "dropItem": ItemDrop.from_obj,
+    "ct": Combat.from_obj,
+    "stu": StatUpdate.from_obj,
+}
+
+
+def get_typed_decoders(name: str) -> Dict[str, Callable[[bytes], Any]]:
+    """cmd -> function decoding a whole frame of that command into its struct.
+
+    Only msgspec can decode into a type, with any other decoder this is
+    empty and the structs are built from the decoded dicts with TYPED_COMMANDS.
+    """
+    if name != "msgspec":
+        return {}
+    from .msgspec_decoders import typed_decoders
+
+    return typed_decoders()
@@ -0,0 +1,137 @@
+import math
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+_LOG_10_PERCENT = math.log(1 - 0.9)
+
+
+class DropStatistics:
+    """Per-item drop counters kept in NumPy arrays indexed by item id.
+
+    Recording a drop only touches one slot, the derived numbers (rates,
+    kills until 90%, kills needed for significance) are worked out for every
+    item at once and only when something asks for them.
+    """
+
+    def __init__(self, z_score: float = 1.96, margin_of_error: float = 0.02, capacity: int = 64):
+        self.z_score = z_score
+        self.margin_of_error = margin_of_error
+        self.names: List[str] = []
+        self.index: Dict[str, int] = {}
+        self.drop_count = np.zeros(capacity, dtype=np.int64)
+        self.quantity = np.zeros(capacity, dtype=np.int64)
+        self.last_drop_time = np.zeros(capacity, dtype=np.float64)
+        # Kill count the cached derived arrays were computed for
+        self._computed_for: Optional[int] = None
+        self._derived: Dict[str, np.ndarray] = {}
+        # Nothing can expire before this, new drops only ever push it later
+        self._next_expiry = 0.0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _slot(self, name: str) -> int:
+        slot = self.index.get(name)
+        if slot is not None:
+            return slot
+
+        slot = len(self.names)
+        if slot == len(self.drop_count):
+            grow = len(self.drop_count)
+            self.drop_count = np.concatenate([self.drop_count, np.zeros(grow, dtype=np.int64)])
+            self.quantity = np.concatenate([self.quantity, np.zeros(grow, dtype=np.int64)])
+            self.last_drop_time = np.concatenate([self.last_drop_time, np.zeros(grow, dtype=np.float64)])
+        self.names.append(name)
+        self.index[name] = slot
+        return slot
+
+    def record_drop(self, name: str, quantity: int, timestamp: float):
+        slot = self._slot(name)
+        self.drop_count[slot] += 1
+        self.quantity[slot] += quantity
+        self.last_drop_time[slot] = timestamp
+        self._computed_for = None
+
+    def expire(self, now: float, max_age: float) -> List[str]:
+        """Forget items that haven't dropped within max_age seconds, returns their names."""
+        n = len(self.names)
+        if not n or now < self._next_expiry:
+            return []
+        keep = (now - self.last_drop_time[:n]) <= max_age
+        if keep.all():
+            self._next_expiry = float(self.last_drop_time[:n].min()) + max_age
+            return []
+
+        expired = [self.names[i] for i in np.flatnonzero(~keep)]
+        kept = np.flatnonzero(keep)
+        self.names = [self.names[i] for i in kept]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        for attr in ("drop_count", "quantity", "last_drop_time"):
+            array = getattr(self, attr)
+            compacted = np.zeros_like(array)
+            compacted[: len(kept)] = array[kept]
+            setattr(self, attr, compacted)
+        if len(kept):
+            self._next_expiry = float(self.last_drop_time[: len(kept)].min()) + max_age
+        self._computed_for = None
+        return expired
+
+    def compute(self, kills: int) -> Dict[str, np.ndarray]:
+        """Derived per-item arrays, cached until a drop or kill changes them."""
+        if self._computed_for == kills:
+            return self._derived
+
+        n = len(self.names)
+        counts = self.drop_count[:n].astype(np.float64)
+        if kills > 0:
+            p = counts / kills
+        else:
+            p = np.zeros(n)
+        # A 100% rate would make log(1 - p) blow up
+        p_capped = np.where(p >= 1, 0.9999, p)
+        with np.errstate(divide="ignore"):
+            kills_until_90 = np.where(
+                p_capped > 0, np.ceil(_LOG_10_PERCENT / np.log1p(-p_capped)), np.inf
+            )
+
+        self._derived = {
+            "rate": p,
+            "kills_until_90": kills_until_90,
+            "required_kills": self.required_kills(p, self.z_score, self.margin_of_error),
+        }
+        self._computed_for = kills
+        return self._derived
+
+    @staticmethod
+    def required_kills(p: np.ndarray, z_score: float, margin_of_error: float) -> np.ndarray:
+        """Sample size for estimating p within margin_of_error at z_score."""
+        return np.ceil((z_score**2 * p * (1 - p)) / (margin_of_error**2)).astype(np.int64)
+
+    def most_recent(self, count: Optional[int]) -> List[int]:
+        n = len(self.names)
+        order = np.argsort(-self.last_drop_time[:n], kind="stable")
+        return order[:count].tolist()
+
+    def item_stats(self, kills: int, elapsed: float, slots: Optional[List[int]] = None) -> Dict[str, Dict[str, Any]]:
+        """Dict view for the UI, limited to slots when given."""
+        derived = self.compute(kills)
+        if slots is None:
+            slots = list(range(len(self.names)))
+
+        stats = {}
+        for i in slots:
+            until_90 = derived["kills_until_90"][i]
+            per_second = float(self.quantity[i]) / elapsed if elapsed > 0 else 0.0
+            stats[self.names[i]] = {
+                "drop_count": int(self.drop_count[i]),
+                "quantity_dropped": int(self.quantity[i]),
+                "estimated_drop_rate": float(derived["rate"][i]) * 100,
+                "kills_until_90": int(until_90) if np.isfinite(until_90) else float("inf"),
+                "required_kills": int(derived["required_kills"][i]),
+                "last_drop_time": float(self.last_drop_time[i]),
+                "drops_per_second": per_second,
+                "drops_per_minute": per_second * 60,
+                "drops_per_hour": per_second * 3600,
+            }
+        return stats
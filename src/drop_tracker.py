@@ -0,0 +1,125 @@
+import logging
+import time
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from .decoders import ItemDrop, MonsterDeath
+from .rates import RateEngine
+
+RATE_METRICS = ("gold", "exp", "rep", "kills")
+
+
+class DropTracker:
+    """Totals, rolling rates and per-item drop stats for one stream of kills."""
+
+    def __init__(
+        self,
+        rates_expiry: float = 60,
+        drops_expiry: float = 3600,
+        z_score: float = 1.96,
+        margin_error: float = 0.02,
+    ):
+        # Pulls in numpy, so it waits until the first tracker is needed
+        from .drop_stats import DropStatistics
+
+        self.rates_expiry = rates_expiry
+        self.drops_expiry = drops_expiry
+        self.z_score = z_score
+        self.margin_error = margin_error
+        self.total_gold = 0
+        self.total_exp = 0
+        self.total_rep = 0
+        self.monster_kills = 0
+        self.last_kill_time = 0.0
+        self.drop_stats = DropStatistics(z_score, margin_error)
+        # Gaps longer than rates_expiry don't count towards the session time
+        self.rate_engine = RateEngine(idle_timeout=rates_expiry)
+        # Bumped by every kill and drop, a snapshot of an older version is stale
+        self.version = 0
+        # Kills and drops are recorded by the parser, snapshots are taken by
+        # whoever asks for them, this keeps a snapshot from seeing half a kill
+        self.lock = Lock()
+
+    @classmethod
+    def from_config(cls, conf: Dict[str, Any]) -> "DropTracker":
+        drops = conf.get("drops", {})
+        return cls(
+            rates_expiry=drops.get("rates_expiry", 60),
+            drops_expiry=drops.get("drops_expiry", 3600),
+            z_score=drops.get("z_score", 1.96),
+            margin_error=drops.get("margin_error", 0.02),
+        )
+
+    def record_drops(self, drop: ItemDrop, current_time: float):
+        with self.lock:
+            self.version += 1
+            try:
+                for item in drop.items:
+                    self.drop_stats.record_drop(item.name, item.quantity, current_time)
+                    self.rate_engine.add(f"item:{item.name}", item.quantity, current_time)
+
+                # Their rates go with them, or every item ever seen keeps its counters
+                for name in self.drop_stats.expire(current_time, self.drops_expiry):
+                    self.rate_engine.forget(f"item:{name}")
+            except Exception as e:
+                logging.error(f"Error in processing drop event: {e}")
+
+    def record_death(self, kill: MonsterDeath, current_time: float):
+        gold = kill.gold
+        exp = kill.exp
+        rep = kill.rep
+        with self.lock:
+            self.version += 1
+            self.total_gold += gold
+            self.total_exp += exp
+            self.total_rep += rep
+            self.rate_engine.add("gold", gold, current_time)
+            self.rate_engine.add("exp", exp, current_time)
+            self.rate_engine.add("rep", rep, current_time)
+            if kill.typ == "m":
+                self.monster_kills += 1
+                self.last_kill_time = current_time
+                self.rate_engine.add("kills", 1, current_time)
+
+    def session_time(self, now: Optional[float] = None) -> float:
+        return self.rate_engine.session_time(time.time() if now is None else now)
+
+    def rates(self, now: Optional[float] = None) -> Dict[str, Dict[str, float]]:
+        """Per-second 1m/5m/1h/session rates for gold, exp, rep and kills."""
+        now = time.time() if now is None else now
+        return {metric: self.rate_engine.rates(metric, now) for metric in RATE_METRICS}
+
+    def item_rates(self, name: str, now: Optional[float] = None) -> Dict[str, float]:
+        return self.rate_engine.rates(f"item:{name}", time.time() if now is None else now)
+
+    def item_stats(self, slots: Optional[List[int]] = None, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        return self.drop_stats.item_stats(self.monster_kills, self.session_time(now), slots)
+
+    def most_recent(self, count: Optional[int]) -> List[int]:
+        return self.drop_stats.most_recent(count)
+
+    def snapshot(self, now: Optional[float] = None, item_count: Optional[int] = None) -> Dict[str, Any]:
+        """Everything the Resource Monitor shows as plain data, rates per hour.
+
+        Items are listed most recently dropped first, item_count keeps only
+        that many of them.
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            slots = self.most_recent(item_count)
+            items = self.item_stats(slots, now)
+            for name, stats in items.items():
+                stats["rates"] = per_hour(self.item_rates(name, now))
+            return {
+                "session_time": self.session_time(now),
+                "kills": self.monster_kills,
+                "gold": self.total_gold,
+                "exp": self.total_exp,
+                "rep": self.total_rep,
+                "rates": {metric: per_hour(rates) for metric, rates in self.rates(now).items()},
+                "items": items,
+            }
+
+
+def per_hour(rates: Dict[str, float]) -> Dict[str, float]:
+    return {window: rate * 3600 for window, rate in rates.items()}
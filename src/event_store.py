@@ -0,0 +1,172 @@
+import logging
+import sqlite3
+import time
+from queue import Empty, SimpleQueue
+from threading import Thread
+from typing import Any, Dict, List, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kills (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    monster_id INTEGER,
+    typ TEXT,
+    gold INTEGER NOT NULL DEFAULT 0,
+    exp INTEGER NOT NULL DEFAULT 0,
+    rep INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS drops (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    item_id INTEGER,
+    item TEXT NOT NULL,
+    quantity INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS kills_ts ON kills (ts);
+CREATE INDEX IF NOT EXISTS drops_ts ON drops (ts);
+CREATE INDEX IF NOT EXISTS drops_item ON drops (item, ts);
+
+-- Running totals kept by triggers, loading history reads these instead of
+-- scanning every event ever recorded
+CREATE TABLE IF NOT EXISTS kill_totals (
+    typ TEXT PRIMARY KEY,
+    kills INTEGER NOT NULL,
+    gold INTEGER NOT NULL,
+    exp INTEGER NOT NULL,
+    rep INTEGER NOT NULL,
+    first_ts REAL NOT NULL,
+    last_ts REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS item_totals (
+    item TEXT PRIMARY KEY,
+    drops INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    last_ts REAL NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS kills_total AFTER INSERT ON kills BEGIN
+    INSERT INTO kill_totals VALUES (COALESCE(NEW.typ, ''), 1, NEW.gold, NEW.exp, NEW.rep, NEW.ts, NEW.ts)
+    ON CONFLICT (typ) DO UPDATE SET
+        kills = kills + 1,
+        gold = gold + excluded.gold,
+        exp = exp + excluded.exp,
+        rep = rep + excluded.rep,
+        first_ts = MIN(first_ts, excluded.first_ts),
+        last_ts = MAX(last_ts, excluded.last_ts);
+END;
+CREATE TRIGGER IF NOT EXISTS drops_total AFTER INSERT ON drops BEGIN
+    INSERT INTO item_totals VALUES (NEW.item, 1, NEW.quantity, NEW.ts)
+    ON CONFLICT (item) DO UPDATE SET
+        drops = drops + 1,
+        quantity = quantity + excluded.quantity,
+        last_ts = MAX(last_ts, excluded.last_ts);
+END;
+"""
+
+_INSERTS = {
+    "kill": "INSERT INTO kills (ts, monster_id, typ, gold, exp, rep) VALUES (?, ?, ?, ?, ?, ?)",
+    "drop": "INSERT INTO drops (ts, item_id, item, quantity) VALUES (?, ?, ?, ?)",
+}
+
+
+class EventStore:
+    """Append-only SQLite (WAL) log of kills and drops across sessions.
+
+    record_* only put a row on a queue, a writer thread commits them in
+    batches so the parse thread never waits on the disk.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending: SimpleQueue[Optional[Tuple[str, tuple]]] = SimpleQueue()
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL keeps the database consistent on a crash, NORMAL only risks the last batch
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.history = self.load_totals()
+
+        self.writer = Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def record_kill(self, timestamp: float, monster_id: Optional[int], typ: str, gold: int, exp: int, rep: int):
+        self.pending.put(("kill", (timestamp, monster_id, typ, gold, exp, rep)))
+
+    def record_drop(self, timestamp: float, item_id: Optional[int], item: str, quantity: int):
+        self.pending.put(("drop", (timestamp, item_id, item, quantity)))
+
+    def backlog(self) -> int:
+        return self.pending.qsize()
+
+    def load_totals(self) -> Dict[str, Any]:
+        """Whole-history totals, read from the trigger-maintained summary tables."""
+        kills = {
+            typ: {"kills": n, "gold": gold, "exp": exp, "rep": rep, "first": first, "last": last}
+            for typ, n, gold, exp, rep, first, last in self.conn.execute("SELECT * FROM kill_totals")
+        }
+        items = {
+            item: {"drops": drops, "quantity": quantity, "last": last}
+            for item, drops, quantity, last in self.conn.execute("SELECT * FROM item_totals")
+        }
+        return {"kills": kills, "items": items}
+
+    def monster_kills(self) -> int:
+        return self.history["kills"].get("m", {}).get("kills", 0)
+
+    def item_history(self, item: str) -> Dict[str, Any]:
+        return self.history["items"].get(item, {"drops": 0, "quantity": 0, "last": 0.0})
+
+    def _write_loop(self):
+        while True:
+            try:
+                first = self.pending.get(timeout=self.flush_interval)
+            except Empty:
+                continue
+            if first is None:
+                break
+
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = self.pending.get(timeout=max(deadline - time.monotonic(), 0))
+                except Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+
+            self._write(batch)
+            if stop:
+                break
+        self.conn.close()
+
+    def _write(self, batch: List[Tuple[str, tuple]]):
+        kills = [row for kind, row in batch if kind == "kill"]
+        drops = [row for kind, row in batch if kind == "drop"]
+        try:
+            with self.conn:
+                if kills:
+                    self.conn.executemany(_INSERTS["kill"], kills)
+                if drops:
+                    self.conn.executemany(_INSERTS["drop"], drops)
+        except sqlite3.Error as e:
+            self.write_errors += len(batch)
+            logging.error(f"Failed to write {len(batch)} events to {self.path}: {e}")
+            return
+        self.written += len(batch)
+        self.batches += 1
+
+    def close(self, timeout: float = 5.0):
+        """Flush what is queued and stop the writer."""
+        if not self.writer.is_alive():
+            return
+        self.pending.put(None)
+        self.writer.join(timeout)
@@ -0,0 +1,155 @@
+import logging
+import os
+import time
+from queue import Empty, SimpleQueue
+from threading import Thread
+from typing import Any, Callable, Dict, List, Optional
+
+
+class BackgroundWriter:
+    """Appends records to a text file from a thread of its own.
+
+    write() only queues the record, serializing and writing happen on the
+    writer thread in batches of up to batch_size, at least every
+    flush_interval seconds. The file is rotated to path.1, path.2, ... once
+    it reaches max_bytes. Past max_backlog waiting records new ones are
+    dropped and counted rather than letting memory grow without bound.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        serialize: Callable[[Any], str] = str,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        max_bytes: int = 10 << 20,
+        backups: int = 5,
+        max_backlog: int = 10000,
+    ):
+        self.path = path
+        self.serialize = serialize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.max_backlog = max_backlog
+        self.pending: SimpleQueue[Optional[Any]] = SimpleQueue()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.rotations = 0
+        self.write_errors = 0
+        self.file = None
+
+        self.writer = Thread(target=self._write_loop, name=f"writer-{os.path.basename(path)}", daemon=True)
+        self.writer.start()
+
+    def write(self, record: Any):
+        if self.pending.qsize() >= self.max_backlog:
+            self.dropped += 1
+            return
+        self.pending.put(record)
+
+    def backlog(self) -> int:
+        return self.pending.qsize()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "written": self.written,
+            "backlog": self.backlog(),
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+            "errors": self.write_errors,
+        }
+
+    def _write_loop(self):
+        while True:
+            try:
+                first = self.pending.get(timeout=self.flush_interval)
+            except Empty:
+                continue
+            if first is None:
+                break
+
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.pending.get(timeout=max(deadline - time.monotonic(), 0))
+                except Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+
+            self._write(batch)
+            if stop:
+                break
+        if self.file is not None:
+            self.file.close()
+
+    def _write(self, batch: List[Any]):
+        try:
+            texts = [self.serialize(record) for record in batch]
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+            size = self.file.tell()
+            chunk: List[str] = []
+            for text in texts:
+                if self.max_bytes and size and size + len(text) > self.max_bytes:
+                    self.file.write("".join(chunk))
+                    chunk = []
+                    self._rotate()
+                    size = 0
+                chunk.append(text)
+                size += len(text)
+            self.file.write("".join(chunk))
+            self.file.flush()
+        except (OSError, TypeError, ValueError) as e:
+            self.write_errors += len(batch)
+            logging.error(f"Failed to write {len(batch)} records to {self.path}: {e}")
+            return
+        self.written += len(batch)
+        self.batches += 1
+
+    def _rotate(self):
+        self.file.close()
+        self.file = None
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.rotations += 1
+
+    def close(self, timeout: float = 5.0):
+        """Write what is queued and stop the writer."""
+        if not self.writer.is_alive():
+            return
+        self.pending.put(None)
+        self.writer.join(timeout)
+
+
+class WriterHandler(logging.Handler):
+    """logging handler that leaves the file writes to a BackgroundWriter."""
+
+    def __init__(self, writer: BackgroundWriter):
+        super().__init__()
+        self.writer = writer
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.writer.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.writer.close()
+        super().close()
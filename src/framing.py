@@ -0,0 +1,118 @@
+import logging
+from typing import List
+
+# SmartFox terminates every message with a NUL byte
+FRAME_TERMINATOR = 0x00
+
+_OPEN_BRACE = ord("{")
+_CLOSE_BRACE = ord("}")
+_QUOTE = ord('"')
+_BACKSLASH = ord("\\")
+
+
+class FrameExtractor:
+    """Splits one connection's byte stream into complete messages.
+
+    Scan state is kept between calls so every byte is looked at once no
+    matter how many segments a message is split over.
+    """
+
+    def __init__(self, max_buffer_size: int = 1 << 20):
+        self.buffer = bytearray()
+        self.max_buffer_size = max_buffer_size
+        # Where the next terminator search starts
+        self.scan_pos = 0
+        # Until a terminator shows up we fall back to brace counting
+        self.seen_terminator = False
+        self._reset_braces()
+        self.dropped_bytes = 0
+
+    def feed(self, data: bytes) -> List[bytes]:
+        if not data:
+            return []
+        self.buffer += data
+
+        frames = self._split_terminated()
+        if not self.seen_terminator:
+            frames.extend(self._split_braces())
+
+        if len(self.buffer) > self.max_buffer_size:
+            logging.debug(f"Frame buffer overflow, dropping {len(self.buffer)} bytes")
+            self.dropped_bytes += len(self.buffer)
+            self.reset()
+        return frames
+
+    def _split_terminated(self) -> List[bytes]:
+        frames: List[bytes] = []
+        buffer = self.buffer
+        start = 0
+        end = buffer.find(FRAME_TERMINATOR, self.scan_pos)
+        if end == -1:
+            self.scan_pos = len(buffer)
+            return frames
+
+        self.seen_terminator = True
+        view = memoryview(buffer)
+        while end != -1:
+            if end > start:
+                frames.append(bytes(view[start:end]))
+            start = end + 1
+            end = buffer.find(FRAME_TERMINATOR, start)
+        view.release()
+
+        del buffer[:start]
+        self.scan_pos = len(buffer)
+        self._reset_braces()
+        return frames
+
+    def _split_braces(self) -> List[bytes]:
+        frames: List[bytes] = []
+        buffer = self.buffer
+        start = 0
+        depth, in_string, escaped = self.depth, self.in_string, self.escaped
+
+        for i in range(self.brace_pos, len(buffer)):
+            byte = buffer[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif byte == _BACKSLASH:
+                    escaped = True
+                elif byte == _QUOTE:
+                    in_string = False
+                continue
+
+            if byte == _QUOTE:
+                in_string = True
+            elif byte == _OPEN_BRACE:
+                if depth == 0:
+                    start = i
+                depth += 1
+            elif byte == _CLOSE_BRACE and depth > 0:
+                depth -= 1
+                if depth == 0:
+                    frames.append(bytes(buffer[start : i + 1]))
+                    start = i + 1
+
+        if depth == 0:
+            # Nothing open, anything left over is junk between objects
+            start = len(buffer)
+        del buffer[:start]
+        self.brace_pos = len(buffer)
+        self.scan_pos = len(buffer)
+        self.depth, self.in_string, self.escaped = depth, in_string, escaped
+        return frames
+
+    def _reset_braces(self):
+        self.brace_pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def reset(self):
+        self.buffer.clear()
+        self.scan_pos = 0
+        self._reset_braces()
+
+    def __len__(self) -> int:
+        return len(self.buffer)
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import logging
+import math
+import sys
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .drop_tracker import RATE_METRICS
+from .packet_capture import PacketCapture
+
+CSV_FIELDS = [
+    "timestamp",
+    "session",
+    "metric",
+    "total",
+    "per_hour_1m",
+    "per_hour_5m",
+    "per_hour_1h",
+    "per_hour_session",
+    "drops",
+    "drop_rate",
+    "all_time_rate",
+    "kills_until_90",
+    "required_kills",
+]
+
+
+class SnapshotFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that starts every file, rotated ones too, with a header line."""
+
+    def __init__(self, path: str, max_bytes: int, backups: int, header: Optional[str] = None):
+        self.header = header
+        super().__init__(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+
+    def _open(self):
+        stream = super()._open()
+        if self.header and stream.tell() == 0:
+            stream.write(self.header + "\n")
+        return stream
+
+
+def _finite(value: Any) -> Any:
+    """JSON has no Infinity, items that never dropped have no kills_until_90."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    return value
+
+
+class HeadlessReporter:
+    """Writes the Resource Monitor numbers as JSON lines or CSV every interval seconds."""
+
+    def __init__(
+        self,
+        capture: PacketCapture,
+        interval: float = 10.0,
+        fmt: str = "jsonl",
+        output: str = "",
+        max_bytes: int = 10 << 20,
+        backups: int = 5,
+    ):
+        if fmt not in ("jsonl", "csv"):
+            raise ValueError(f"Unknown snapshot format: {fmt}")
+        self.capture = capture
+        self.interval = interval
+        self.fmt = fmt
+        self.snapshots = 0
+
+        header = ",".join(CSV_FIELDS) if fmt == "csv" else None
+        if output:
+            handler: logging.Handler = SnapshotFileHandler(output, max_bytes, backups, header)
+        else:
+            handler = logging.StreamHandler(sys.stdout)
+            if header:
+                sys.stdout.write(header + "\n")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        # Own logger so the debug log and its handlers never see snapshots
+        self.logger = logging.getLogger("aqw.snapshots")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.handlers = [handler]
+
+    @classmethod
+    def from_config(cls, capture: PacketCapture, conf: Dict[str, Any], **overrides: Any) -> "HeadlessReporter":
+        headless = conf.get("headless", {})
+        options = {
+            "interval": headless.get("interval", 10.0),
+            "fmt": headless.get("format", "jsonl"),
+            "output": headless.get("output", ""),
+            "max_bytes": headless.get("max_bytes", 10 << 20),
+            "backups": headless.get("backups", 5),
+        }
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        return cls(capture, **options)
+
+    def sessions(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Every client added together as "all", then each client on its own."""
+        keys: List[Any] = [None, *self.capture.get_sessions()]
+        for key in keys:
+            snapshot = self.capture.get_snapshot(key)
+            if snapshot is not None:
+                yield ("all" if key is None else f"{key[0]}:{key[1]}"), snapshot
+
+    def write(self, now: Optional[float] = None):
+        now = self.capture.now() if now is None else now
+        for session, snapshot in self.sessions():
+            if self.fmt == "jsonl":
+                self.logger.info(json.dumps(_finite({"timestamp": now, "session": session, **snapshot})))
+            else:
+                for row in self.csv_rows(now, session, snapshot):
+                    self.logger.info(row)
+        self.snapshots += 1
+
+    @staticmethod
+    def csv_rows(now: float, session: str, snapshot: Dict[str, Any]) -> Iterator[str]:
+        rows = []
+        for metric in RATE_METRICS:
+            rates = snapshot["rates"][metric]
+            rows.append([now, session, metric, snapshot[metric], rates["1m"], rates["5m"], rates["1h"], rates["session"]])
+        for name, stats in snapshot["items"].items():
+            rates = stats["rates"]
+            rows.append(
+                [
+                    now,
+                    session,
+                    f"item:{name}",
+                    stats["quantity_dropped"],
+                    rates["1m"],
+                    rates["5m"],
+                    rates["1h"],
+                    rates["session"],
+                    stats["drop_count"],
+                    stats["estimated_drop_rate"],
+                    _finite(stats["all_time_rate"]),
+                    _finite(stats["kills_until_90"]),
+                    stats["required_kills"],
+                ]
+            )
+        for row in rows:
+            line = io.StringIO()
+            csv.writer(line).writerow(row)
+            yield line.getvalue().rstrip("\r\n")
+
+    def run(self):
+        """Writes snapshots until a replay is finished or on Ctrl+C, then one last one."""
+        try:
+            while not self.capture.capture_done.wait(self.interval):
+                self.write()
+            # Replay read to the end, let the parser catch up first
+            self.capture.wait_until_done()
+        except KeyboardInterrupt:
+            pass
+        self.write()
+        for handler in self.logger.handlers:
+            handler.flush()
@@ -0,0 +1,61 @@
+from typing import Dict, List
+
+# Bucket i holds samples below 2**i microseconds, the last one catches the rest
+_BUCKETS = 24
+
+
+class LatencyHistogram:
+    """Power-of-two microsecond buckets, O(1) to record and tiny to keep."""
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        micros = int(seconds * 1_000_000)
+        self.buckets[min(micros.bit_length(), _BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th sample, in seconds."""
+        if not self.count:
+            return 0.0
+        target = p * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target:
+                return min((1 << i) / 1_000_000, self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class PipelineMetrics:
+    """Counters bumped from the hot path, plain ints so updates stay cheap."""
+
+    def __init__(self):
+        self.packets_seen = 0
+        self.packets_queued = 0
+        self.bytes_extracted = 0
+        self.frames_extracted = 0
+        self.decode_errors = 0
+        self.batches = 0
+        self.capture_to_callback = LatencyHistogram()
+        self.batch_processing = LatencyHistogram()
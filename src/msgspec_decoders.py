@@ -0,0 +1,100 @@
+"""msgspec Structs for the commands in decoders.TYPED_COMMANDS.
+
+Each command gets its own typed Decoder, so its frames go straight from
+bytes to a Struct without building the dicts, and from there to the same
+message the dict path builds. Only imported when msgspec is the decoder.
+"""
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+
+import msgspec
+
+from .decoders import TYPED_COMMANDS, Combat, DroppedItem, ItemDrop, MonsterDeath, StatUpdate
+
+T = TypeVar("T")
+
+
+class Body(msgspec.Struct, Generic[T]):
+    o: T
+
+
+class Frame(msgspec.Struct, Generic[T]):
+    b: Body[T]
+
+
+class Kill(msgspec.Struct):
+    id: Any = None
+    typ: str = ""
+    intGold: int = 0
+    intExp: int = 0
+    iRep: int = 0
+
+    def message(self, frame: bytes) -> MonsterDeath:
+        return MonsterDeath(self.id, self.typ, self.intGold, self.intExp, self.iRep)
+
+
+class Item(msgspec.Struct):
+    ItemID: Any = None
+    sName: Optional[str] = None
+    iQty: int = 1
+
+
+class Drop(msgspec.Struct):
+    items: Dict[str, Item] = {}
+
+    def message(self, frame: bytes) -> ItemDrop:
+        return ItemDrop(
+            [
+                DroppedItem(item_id if item.ItemID is None else item.ItemID, item.sName, item.iQty)
+                for item_id, item in self.items.items()
+                if item.sName is not None
+            ]
+        )
+
+
+class Aura(msgspec.Struct):
+    nam: Any = None
+    isNew: bool = False
+
+
+class Action(msgspec.Struct):
+    cmd: Optional[str] = None
+    aura: Optional[Aura] = None
+    auras: List[Aura] = []
+
+
+class CombatActions(msgspec.Struct):
+    a: List[Action] = []
+
+    def message(self, frame: bytes) -> Combat:
+        changes = []
+        for action in self.a:
+            if action.cmd == "aura-":
+                changes.append(action.aura.nam if action.aura is not None else None)
+            elif action.cmd == "aura+":
+                changes.extend(aura.nam for aura in action.auras if aura.isNew)
+        # The rest of the message is only decoded if the aura log wants it
+        return Combat(changes, frame=frame)
+
+
+class Stats(msgspec.Struct):
+    sta: Dict[str, Any] = {}
+
+    def message(self, frame: bytes) -> StatUpdate:
+        return StatUpdate(self.sta)
+
+
+STRUCTS = {
+    "addGoldExp": Kill,
+    "dropItem": Drop,
+    "ct": CombatActions,
+    "stu": Stats,
+}
+
+
+def typed_decoders() -> Dict[str, Callable[[bytes], Any]]:
+    """cmd -> frame to message, one Decoder per command in TYPED_COMMANDS."""
+    decoders = {}
+    for cmd in TYPED_COMMANDS:
+        decode = msgspec.json.Decoder(type=Frame[STRUCTS[cmd]]).decode
+        decoders[cmd] = lambda frame, decode=decode: decode(frame).b.o.message(frame)
+    return decoders
@@ -0,0 +1,63 @@
+import os
+import select
+import socket
+
+
+class Notifier:
+    """Wakes a selector from another thread.
+
+    Uses an eventfd where there is one and a socketpair otherwise. Every
+    notify() writes, the eventfd counter adds the writes up and drain()
+    reads them all at once, so a notify() racing with a drain() is never
+    lost, it just leaves the fd readable for the next select.
+    """
+
+    def __init__(self):
+        self._sockets = None
+        if hasattr(os, "eventfd"):
+            self._fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        else:
+            reader, writer = socket.socketpair()
+            reader.setblocking(False)
+            writer.setblocking(False)
+            self._sockets = (reader, writer)
+            self._fd = reader.fileno()
+        self.notifications = 0
+        self.wakeups = 0
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def notify(self):
+        self.notifications += 1
+        try:
+            if self._sockets is None:
+                os.eventfd_write(self._fd, 1)
+            else:
+                self._sockets[1].send(b"\x01")
+        except (BlockingIOError, OSError):
+            # Already full of wakeups, one more changes nothing
+            pass
+
+    def ready(self) -> bool:
+        """Whether a notify() is waiting to be drained, without blocking."""
+        readable, _, _ = select.select([self._fd], [], [], 0)
+        return bool(readable)
+
+    def drain(self):
+        self.wakeups += 1
+        try:
+            if self._sockets is None:
+                os.eventfd_read(self._fd)
+            else:
+                while self._sockets[0].recv(4096):
+                    pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def close(self):
+        if self._sockets is None:
+            os.close(self._fd)
+        else:
+            for sock in self._sockets:
+                sock.close()
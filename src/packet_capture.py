@@ -1,14 +1,32 @@
 import json
 import logging
+import re
 import time
-from dataclasses import dataclass
+from collections import Counter
+from dataclasses import dataclass, field, replace
 from enum import Enum
-from queue import Queue
-from threading import Lock, Thread
-from typing import Any, Callable, Dict, List, Optional
-
-import toml
-from scapy.all import IP, TCP, Raw, sniff
+from queue import Empty, Full, Queue
+from threading import Event, RLock, Thread
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .backends import CaptureBackend, PacketRecord, PcapFileBackend, build_bpf_filter, create_backend
+from .config import load_config
+from .decoders import TYPED_COMMANDS, Combat, ItemDrop, MonsterDeath, StatUpdate, get_decoder, get_typed_decoders
+from .drop_tracker import DropTracker
+from .event_store import EventStore
+from .file_writer import BackgroundWriter
+from .metrics import PipelineMetrics
+from .notify import Notifier
+from .reassembly import FlowKey, TCPStreamReassembler
+from .servers import ServerRegistry
+from .ringbuffer import RingBuffer
+from .session import ClientSession, SessionKey, session_key
+from .subscribers import Subscription
+
+if TYPE_CHECKING:
+    import asyncio
+
+    from .shm_ring import SharedRing
 
 
 class PacketType(Enum):
@@ -28,63 +46,297 @@ class GameEvent:
     type: PacketType
     data: Dict[str, Any]
     timestamp: float
+    cmd: str = ""
+    # Client connection the message came from
+    session: Optional[SessionKey] = None
+
+
+@dataclass(frozen=True)
+class CaptureState:
+    """What the UI reads, published whole by the parser and never modified.
+
+    Handlers build new dicts rather than changing the published ones, so a
+    reader can hold on to any of these without a lock.
+    """
+
+    latest_stats: Dict[str, Any] = field(default_factory=dict)
+    skill_data: Dict[str, Any] = field(default_factory=dict)
+    aura_data: Dict[str, Any] = field(default_factory=dict)
+    item_data: Dict[str, Any] = field(default_factory=dict)
+    recent_frames: Tuple[bytes, ...] = ()
+    decode_stats: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    sessions: Dict[SessionKey, Dict[str, Any]] = field(default_factory=dict)
+    # Drop tracker of each session that has one, None for every session together
+    trackers: Dict[Optional[SessionKey], DropTracker] = field(default_factory=dict)
+    buffer_usage: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    subscriptions: Tuple[Subscription, ...] = ()
+
+
+# Frames kept in each published state for the log views
+RECENT_FRAMES = 100
+# Seconds a snapshot is reused for when nothing was killed or dropped,
+# rates still fall off over time
+SNAPSHOT_INTERVAL = 1.0
+
+
+def _pretty_json(obj: Any) -> str:
+    return json.dumps(obj, indent=4) + "\n"
+
+
+def debug_enabled() -> bool:
+    """Check before building expensive debug messages in the hot path."""
+    return logging.root.isEnabledFor(logging.DEBUG)
+
+
+_PACKET_TYPES = {packet_type.value: packet_type for packet_type in PacketType}
+# The message's own cmd when it is the first key of "o", as the server sends
+# it. Otherwise every cmd in the frame is a candidate, "ct" action lists
+# nest cmds of their own and JSON doesn't promise any order
+_OBJ_CMD_PATTERN = re.compile(rb'"o"\s*:\s*\{\s*"cmd"\s*:\s*"([^"]*)"')
+_CMD_PATTERN = re.compile(rb'"cmd"\s*:\s*"([^"]*)"')
+
+# Gets the "o" dict, or its struct for commands in TYPED_COMMANDS
+CommandHandler = Callable[[Any], None]
+EventCallback = Callable[[GameEvent], None]
+
+SERVER_PORT = 5588
+TCP_FIN = 0x01
+TCP_SYN = 0x02
+TCP_RST = 0x04
 
 
 class PacketCapture:
     def __init__(self):
-        # Multiple servers have the same IP
-        self.servers = {
-            "Artix": "172.65.160.131",
-            "Swordhaven (EU)": "172.65.207.70",
-            "Yokai (SEA)": "172.65.236.72",
-            "Yorumi": "172.65.249.41",
-            "Twilly": "172.65.210.123",
-            "Safiria": "172.65.249.3",
-            "Galanoth": "172.65.249.3",
-            "Alteon": "172.65.235.85",
-            "Gravelyn": "172.65.235.85",
-            "Twig": "172.65.235.85",
-            "Sir Ver": "172.65.220.106",
-            "Espada": "172.65.220.106",
-            "Sepulchure": "172.65.220.106",
-        }
-
-        self.packet_queue = Queue()
         self.running = True
         self.selected_server: Optional[str] = None
-        self.buffer = ""
-        self.data_lock = Lock()
-        conf = toml.load("config.toml")
+        self.replay_file: Optional[str] = None
+        self.replay_speed = 1.0
+        self.capture_done = Event()
+        # Reentrant so code already holding it can still register callbacks
+        self.data_lock = RLock()
+        self.conf = conf = load_config()
+        self.registry = ServerRegistry.from_config(conf)
+        # Packed source addresses packets are accepted from, narrowed in start()
+        self.sources = self.registry.source_set()
         self.independent_instancing = conf["capture"].get(
             "independent_instancing", False
         )
-
-        self.raw_json_data: List[str] = []
-        self.stat_history: List[Dict[str, Any]] = []
-        self.skill_data: Dict[str, Any] = {}
-        self.aura_data: Dict[str, Any] = {}
-        self.item_data: Dict[str, Any] = {}
-        self.item_drops: List[Dict[str, Any]] = []
-        self.added_item_drops: List[Dict[str, Any]] = []
-        self.monster_death: List[Dict[str, Any]] = []
-        self.last_obj = ""
-        self.check_last = False
-        self.callbacks: Dict[PacketType, List[Callable[[GameEvent], None]]] = {
-            packet_type: [] for packet_type in PacketType
-        }
+        # auto, afpacket or scapy
+        self.backend_name = conf["capture"].get("backend", "auto")
+        self.interface = conf["capture"].get("interface", "")
+        self.backend: Optional[CaptureBackend] = None
+        # Capture, reassembly and framing in their own process, frames come
+        # back over a shared memory ring of ring_size bytes
+        self.use_process = conf["capture"].get("process", False)
+        self.ring_size = conf["capture"].get("ring_size", 8 << 20)
+        self.ring: Optional["SharedRing"] = None
+        self.capture_process = None
+        self.packet_queue = Queue(maxsize=conf["capture"].get("queue_size", 10000))
+        self.batch_size = conf["capture"].get("batch_size", 256)
+        # Packets lost because the parser fell behind and the queue was full
+        self.dropped_packets = 0
+        self.queue_high_water = 0
+        self.reassembler = TCPStreamReassembler(
+            max_pending_bytes=conf["capture"].get("max_pending_bytes", 1 << 20),
+            flow_timeout=conf["capture"].get("flow_timeout", 600),
+            gap_timeout=conf["capture"].get("gap_timeout", 1.0),
+            max_pending_segments=conf["capture"].get("max_pending_segments", 128),
+        )
+        self.max_buffer_size = conf["capture"].get("max_buffer_size", 1 << 20)
+        if self.use_process:
+            self._check_ring_size()
+        # One session per game client connection, each with its own framers
+        # and drop tracker, flow_sessions finds it without touching the others
+        self.sessions: Dict[SessionKey, ClientSession] = {}
+        self.flow_sessions: Dict[FlowKey, ClientSession] = {}
+        self.current_session: Optional[ClientSession] = None
+        # Idle sessions are forgotten after this many seconds
+        self.session_timeout = conf["capture"].get("session_timeout", 3600)
+        # Every session's kills and drops together, built on the first one
+        self.aggregate: Optional[DropTracker] = None
+        self.last_flow_expiry = time.time()
+        self.last_gap_check = time.time()
+        # Capture time of the newest packet, events are stamped with the time
+        # their packet was captured so replays keep their original timeline
+        self.capture_clock = 0.0
+        self.current_time = 0.0
+        # Length of the frame being handled, the histories use it as the size
+        # of what they keep instead of measuring the decoded message
+        self.current_size = 0
+
+        sizes = conf.get("buffers", {})
+        # Raw frames, only decoded when someone asks for them
+        self.raw_json_data: RingBuffer[bytes] = RingBuffer(sizes.get("raw_frames", 2000), sizeof=len)
+        self.stat_history: RingBuffer[Dict[str, Any]] = RingBuffer(sizes.get("stat_history", 1000))
+        # Replaced in one assignment after each batch, readers never take the lock
+        self.state = CaptureState()
+        # Changes to state made by handlers during the current batch
+        self._pending: Dict[str, Any] = {}
+        # (session, item_count) -> tracker versions, monotonic time built and
+        # the snapshot, see get_snapshot
+        self._snapshots: Dict[Tuple[Optional[SessionKey], Optional[int]], Tuple[Tuple[int, int], float, Dict[str, Any]]] = {}
+        self.item_drops: RingBuffer[Dict[str, Any]] = RingBuffer(sizes.get("item_drops", 5000))
+        self.added_item_drops: RingBuffer[Dict[str, Any]] = RingBuffer(sizes.get("added_item_drops", 5000))
+        self.monster_death: RingBuffer[Dict[str, Any]] = RingBuffer(sizes.get("monster_death", 5000))
+        # Packets that made it past the kernel filter but were dropped here,
+        # should stay at ~0 if the BPF expression is doing its job
+        self.rejected_packets = 0
+        self.metrics = PipelineMetrics()
+        # Tells the UI there is something new to draw
+        self.notifier = Notifier()
+        store = conf.get("store", {})
+        self.store_enabled = store.get("enabled", True)
+        self.store_path = store.get("path", "events.db")
+        self.store_batch_size = store.get("batch_size", 500)
+        self.store_flush_interval = store.get("flush_interval", 1.0)
+        # Opened in start(), replays are never written to the history
+        self.event_store: Optional[EventStore] = None
+        # Drops of each item this run, never expired like the trackers' items
+        # so all-time rates divide drops and kills over the same span
+        self.session_drops: Counter[str] = Counter()
+        self.output = conf.get("output", {})
+        # Started on the first record, most sessions never write one
+        self.aura_writer: Optional[BackgroundWriter] = None
+        # cmd -> callbacks, PacketType.UNKNOWN's "unknown" catches any
+        # cmd without a PacketType of its own
+        self.callbacks: Dict[str, List[EventCallback]] = {}
+        # cmd -> subscriptions, each fed through its own queue
+        self.subscriptions: Dict[str, List[Subscription]] = {}
+        # cmd -> stateful handler run on the decoded "o" object
+        self.handlers: Dict[str, CommandHandler] = {}
+        # Commands that are worth decoding
+        self.decode_cmds: set[str] = set()
+        # auto, msgspec, orjson or json
+        self.decoder, self.loads, self.decode_errors = get_decoder(conf["capture"].get("decoder", "auto"))
+        # Frames of typed commands nobody wants the dict of skip it, msgspec only
+        self.typed_decoders = get_typed_decoders(self.decoder)
+        self.command_counts: Counter[str] = Counter()
+        self.decoded_counts: Counter[str] = Counter()
+
+        self.register_command(PacketType.AURA_PASSIVE.value, self._handle_aura_passive)
+        self.register_command(PacketType.SKILL_DATA.value, self._handle_skill_data)
+        self.register_command(PacketType.STAT_UPDATE.value, self._handle_stat_update)
+        self.register_command(PacketType.ITEM_UPDATE.value, self._handle_item_update)
+        self.register_command(PacketType.MONSTER_DEATH.value, self._handle_monster_death)
+        self.register_command(PacketType.DROP_ITEM.value, self._handle_drop_item)
+        self.register_command(PacketType.ADD_ITEM.value, self._handle_add_item)
+        if self.independent_instancing:
+            self.register_command(PacketType.COMBAT.value, self._handle_combat)
+
+    def register_command(self, cmd: str, handler: CommandHandler):
+        """Decode cmd and run handler on its "o" object, no PacketType needed.
+
+        Commands in decoders.TYPED_COMMANDS are passed as their struct instead.
+        """
+        self.handlers[cmd] = handler
+        self.decode_cmds.add(cmd)
 
     def register_callback(
-        self, event_type: PacketType, callback: Callable[[GameEvent], None]
+        self, event_type: Union[PacketType, str], callback: EventCallback
     ):
-        logging.debug(f"Added callback: {callback}")
-        self.callbacks[event_type].append(callback)
+        cmd = event_type.value if isinstance(event_type, PacketType) else event_type
+        logging.debug(f"Added callback for {cmd}: {callback}")
+        # Pages can be built after capture has started
+        with self.data_lock:
+            self.callbacks.setdefault(cmd, []).append(callback)
+            self.decode_cmds.add(cmd)
+
+    def subscribe(
+        self,
+        event_types: Union[PacketType, str, Iterable[Union[PacketType, str]]],
+        callback: EventCallback,
+        maxsize: int = 1000,
+        coalesce: bool = False,
+        loop: Optional["asyncio.AbstractEventLoop"] = None,
+        name: Optional[str] = None,
+    ) -> Subscription:
+        """Like register_callback, but callback runs on its own thread (or loop).
+
+        Slow subscribers only fall behind themselves, see Subscription for
+        what happens when they fall too far behind. Callbacks that only
+        update a page should stay on register_callback.
+        """
+        if isinstance(event_types, (PacketType, str)):
+            event_types = [event_types]
+        cmds = [t.value if isinstance(t, PacketType) else t for t in event_types]
+        name = name or getattr(callback, "__qualname__", repr(callback))
+        subscription = Subscription(name, callback, cmds, maxsize, coalesce, loop)
+        logging.debug(f"Added {subscription.executor} subscriber {name} for {cmds}")
+        with self.data_lock:
+            for cmd in cmds:
+                self.subscriptions.setdefault(cmd, []).append(subscription)
+                self.decode_cmds.add(cmd)
+            self._publish_subscriptions()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        with self.data_lock:
+            for cmd in subscription.cmds:
+                subscribers = self.subscriptions.get(cmd, [])
+                if subscription in subscribers:
+                    subscribers.remove(subscription)
+                if not subscribers:
+                    self.subscriptions.pop(cmd, None)
+            self._publish_subscriptions()
+
+    def _publish_subscriptions(self):
+        # Called with data_lock held, like _publish
+        subscriptions = {id(s): s for subs in self.subscriptions.values() for s in subs}
+        self.state = replace(self.state, subscriptions=tuple(subscriptions.values()))
+
+    def _has_callbacks(self, cmd: str) -> bool:
+        if cmd in self.callbacks or cmd in self.subscriptions:
+            return True
+        unknown = PacketType.UNKNOWN.value
+        return cmd not in _PACKET_TYPES and (unknown in self.callbacks or unknown in self.subscriptions)
 
     def _notify_callbacks(self, event: GameEvent):
-        for callback in self.callbacks[event.type]:
-            callback(event)
-
-    def start(self, selected_server: Optional[str] = None):
+        cmds = [event.cmd or event.type.value]
+        if event.cmd and event.type is PacketType.UNKNOWN:
+            cmds.append(PacketType.UNKNOWN.value)
+        for cmd in cmds:
+            for callback in self.callbacks.get(cmd, ()):
+                callback(event)
+            # Only queued here, never waits for the subscriber
+            for subscription in self.subscriptions.get(cmd, ()):
+                subscription.publish(event)
+
+    def wants(self, cmd: str) -> bool:
+        if cmd in self.decode_cmds:
+            return True
+        return cmd not in _PACKET_TYPES and PacketType.UNKNOWN.value in self.decode_cmds
+
+    def start(
+        self,
+        selected_server: Optional[str] = None,
+        replay_file: Optional[str] = None,
+        replay_speed: float = 1.0,
+    ):
         self.selected_server = selected_server
+        # The addresses are baked into the kernel filter and the capture
+        # process below, ones resolved after this would never be seen
+        if not self.registry.wait():
+            logging.warning(
+                f"Server lookup still running after {self.registry.resolve_timeout}s, capturing with the cached addresses"
+            )
+        self.sources = self.registry.source_set(selected_server)
+        self.replay_file = replay_file
+        self.replay_speed = replay_speed
+        self.capture_done.clear()
+
+        if not replay_file and self.store_enabled and self.event_store is None:
+            self.event_store = EventStore(self.store_path, self.store_batch_size, self.store_flush_interval)
+        if self.use_process:
+            # The capture process opens its own backend, one here would only drop packets
+            self._start_process()
+            return
+        if replay_file:
+            self.backend = PcapFileBackend(replay_file, replay_speed, self.capture_ips(), SERVER_PORT)
+        else:
+            self.backend = create_backend(self.backend_name, self.capture_ips(), SERVER_PORT, self.interface)
+        logging.debug(f"Using {self.backend.name} capture backend")
+
         logging.debug("Starting capture thread")
         self.capture_thread = Thread(target=self._start_capture)
         logging.debug("Starting process packets thread")
@@ -96,212 +348,653 @@ class PacketCapture:
         self.process_thread.start()
         logging.debug("Started process packet thread")
 
-    def _start_capture(self):
-        logging.debug(f"Beginning sniffing: {self.selected_server}")
-        sniff(filter="tcp", prn=self._packet_callback, store=0)
-
-    def extract_json_objects(self, data: str) -> tuple[list[str], str]:
-        objects = []
-        depth = 0
-        start = 0
-        in_string = False
-        escaped = False
-
-        for i, char in enumerate(data):
-            if char == '"' and not escaped:
-                in_string = not in_string
-
-            if in_string:
-                if char == "\\" and not escaped:
-                    escaped = True
-                else:
-                    escaped = False
-                continue
-
-            if char == "{":
-                if depth == 0:
-                    start = i
-                depth += 1
-            elif char == "}":
-                depth -= 1
-                if depth == 0:
-                    objects.append(data[start : i + 1])
-                    start = i + 1
-
-        return objects, data[start:]
+    def _check_ring_size(self):
+        # Only process mode needs these, the default path doesn't pay for the imports
+        from .capture_process import RECORD_HEADER
+        from .shm_ring import max_record
+
+        if max_record(self.ring_size) < RECORD_HEADER.size + self.max_buffer_size:
+            # A frame as large as max_buffer_size has to fit, or the capture
+            # process could only ever drop it
+            ring_size = 2 * (RECORD_HEADER.size + self.max_buffer_size + 4)
+            logging.warning(f"ring_size {self.ring_size} can't hold a {self.max_buffer_size} byte frame, using {ring_size}")
+            self.ring_size = ring_size
+
+    def _start_process(self):
+        import multiprocessing
+
+        from .capture_process import capture_main
+        from .shm_ring import SharedRing
+
+        # fork would copy the parent's threads' locks in whatever state they're in
+        context = multiprocessing.get_context("spawn")
+        self.ring = SharedRing(capacity=self.ring_size)
+        self.process_stop = context.Event()
+        self.process_done = context.Event()
+        self.data_ready = context.Event()
+        options = {
+            "replay_file": self.replay_file,
+            "replay_speed": self.replay_speed,
+            "ips": self.capture_ips(),
+            "port": SERVER_PORT,
+            "backend": self.backend_name,
+            "interface": self.interface,
+            "max_pending_bytes": self.reassembler.max_pending_bytes,
+            "flow_timeout": self.reassembler.flow_timeout,
+            "gap_timeout": self.reassembler.gap_timeout,
+            "max_pending_segments": self.reassembler.max_pending_segments,
+            "max_buffer_size": self.max_buffer_size,
+        }
+        logging.debug("Starting capture process")
+        self.capture_process = context.Process(
+            target=capture_main,
+            args=(self.ring.name, options, self.process_stop, self.process_done, self.data_ready),
+            daemon=True,
+        )
+        self.capture_process.start()
+        self.process_thread = Thread(target=self._process_shared_frames)
+        self.process_thread.daemon = True
+        self.process_thread.start()
+        logging.debug(f"Started capture process {self.capture_process.pid}")
+
+    def stop(self):
+        self.running = False
+        for subscription in self.state.subscriptions:
+            subscription.close()
+        if self.capture_process is not None:
+            self.process_stop.set()
+            self.capture_process.join(timeout=2)
+            self.process_thread.join(timeout=2)
+            self.ring.close()
+            self.capture_process = None
+        if self.event_store is not None:
+            self.event_store.close()
+        if self.aura_writer is not None:
+            self.aura_writer.close()
+
+    def wait_until_done(self):
+        """Blocks until a replay has been read to the end and fully processed."""
+        self.capture_done.wait()
+        self.packet_queue.join()
+
+    def capture_ips(self) -> List[str]:
+        return self.registry.addresses(self.selected_server)
+
+    def build_bpf_filter(self) -> str:
+        return build_bpf_filter(self.capture_ips(), SERVER_PORT)
 
-    def _packet_callback(self, packet):
+    def _start_capture(self):
+        logging.debug(f"Beginning capture: {self.selected_server}")
+        try:
+            self.backend.run(self._packet_callback, lambda: not self.running)
+        except Exception as e:
+            logging.error(f"Capture backend {self.backend.name} stopped: {e}", exc_info=True)
+        finally:
+            logging.debug("Capture finished")
+            self.capture_done.set()
+
+    def _packet_callback(self, record: PacketRecord):
         if not self.running:
             return
+        self.metrics.packets_seen += 1
 
-        if packet.haslayer(TCP) and packet.haslayer(IP):
-            ip_src = packet[IP].src
-
-            if (
-                self.selected_server in self.servers
-                and ip_src == self.servers[self.selected_server]
-            ):
+        if record.src_addr not in self.sources or record.sport != SERVER_PORT:
+            self.rejected_packets += 1
+            return
 
-                if packet.haslayer(Raw):
-                    logging.debug("Put packet in queue")
-                    self.packet_queue.put(packet)
-                    # logging.debug(f"RAW PACKET IS HERE: {packet[Raw].load}")
+        # Empty segments still matter to reassembly when they open or close a flow
+        if record.payload or record.flags & (TCP_SYN | TCP_FIN | TCP_RST):
+            record.received = time.perf_counter()
+            self._enqueue(record)
 
+    def _enqueue(self, record: PacketRecord):
+        try:
+            if self.replay_file:
+                # A file can wait for the parser, live traffic can't
+                self.packet_queue.put(record)
             else:
-                logging.debug("Running Else in packet callback")
-                if ip_src in list(self.servers.values()):
-                    if packet.haslayer(Raw):
-                        logging.debug("Put packet in queue")
-                        # logging.debug(f"RAW PACKET IS HERE: {packet}")
-                        self.packet_queue.put(packet)
+                self.packet_queue.put_nowait(record)
+        except Full:
+            self.dropped_packets += 1
+            return
+        self.metrics.packets_queued += 1
+
+        depth = self.packet_queue.qsize()
+        if depth > self.queue_high_water:
+            self.queue_high_water = depth
 
     def parse_data(self, data: dict[str, Any]) -> GameEvent:
-        logging.debug(f"Parsing data: {data}")
         obj = data.get("b", {}).get("o", {})
         cmd = obj.get("cmd", "unknown")
-
-        logging.debug(f"Command Type: {cmd}")
-        logging.debug("Settings Packet Type")
-        event_type = (
-            PacketType(cmd)
-            if cmd in [e.value for e in PacketType]
-            else PacketType.UNKNOWN
+        self._run_handler(cmd, obj)
+        return self._event(cmd, obj)
+
+    def _run_handler(self, cmd: str, obj: Optional[Dict[str, Any]], message: Any = None):
+        """message is the struct when a typed decoder already made it."""
+        handler = self.handlers.get(cmd)
+        if handler is not None:
+            if message is None:
+                build = TYPED_COMMANDS.get(cmd)
+                message = build(obj) if build is not None else obj
+            handler(message)
+
+    def _event(self, cmd: str, obj: Dict[str, Any]) -> GameEvent:
+        event_type = _PACKET_TYPES.get(cmd, PacketType.UNKNOWN)
+        session = self.current_session
+        event = GameEvent(
+            type=event_type, data=obj, timestamp=self.current_time, cmd=cmd, session=session.key if session else None
         )
-        logging.debug(f"Packet Type: {event_type}")
-
-        match event_type:
-            case PacketType.AURA_PASSIVE:
-                auras = obj.get("auras", [])
-                for aura in auras:
-                    self.aura_data[aura["nam"]] = {
-                        "effects": aura.get("e", []),
-                        "timestamp": time.time(),
-                    }
-
-            case PacketType.SKILL_DATA:
-                logging.debug("Matching Skill Type")
-                logging.debug("Processing SKILL_DATA")
-                actives = obj.get("actions", {}).get("active", {})
-                logging.debug(f"Active skills found: {actives}")
-                self.skill_data = {"skills": actives, "timestamp": time.time()}
-
-            case PacketType.STAT_UPDATE:
-                stats = obj.get("sta", {})
-                self.stat_history.append({"stats": stats, "timestamp": time.time()})
-
-            case PacketType.COMBAT:
-                if self.independent_instancing:
-                    a = obj.get("a", [])
-                    current_checks = []
-                    for item in a:
-                        cmd = item.get("cmd")
-                        aura = item.get("aura")
-                        auras = item.get("auras", [])
-                        if cmd == "aura-":
-                            current_checks.append(aura.get("nam"))
-                        elif cmd == "aura+":
-                            for aur in auras:
-                                if aur.get("isNew", False):
-                                    current_checks.append(aur.get("nam"))
-
-                    for i, item in enumerate(current_checks):
-                        if i == 0:
-                            continue
-                        if item == current_checks[i - 1]:
-                            with open("./instance_auras.json", "a+") as f:
-                                json.dump(obj, f, indent=4)
-                                f.write("\n")
-
-            case PacketType.ITEM_UPDATE:
-                items = obj.get("o", {})
-                self.item_data = {"items": items, "timestamp": time.time()}
-
-            case PacketType.MONSTER_DEATH:
-                self.monster_death.append({"obj": obj, "timestamp": time.time()})
-
-            case PacketType.DROP_ITEM:
-                self.item_drops.append({"obj": obj, "timestamp": time.time()})
-
-            case PacketType.ADD_ITEM:
-                self.added_item_drops.append({"obj": obj, "timestamp": time.time()})
-
-            case PacketType.UNKNOWN:
-                logging.debug("In Unknown")
-                pass
-
-        self.raw_json_data.append(json.dumps(data, indent=4))
-
-        event = GameEvent(type=event_type, data=obj, timestamp=time.time())
-
-        logging.debug(f"Created event: {event}")
+        if debug_enabled():
+            logging.debug(f"Created event: {event}")
         return event
 
+    def _handle_frame(self, frame: bytes, received: float = 0.0, timestamp: Optional[float] = None) -> bool:
+        """Returns whether the frame was decoded and passed on."""
+        timestamp = time.time() if timestamp is None else timestamp
+        return self._handle_frames([(frame, received, timestamp, self.current_session)])
+
+    def _handle_frames(self, frames: List[Tuple[bytes, float, float, Optional[ClientSession]]]) -> bool:
+        """Decodes frames, runs handlers under the lock and callbacks after it.
+
+        Returns whether anything was decoded.
+        """
+        decoded = []
+        for frame, received, timestamp, session in frames:
+            message = self._decode(frame)
+            if message is not None:
+                decoded.append((session, received, timestamp, len(frame), *message))
+
+        events: List[Tuple[GameEvent, float]] = []
+        with self.data_lock:
+            for session, received, timestamp, size, cmd, obj, typed in decoded:
+                self.current_session = session
+                self.current_time = timestamp
+                self.current_size = size
+                self._run_handler(cmd, obj, typed)
+                # Nobody listening, don't build an event just to throw it away.
+                # Typed frames have no dict, nobody was listening when they were decoded
+                if obj is not None and self._has_callbacks(cmd):
+                    events.append((self._event(cmd, obj), received))
+                elif received:
+                    self.metrics.capture_to_callback.record(time.perf_counter() - received)
+            self.current_session = None
+            self._publish()
+
+        # Callbacks can take as long as they like, the parser isn't holding anything
+        for event, received in events:
+            self._notify_callbacks(event)
+            if received:
+                self.metrics.capture_to_callback.record(time.perf_counter() - received)
+        return bool(decoded)
+
+    def _publish(self):
+        self._pending["recent_frames"] = tuple(self.raw_json_data.tail(RECENT_FRAMES))
+        self._pending["decode_stats"] = {
+            cmd: {"seen": seen, "decoded": self.decoded_counts.get(cmd, 0)}
+            for cmd, seen in self.command_counts.most_common()
+        }
+        self._pending["sessions"] = {key: session.summary() for key, session in self.sessions.items()}
+        if self.aggregate is not None:
+            trackers = {key: session.tracker for key, session in self.sessions.items() if session.has_tracker}
+            trackers[None] = self.aggregate
+            self._pending["trackers"] = trackers
+        self._pending["buffer_usage"] = {
+            "raw_json_data": self.raw_json_data.usage(),
+            "stat_history": self.stat_history.usage(),
+            "monster_death": self.monster_death.usage(),
+            "item_drops": self.item_drops.usage(),
+            "added_item_drops": self.added_item_drops.usage(),
+        }
+        self.state = replace(self.state, **self._pending)
+        self._pending = {}
+
+    def _build_snapshot(self, tracker: DropTracker, aggregate: DropTracker, item_count: Optional[int]) -> Dict[str, Any]:
+        snapshot = tracker.snapshot(now=self.now(), item_count=item_count)
+
+        # All-time numbers count every client plus earlier sessions in the store
+        store = self.event_store
+        all_kills = aggregate.monster_kills + (store.monster_kills() if store is not None else 0)
+        snapshot["all_time_kills"] = all_kills
+        for name, stats in snapshot["items"].items():
+            stats["all_time_rate"] = None
+            if store is not None and all_kills:
+                drops = store.item_history(name)["drops"] + self.session_drops[name]
+                stats["all_time_rate"] = drops / all_kills * 100
+        return snapshot
+
+    def _decode(self, frame: bytes) -> Optional[Tuple[str, Optional[Dict[str, Any]], Any]]:
+        """cmd, "o" object and typed struct of a frame, None if it isn't wanted or isn't valid.
+
+        Either the object or the struct is None, the struct is only decoded
+        straight from the frame when no callback needs the object.
+        """
+        self.raw_json_data.append(frame)
+
+        match = _OBJ_CMD_PATTERN.search(frame)
+        if match is not None:
+            cmd = match.group(1).decode("utf-8", errors="replace")
+            if not self.wants(cmd):
+                self.command_counts[cmd] += 1
+                return None
+            typed = self.typed_decoders.get(cmd)
+            if typed is not None and not self._has_callbacks(cmd):
+                try:
+                    message = typed(frame)
+                except self.decode_errors:
+                    # Not the shape the struct expects, the dict path copes with anything
+                    pass
+                else:
+                    self.command_counts[cmd] += 1
+                    self.decoded_counts[cmd] += 1
+                    return cmd, None, message
+        else:
+            cmds = [c.decode("utf-8", errors="replace") for c in _CMD_PATTERN.findall(frame)]
+            if cmds and not any(self.wants(c) for c in cmds):
+                # Can't tell which is the message's own, the first is the best guess
+                self.command_counts[cmds[0]] += 1
+                return None
+
+        try:
+            parsed_json = self.loads(frame)
+            obj = parsed_json.get("b", {}).get("o", {})
+            obj_cmd = obj.get("cmd", "unknown")
+        except (AttributeError, *self.decode_errors):
+            # Not JSON, or JSON that isn't a message
+            self.command_counts["unknown"] += 1
+            self.metrics.decode_errors += 1
+            return None
+        self.command_counts[obj_cmd] += 1
+        self.decoded_counts[obj_cmd] += 1
+        return obj_cmd, obj, None
+
+    def _handle_aura_passive(self, obj: Dict[str, Any]):
+        auras = obj.get("auras", [])
+        # A new dict, the published one may be in use by the UI
+        aura_data = dict(self._pending.get("aura_data", self.state.aura_data))
+        for aura in auras:
+            aura_data[aura["nam"]] = {
+                "effects": aura.get("e", []),
+                "timestamp": self.current_time,
+            }
+        self._pending["aura_data"] = aura_data
+
+    def _handle_skill_data(self, obj: Dict[str, Any]):
+        actives = obj.get("actions", {}).get("active", {})
+        if debug_enabled():
+            logging.debug(f"Active skills found: {actives}")
+        self._pending["skill_data"] = {"skills": actives, "timestamp": self.current_time}
+
+    def _handle_stat_update(self, update: StatUpdate):
+        stats = update.stats
+        entry = {"stats": stats, "timestamp": self.current_time}
+        self.stat_history.append(entry, self.current_size)
+        self._pending["latest_stats"] = entry
+        if self.current_session is not None:
+            self.current_session.latest_stats = stats
+
+    def _handle_combat(self, combat: Combat):
+        current_checks = combat.aura_changes
+        for i, item in enumerate(current_checks):
+            if i == 0:
+                continue
+            if item == current_checks[i - 1]:
+                self._writer_for_auras().write(combat.obj)
+
+    def _writer_for_auras(self) -> BackgroundWriter:
+        if self.aura_writer is None:
+            output = self.output
+            self.aura_writer = BackgroundWriter(
+                output.get("instance_auras", "instance_auras.json"),
+                serialize=_pretty_json,
+                batch_size=output.get("batch_size", 200),
+                flush_interval=output.get("flush_interval", 1.0),
+                max_bytes=output.get("max_bytes", 10 << 20),
+                backups=output.get("backups", 5),
+            )
+        return self.aura_writer
+
+    def _handle_item_update(self, obj: Dict[str, Any]):
+        items = obj.get("o", {})
+        self._pending["item_data"] = {"items": items, "timestamp": self.current_time}
+
+    def _trackers(self) -> List[DropTracker]:
+        if self.aggregate is None:
+            self.aggregate = DropTracker.from_config(self.conf)
+        if self.current_session is None:
+            return [self.aggregate]
+        return [self.current_session.tracker, self.aggregate]
+
+    def _handle_monster_death(self, kill: MonsterDeath):
+        timestamp = self.current_time
+        self.monster_death.append({"obj": kill, "timestamp": timestamp}, self.current_size)
+        for tracker in self._trackers():
+            tracker.record_death(kill, timestamp)
+        if self.event_store is not None:
+            self.event_store.record_kill(timestamp, kill.monster_id, kill.typ, kill.gold, kill.exp, kill.rep)
+
+    def _handle_drop_item(self, drop: ItemDrop):
+        timestamp = self.current_time
+        self.item_drops.append({"obj": drop, "timestamp": timestamp}, self.current_size)
+        for tracker in self._trackers():
+            tracker.record_drops(drop, timestamp)
+        if self.event_store is not None:
+            for item in drop.items:
+                self.session_drops[item.name] += 1
+                self.event_store.record_drop(timestamp, item.item_id, item.name, item.quantity)
+
+    def _handle_add_item(self, obj: Dict[str, Any]):
+        self.added_item_drops.append({"obj": obj, "timestamp": self.current_time}, self.current_size)
+
     def _process_packets(self):
         while self.running:
-            if not self.packet_queue.empty():
-                logging.debug("Got packet from queue")
-                packet = self.packet_queue.get()
-                payload = packet[Raw].load
-                clean_payload = payload.replace(b"\x00", b"").decode(
-                    "utf-8", errors="ignore"
-                )
-                logging.debug(f"Length of payload: {len(clean_payload)}")
-                # This check is so that if the server somehow "forgets" (it does)
-                # It doesn't add any data from the previous completed buffer
-                if len(clean_payload) <= len(self.last_obj):
-                    if (
-                        clean_payload == self.last_obj[-len(clean_payload) :]
-                        and self.check_last
-                    ):
-                        continue
-                logging.debug("Locking in process packet")
-                with self.data_lock:
-                    # Bad check but necessary because unpredictability
-                    if len(self.buffer) > 15000:
-                        self.buffer = ""
-                    self.buffer += clean_payload
-                    logging.debug(f"Buffer Size: {len(self.buffer)}")
-                    if len(self.buffer) > 1024:
-                        logging.debug(f"OUTPUTTED BUFFER: {self.get_buffer()}")
-
-                    logging.debug("Gathering json objects from queue packet")
-                    json_objects, self.buffer = self.extract_json_objects(self.buffer)
-
-                    for obj in json_objects:
-                        try:
-                            self.last_obj = obj
-                            self.check_last = True
-                            parsed_json = json.loads(obj)
-                            logging.debug(f"Parsing json data: {parsed_json}")
-
-                            event = self.parse_data(parsed_json)
-                            logging.debug(f"Finished parsing data")
-                            self._notify_callbacks(event)
-                            logging.debug("Notified callbacks")
-                        except json.JSONDecodeError:
-                            continue
-                logging.debug("Unlocked")
+            try:
+                batch = [self.packet_queue.get(timeout=0.5)]
+            except Empty:
+                self._expire_flows()
+                continue
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.packet_queue.get_nowait())
+                except Empty:
+                    break
+
+            try:
+                self._process_batch(batch)
+            finally:
+                for _ in batch:
+                    self.packet_queue.task_done()
+            self._expire_flows()
         logging.debug(f"No longer Running: {self.running}")
 
+    def _process_packet(self, record: PacketRecord):
+        self._process_batch([record])
+
+    def _process_batch(self, batch: List[PacketRecord]):
+        started = time.perf_counter()
+        self.metrics.batches += 1
+        frames: List[tuple[bytes, float, float, ClientSession]] = []
+        for record in batch:
+            self.capture_clock = record.timestamp
+            session, extracted = self._extract_frames(record)
+            for frame in extracted:
+                frames.append((frame, record.received, record.timestamp, session))
+        if not frames:
+            return
+        self.metrics.frames_extracted += len(frames)
+
+        # Only JSON messages are handled, skip %xt% and xml ones
+        if self._handle_frames([item for item in frames if item[0][0] == 0x7B]):
+            # Once per batch, the UI wakes up and redraws whatever changed
+            self.notifier.notify()
+        self.metrics.batch_processing.record(time.perf_counter() - started)
+
+    def _process_shared_frames(self):
+        ring = self.ring
+        while self.running:
+            # Checked before reading, anything written before done was set gets read
+            done = self.process_done.is_set()
+            records = ring.read(self.batch_size)
+            if not records:
+                if done:
+                    break
+                # Cleared and read again so a write in between isn't slept through
+                self.data_ready.clear()
+                records = ring.read(self.batch_size)
+                if not records:
+                    self.data_ready.wait(0.5)
+                    self._expire_flows()
+                    continue
+            self._process_shared_batch(records)
+            self._expire_flows()
+        logging.debug("Capture process finished")
+        self.capture_done.set()
+
+    def _process_shared_batch(self, records: List[bytes]):
+        from .capture_process import KIND_CLOSED, unpack_record
+
+        started = time.perf_counter()
+        self.metrics.batches += 1
+        now = time.time()
+        frames: List[Tuple[bytes, float, float, Optional[ClientSession]]] = []
+        for record in records:
+            key, received, timestamp, kind, frame = unpack_record(record)
+            if kind == KIND_CLOSED:
+                self._close_flow(key)
+                continue
+            session = self.flow_sessions.get(key)
+            if session is None:
+                session = self._session(key, now)
+            session.bytes += len(frame)
+            session.frames += 1
+            session.last_seen = now
+            self.metrics.frames_extracted += 1
+            self.capture_clock = timestamp
+            frames.append((frame, received, timestamp, session))
+        if self._handle_frames(frames):
+            self.notifier.notify()
+        self.metrics.batch_processing.record(time.perf_counter() - started)
+
+    def _session(self, key: FlowKey, now: float) -> ClientSession:
+        client = session_key(key, SERVER_PORT)
+        session = self.sessions.get(client)
+        if session is None or session.closed:
+            session = ClientSession(client, self.max_buffer_size, lambda: DropTracker.from_config(self.conf))
+            session.first_seen = now
+            with self.data_lock:
+                self.sessions[client] = session
+            logging.debug(f"New client session {session.label}")
+        self.flow_sessions[key] = session
+        return session
+
+    def _extract_frames(self, record: PacketRecord) -> tuple[Optional[ClientSession], List[bytes]]:
+        flags = record.flags
+        key: FlowKey = (record.src, record.sport, record.dst, record.dport)
+
+        data = self.reassembler.feed(
+            key,
+            record.seq,
+            record.payload,
+            syn=bool(flags & TCP_SYN),
+            fin=bool(flags & (TCP_FIN | TCP_RST)),
+        )
+        if not data:
+            if flags & (TCP_FIN | TCP_RST):
+                self._close_flow(key)
+            return None, []
+
+        session, frames = self._frame_data(key, data)
+        if flags & (TCP_FIN | TCP_RST):
+            self._close_flow(key)
+        return session, frames
+
+    def _frame_data(self, key: FlowKey, data: bytes) -> tuple[ClientSession, List[bytes]]:
+        self.metrics.bytes_extracted += len(data)
+        now = time.time()
+        session = self.flow_sessions.get(key)
+        if session is None:
+            session = self._session(key, now)
+        session.bytes += len(data)
+        session.last_seen = now
+        frames = session.framer(key).feed(data)
+        session.frames += len(frames)
+        return session, frames
+
+    def _close_flow(self, key: FlowKey):
+        session = self.flow_sessions.pop(key, None)
+        if session is None:
+            return
+        session.framers.pop(key, None)
+        # A new connection from the same client port starts a new session
+        session.closed = True
+
+    def _expire_flows(self):
+        now = time.time()
+        # The capture process skips gaps and closes expired flows itself
+        if self.capture_process is None and now - self.last_gap_check >= self.reassembler.gap_timeout:
+            self.last_gap_check = now
+            self._release_gaps(now)
+        if now - self.last_flow_expiry < 60:
+            return
+        self.last_flow_expiry = now
+        with self.data_lock:
+            expired = [k for k, s in self.sessions.items() if now - s.last_seen > self.session_timeout]
+            for client in expired:
+                del self.sessions[client]
+            if expired:
+                self._publish()
+        for cache_key in list(self._snapshots):
+            if cache_key[0] is not None and cache_key[0] not in self.sessions:
+                self._snapshots.pop(cache_key, None)
+
+    def _release_gaps(self, now: float):
+        """Frame what flows stuck behind a lost segment delivered once it was skipped."""
+        released = self.reassembler.expire(now)
+        for key in [k for k in self.flow_sessions if k not in self.reassembler.flows]:
+            self.flow_sessions.pop(key).framers.pop(key, None)
+        if not released:
+            return
+        received = time.perf_counter()
+        timestamp = self.capture_clock or now
+        frames: List[tuple[bytes, float, float, ClientSession]] = []
+        for key, data in released.items():
+            session, extracted = self._frame_data(key, data)
+            frames.extend((frame, received, timestamp, session) for frame in extracted)
+        self.metrics.frames_extracted += len(frames)
+        if self._handle_frames([item for item in frames if item[0][0] == 0x7B]):
+            self.notifier.notify()
+
     def get_buffer(self) -> str:
-        return self.buffer
+        return "\n".join(
+            f"{key}: {bytes(framer.buffer).decode('utf-8', errors='replace')}"
+            for session in list(self.sessions.values())
+            for key, framer in list(session.framers.items())
+        )
 
     def get_latest_stats(self) -> Dict[str, Any]:
-        with self.data_lock:
-            return self.stat_history[-1] if self.stat_history else {}
+        return self.state.latest_stats
 
     def get_skill_data(self) -> Dict[str, Any]:
-        with self.data_lock:
-            return self.skill_data
+        return self.state.skill_data
 
     def get_aura_data(self) -> Dict[str, Any]:
-        with self.data_lock:
-            return self.aura_data
+        return self.state.aura_data
 
     def get_potion_data(self) -> Dict[str, Any]:
-        with self.data_lock:
-            return self.item_data
-
-    def get_recent_logs(self, count: int = 100) -> List[str]:
-        with self.data_lock:
-            return self.raw_json_data[-count:]
+        return self.state.item_data
+
+    def get_recent_logs(self, count: int = RECENT_FRAMES) -> List[str]:
+        frames = self.state.recent_frames[-count:] if count > 0 else ()
+
+        logs = []
+        for frame in frames:
+            try:
+                logs.append(json.dumps(json.loads(frame), indent=4))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                logs.append(frame.decode("utf-8", errors="replace"))
+        return logs
+
+    def get_buffer_usage(self) -> Dict[str, Dict[str, int]]:
+        """Current and peak memory of each history buffer, as of the last batch."""
+        return self.state.buffer_usage
+
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = self.metrics
+        result = {
+            "backend_name": self.backend.name if self.backend else "N/A",
+            "packets_seen": metrics.packets_seen,
+            "packets_filtered": self.rejected_packets,
+            "packets_queued": metrics.packets_queued,
+            "packets_dropped": self.dropped_packets,
+            "queue_depth": self.packet_queue.qsize(),
+            "queue_capacity": self.packet_queue.maxsize,
+            "queue_high_water": self.queue_high_water,
+            "bytes_extracted": metrics.bytes_extracted,
+            "frames_extracted": metrics.frames_extracted,
+            "decode_errors": metrics.decode_errors,
+            "duplicate_segments": self.reassembler.duplicate_segments,
+            "flows": len(self.reassembler.flows),
+            "sessions": len(self.sessions),
+            "batches": metrics.batches,
+            "ui_notifications": self.notifier.notifications,
+            "ui_wakeups": self.notifier.wakeups,
+            "subscribers": self.get_subscriber_stats(),
+            "outputs": {"instance_auras": self.aura_writer.stats()} if self.aura_writer is not None else {},
+            "capture_to_callback": metrics.capture_to_callback.summary(),
+            "batch_processing": metrics.batch_processing.summary(),
+            "backend": self.backend.stats() if self.backend else {},
+            "store": {
+                "written": store.written,
+                "backlog": store.backlog(),
+                "batches": store.batches,
+                "errors": store.write_errors,
+            }
+            if (store := self.event_store) is not None
+            else {},
+        }
+        ring = self.ring
+        if self.capture_process is not None and ring is not None:
+            # Counted by the capture process, the queue isn't used at all
+            counters = ring.counters()
+            result.update(
+                backend_name="process",
+                packets_seen=counters["packets"],
+                packets_dropped=counters["dropped"],
+                bytes_extracted=counters["bytes"],
+                backend={"oversized frames": counters["oversized"]},
+                queue_depth=ring.used(),
+                queue_capacity=ring.capacity,
+                flows=len(self.flow_sessions),
+            )
+        return result
+
+    def get_decode_stats(self) -> Dict[str, Dict[str, int]]:
+        """Frames seen and frames actually decoded, per command, as of the last batch."""
+        return self.state.decode_stats
+
+    def get_subscriber_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Backlog, lag and drops of each subscriber."""
+        return {s.name: s.stats() for s in self.state.subscriptions}
+
+    def now(self) -> float:
+        """The capture's current time, for a replay the time its newest packet was captured."""
+        if self.replay_file and self.capture_clock:
+            return self.capture_clock
+        return time.time()
+
+    def get_sessions(self) -> Dict[SessionKey, Dict[str, Any]]:
+        """Summary of each client session, oldest first, as of the last batch."""
+        return self.state.sessions
+
+    def get_tracker(self, key: Optional[SessionKey] = None) -> Optional[DropTracker]:
+        """A session's drop tracker, or the aggregate of every session when key is None.
+
+        As of the last batch, a session that just saw its first kill may not be there yet.
+        """
+        return self.state.trackers.get(key)
+
+    def get_snapshot(self, key: Optional[SessionKey] = None, item_count: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Resource Monitor numbers for a session, or every session when key is None.
+
+        None until that session has seen a kill or drop. Items are the most
+        recently dropped first, item_count keeps only that many of them.
+
+        Built here, not by the parser, and only for what is asked for. The
+        same dicts are returned until the tracker changes or SNAPSHOT_INTERVAL
+        passes, so they mustn't be modified.
+        """
+        trackers = self.state.trackers
+        tracker = trackers.get(key)
+        if tracker is None:
+            return None
+        aggregate = trackers[None]
+        # Read before building, a kill recorded meanwhile makes the next call rebuild
+        versions = (tracker.version, aggregate.version)
+        now = time.monotonic()
+        cache_key = (key, item_count)
+        cached = self._snapshots.get(cache_key)
+        if cached is not None and cached[0] == versions and now - cached[1] < SNAPSHOT_INTERVAL:
+            return cached[2]
+        snapshot = self._build_snapshot(tracker, aggregate, item_count)
+        self._snapshots[cache_key] = (versions, now, snapshot)
+        return snapshot
@@ -1,3 +1,4 @@
 from .class_skills import *
 from .drops import *
 from .server_select import *
+from .pipeline import *
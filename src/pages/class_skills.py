@@ -1,6 +1,8 @@
+from ..class_cache import CLASS_COMMANDS, ClassDataCache, content_hash
+from ..config import load_config
 from ..packet_capture import PacketCapture, PacketType, GameEvent
 import logging
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import curses
 from ..ui import Box
 
@@ -13,54 +15,84 @@ class ClassSkillsPage:
         self.skill_boxes: List[Box] = []
         self.passive_boxes: List[Box] = []
         self.selected_index = 0  # Index of the currently selected box
+        self.full_redraw = True
+        # Hash of the data each box shows, a box is only touched when it changes
+        self.shown: Dict[Box, str] = {}
         self.setup_boxes()
         self.packet_capture.register_callback(PacketType.SKILL_DATA, self.update_skills)
         self.packet_capture.register_callback(PacketType.ITEM_UPDATE, self.update_pots)
         self.packet_capture.register_callback(PacketType.AURA_PASSIVE, self.update_passives)
+
+        # Shows the last class used until the server sends anything
+        self.cache = ClassDataCache.from_config(load_config())
+        if self.cache is not None:
+            self.load_cached()
+            # Not coalesced, that would reorder a class change and its passives
+            self.packet_capture.subscribe(CLASS_COMMANDS, self.cache.record, name="class cache")
         logging.info("ClassSkillsPage initialized")
 
+    def load_cached(self):
+        cached = self.cache.last()
+        shows = {"sAct": self.show_skills, "aura+p": self.show_passives, "seia": self.show_pots}
+        for cmd, show in shows.items():
+            if cmd in cached:
+                show(cached[cmd]["data"])
+        logging.debug(f"Loaded cached class data: {list(cached)}")
+
+    def show(self, box: Box, source: Any, content: Dict[str, str], full_content: Optional[Dict[str, Any]] = None) -> bool:
+        """Puts content in box unless source is what it already shows."""
+        digest = content_hash(source)
+        if self.shown.get(box) == digest:
+            return False
+        self.shown[box] = digest
+        box.update_content(content, full_content)
+        return True
+
     def setup_boxes(self):
+        """Lays the boxes out for the window's size, existing boxes keep their content."""
         height, width = self.window.getmaxyx()
         box_height = 8
         box_width = width // 3 - 4
 
-        # Create 6 boxes in a 2x3 grid
-        c = 0
+        # 6 boxes in a 2x3 grid, then the passives below the last column
+        skill_places = []
         for i in range(2):  # rows
             for j in range(3):  # columns
-                c += 1
-                y = 3 + i * (box_height + 1)
-                x = 2 + j * (box_width + 4)
-                if i == 1 and j == 2:
-                    self.skill_boxes.append(Box(self.window, y, x, box_height, box_width, title=f"Potion {c}"))
-                else:
-                    self.skill_boxes.append(Box(self.window, y, x, box_height, box_width, title=f"Skill {c}"))
-        
-        c = 0
-    
-        last_skill_box = self.skill_boxes[-1] 
-        passive_x = last_skill_box.x  
-        passive_start_y = last_skill_box.y + box_height 
-
-        for i in range(3):
-            c += 1
-            y = passive_start_y + i * (box_height + 1)
-            self.passive_boxes.append(Box(self.window, y, passive_x, box_height, box_width, title=f"Passive {c}"))
-        
-        self.skill_boxes[0].selected = True
-        self.full_content = Box(self.window, 20, 2, 26, 2 * (box_width) + 4, title="Raw Data")
+                skill_places.append((3 + i * (box_height + 1), 2 + j * (box_width + 4)))
+        passive_x = skill_places[-1][1]
+        passive_start_y = skill_places[-1][0] + box_height
+        passive_places = [(passive_start_y + i * (box_height + 1), passive_x) for i in range(3)]
+        full_width = 2 * (box_width) + 4
+
+        if self.skill_boxes:
+            for box, (y, x) in zip(self.skill_boxes, skill_places):
+                box.resize(y, x, box_height, box_width)
+            for box, (y, x) in zip(self.passive_boxes, passive_places):
+                box.resize(y, x, box_height, box_width)
+            self.full_content.resize(20, 2, 26, full_width)
+            return
+
+        for c, (y, x) in enumerate(skill_places, start=1):
+            title = f"Potion {c}" if c == 6 else f"Skill {c}"
+            self.skill_boxes.append(Box(self.window, y, x, box_height, box_width, title=title))
+        for c, (y, x) in enumerate(passive_places, start=1):
+            self.passive_boxes.append(Box(self.window, y, x, box_height, box_width, title=f"Passive {c}"))
 
+        self.skill_boxes[0].selected = True
+        self.full_content = Box(self.window, 20, 2, 26, full_width, title="Raw Data")
 
     def update_passives(self, event: GameEvent):
 
         logging.debug(f"Received event: {event}")
         logging.debug(f"Full event data: {event.data}")
+        self.show_passives(event.data)
 
+    def show_passives(self, data: Dict[str, Any]):
         try:
             logging.debug("Doing Passive Update")
-            logging.debug(f"Passive data here: {event.data}")
-            auras = event.data.get("auras", [])
-            for i, aura in enumerate(auras):
+            logging.debug(f"Passive data here: {data}")
+            auras = data.get("auras", [])
+            for i, aura in enumerate(auras[: len(self.passive_boxes)]):
                 # Process the stat modifications
                 stat_details = []
                 for effect in aura.get("e", []):
@@ -73,7 +105,9 @@ class ClassSkillsPage:
                 stats_text = ", ".join(stat_details) if stat_details else "N/A"
 
                 # Update the box content
-                self.passive_boxes[i].update_content(
+                self.show(
+                    self.passive_boxes[i],
+                    aura,
                     {
                         "Passive Name": aura.get("nam", "N/A"),
                         "Stats": stats_text
@@ -88,11 +122,12 @@ class ClassSkillsPage:
 
         logging.debug(f"Received event: {event}")
         logging.debug(f"Full event data: {event.data}")
+        self.show_pots(event.data)
 
-
+    def show_pots(self, message: Dict[str, Any]):
         try:
             logging.debug("Doing Item Update")
-            data = event.data.get("o")
+            data = message.get("o")
             logging.debug(f"{data}")
             if data:
                 content = {
@@ -100,7 +135,7 @@ class ClassSkillsPage:
                     "Targets": str(data.get("tgtMin", "N/A")),
                     "Damage": str(data.get("damage", "N/A"))
                 }
-                self.skill_boxes[-1].update_content(content, data)
+                self.show(self.skill_boxes[-1], data, content, data)
             else:
                 logging.debug("fail")
             
@@ -111,10 +146,11 @@ class ClassSkillsPage:
     def update_skills(self, event: GameEvent):
         logging.debug(f"Received event: {event}")
         logging.debug(f"Full event data: {event.data}")
+        self.show_skills(event.data)
 
-
+    def show_skills(self, data: Dict[str, Any]):
         try:
-            actions = event.data.get("actions", {})
+            actions = data.get("actions", {})
             logging.debug(f"Actions data: {actions}")
 
             active_skills = actions.get("active", [])
@@ -136,7 +172,7 @@ class ClassSkillsPage:
                             "Cooldown": str(skill.get("cd", "N/A")),
                             "Mana": str(skill.get("mp", "N/A")),
                         }
-                        self.skill_boxes[i].update_content(content, skill)
+                        self.show(self.skill_boxes[i], skill, content, skill)
 
                         logging.debug(f"Updated box {i} with content: {content}")
                 self.send_full_content()
@@ -146,12 +182,19 @@ class ClassSkillsPage:
             logging.error(f"Error in update_skills: {str(e)}", exc_info=True)
 
 
+    def invalidate(self):
+        self.full_redraw = True
+
     def draw(self):
-        self.window.erase()
-        height, width = self.window.getmaxyx()
+        if self.full_redraw:
+            self.full_redraw = False
+            self.window.erase()
+            height, width = self.window.getmaxyx()
 
-        title = "Current Class Data"
-        self.window.addstr(1, (width - len(title)) // 2, title, curses.A_BOLD | curses.color_pair(1) )
+            title = "Current Class Data"
+            self.window.addstr(1, (width - len(title)) // 2, title, curses.A_BOLD | curses.color_pair(1) )
+            for box in [*self.skill_boxes, *self.passive_boxes, self.full_content]:
+                box.invalidate()
 
         for box in self.skill_boxes:
             box.draw()
@@ -159,9 +202,8 @@ class ClassSkillsPage:
         for box in self.passive_boxes:
             box.draw()
         self.full_content.draw()
-    
 
-        self.window.refresh()
+        self.window.noutrefresh()
 
     def handle_input(self) -> Optional[str|int]:
         key = self.window.getch()
@@ -1,164 +1,60 @@
 import curses
-from dataclasses import dataclass
-from typing import Dict, Optional
-from ..packet_capture import GameEvent, PacketCapture, PacketType
+from typing import Dict, List, Optional
+from ..config import load_config
+from ..drop_tracker import RATE_METRICS
+from ..packet_capture import PacketCapture
+from ..session import SessionKey
 from ..ui import Box, DropBox
-import time
 import logging
 import math
-import toml
-import scipy
-import numpy as np
-
-@dataclass
-class ItemDrop:
-    name: str
-    amount: int
-    time_dropped: int
-    
+
+NO_RATES = {"1m": 0.0, "5m": 0.0, "1h": 0.0, "session": 0.0}
+EMPTY_SNAPSHOT = {
+    "session_time": 0,
+    "kills": 0,
+    "gold": 0,
+    "exp": 0,
+    "rep": 0,
+    "all_time_kills": 0,
+    "rates": {metric: NO_RATES for metric in RATE_METRICS},
+    "items": {},
+}
+
+
 class DropsPage:
     def __init__(self, window: "curses.window", packet_capture: PacketCapture):
-        self.drops: Dict[str, ItemDrop] = {}
         self.window = window
         self.packet_capture = packet_capture
         self.setup_boxes()
-        conf = toml.load("./config.toml")
-        self.rates_expiry = conf['drops'].get("rates_expiry", 60)
-        self.drops_expiry = conf['drops'].get("drops_expiry", 3600)
+        conf = load_config()
         self.margin_error = conf['drops'].get("margin_error", 0.02)
         self.z_score = conf['drops'].get("z_score", 1.96)
-        self.total_gold = 0
-        self.total_exp = 0
-        self.total_rep = 0
-        self.monster_kills = 0
-        self.last_kill_time = 0
-        self.item_stats = {}  # {item_name: {"drop_count": int, "quantity_dropped": int, "estimated_drop_rate": float, "kills_until_90": float}}
-        self.first_kill = True
-        self.start_time = 0
+        # Client session being shown, None adds every session together
+        self.selected_session: Optional[SessionKey] = None
+        self.session_label = "All clients"
         self.elapsed_time = 0
-
-
-        self.packet_capture.register_callback(PacketType.MONSTER_DEATH, self.death_update)
-        self.packet_capture.register_callback(PacketType.DROP_ITEM, self.drop_update)
-
-    
-    def drop_update(self, event: GameEvent):
-        try:
-            data = event.data["items"]
-            current_time = time.time()
-            for item_id, item_data in data.items():
-                item_name = item_data["sName"]
-                quantity = item_data["iQty"]
-
-                if item_name not in self.item_stats:
-                    self.item_stats[item_name] = {
-                        "drop_count": 0,
-                        "quantity_dropped": 0,
-                        "estimated_drop_rate": 0.0,
-                        "kills_until_90": float("inf"),
-                        "last_drop_time": current_time,
-                        "drops_per_second": 0.0,
-                        "drops_per_minute": 0.0,
-                        "drops_per_hour": 0.0
-                    }
-
-                self.item_stats[item_name]["drop_count"] += 1
-                self.item_stats[item_name]["quantity_dropped"] += quantity
-                self.item_stats[item_name]["last_drop_time"] = current_time
-
-                
-            for item_name in list(self.item_stats.keys()):
-                if current_time - self.item_stats[item_name]["last_drop_time"] > self.drops_expiry:
-                    del self.item_stats[item_name]
-
-        except Exception as e:
-            logging.error(f"Error in processing drop event: {e}")
-
-
-    def death_update(self, event: GameEvent):
-        # try:
-        data = event.data
-        current_time = time.time()
-
-        self.total_gold += data.get("intGold", 0)
-        self.total_exp += data.get("intExp", 0)
-        self.total_rep += data.get("iRep", 0)
-        logging.debug(f"Death update data: {data}")
-        if data['typ'] == "m":
-            if self.first_kill:
-                self.start_time = current_time
-                self.first_kill = False
-            self.monster_kills += 1
-            self.last_kill_time = current_time
-
-
-
-        
-
-        for item_name, stats in self.item_stats.items():
-            drop_count = stats["drop_count"]
-            if self.monster_kills > 0:
-                stats["estimated_drop_rate"] = (drop_count / self.monster_kills) * 100
-                p = drop_count / self.monster_kills
-                if p == 1:
-                    p = 0.9999
-                if p > 0:
-                    logging.debug(f"P value: {p}")
-                    stats["kills_until_90"] = math.ceil(math.log(1 - 0.9) / math.log(1 - p))
-                else:
-                    stats["kills_until_90"] = float("inf")
-
-        logging.debug(f"Monster death data: {data}")
-        logging.debug(f"Total gold: {self.total_gold}, Total experience: {self.total_exp}")
-        # except Exception as e:
-        #     logging.error(f"Error in processing monster death event: {e}")
-
-    def get_rates(self) -> Dict[str, float]:
-        current_time = time.time()
-
-        
-
-        if self.last_kill_time and current_time - self.last_kill_time > self.rates_expiry:
-            for item_name in list(self.item_stats.keys()):
-                self.item_stats[item_name]['drop_count'] = 0 
-            self.monster_kills = 0
-            self.total_exp = 0
-            self.total_gold = 0
-            self.total_rep = 0
-            self.first_kill = True
-            return {"gps": 0, "gpm": 0, "gph": 0, "eps": 0, "epm": 0, "eph": 0, "rps": 0, "rpm": 0, "rph": 0, "kps": 0, "kpm": 0, "kph": 0}
-
-        self.elapsed_time = current_time - self.start_time
-        if self.elapsed_time == 0:  
-            return {"gps": 0, "gpm": 0, "gph": 0, "eps": 0, "epm": 0, "eph": 0, "rps": 0, "rpm": 0, "rph": 0, "kps": 0, "kpm": 0, "kph": 0}
-
-        gps = self.total_gold / self.elapsed_time
-        gpm = gps * 60
-        gph = gps * 3600
-
-        eps = self.total_exp / self.elapsed_time
-        epm = eps * 60
-        eph = eps * 3600
-
-        rps = self.total_rep / self.elapsed_time
-        rpm = rps * 60
-        rph = rps * 3600
-
-        kps = self.monster_kills / self.elapsed_time
-        kpm = kps * 60
-        kph = kps * 3600
-
-        for item_name in list(self.item_stats.keys()):
-            if not self.first_kill:
-                elapsed = current_time - self.start_time
-                if elapsed > 0:
-                    drops_per_second = self.item_stats[item_name]["quantity_dropped"] / elapsed
-                    self.item_stats[item_name]["drops_per_second"] = drops_per_second
-                    self.item_stats[item_name]["drops_per_minute"] = drops_per_second * 60
-                    self.item_stats[item_name]["drops_per_hour"] = drops_per_second * 3600
-
-
-        return {"gps": gps, "gpm": gpm, "gph": gph, "eps": eps, "epm": epm, "eph": eph, "rps": rps, "rpm": rpm, "rph": rph, "kps": kps, "kpm": kpm, "kph": kph}
+        self.full_redraw = True
+        self.drawn_label: Optional[str] = None
+
+    def switch_session(self, step: int):
+        sessions = self.packet_capture.get_sessions()
+        choices: List[Optional[SessionKey]] = [None, *sessions]
+        index = choices.index(self.selected_session) if self.selected_session in choices else 0
+        self.selected_session = choices[(index + step) % len(choices)]
+        if self.selected_session is None:
+            self.session_label = "All clients"
+        else:
+            self.session_label = sessions[self.selected_session]["label"]
+        logging.debug(f"Resource monitor showing: {self.session_label}")
+
+    @staticmethod
+    def rate_content(label: str, rates: Dict[str, float]) -> Dict[str, str]:
+        return {
+            f"{label}/h (1m)": f"{rates['1m']:.2f}",
+            f"{label}/h (5m)": f"{rates['5m']:.2f}",
+            f"{label}/h (1h)": f"{rates['1h']:.2f}",
+            f"{label}/h (session)": f"{rates['session']:.2f}",
+        }
 
     def setup_boxes(self):
         height, width = self.window.getmaxyx()
@@ -243,136 +139,108 @@ class DropsPage:
             title="Drop Stats"
         )
 
-    def required_kills(self, observed_rate, z_score, margin_of_error):
-        p = observed_rate
-        q = 1 - p
-        n = (z_score**2 * p * q) / (margin_of_error**2)
-        return int(np.ceil(n))
+    @property
+    def boxes(self):
+        return [self.math_box, self.gold_box, self.exp_box, self.drop_box, self.rep_box, self.kill_box, self.stats_box]
 
+    def invalidate(self):
+        self.full_redraw = True
 
     def draw(self):
-        self.window.erase()
         height, width = self.window.getmaxyx()
-        title = "Resource Monitor"
-        self.window.addstr(1, (width - len(title)) // 2, title, curses.A_BOLD | curses.color_pair(1) )
-
-        rates = self.get_rates()
-
-        self.gold_box.update_content(
-            {
-                "Gold/s": f"{rates['gps']:.2f}",
-                "Gold/m": f"{rates['gpm']:.2f}",
-                "Gold/h": f"{rates['gph']:.2f}",
-            }
-        )
-
-        self.exp_box.update_content(
-            {
-                "Exp/s": f"{rates['eps']:.2f}",
-                "Exp/m": f"{rates['epm']:.2f}",
-                "Exp/h": f"{rates['eph']:.2f}",
-            }
-        )
-
-        self.rep_box.update_content(
-            {
-                "Rep/s": f"{rates['rps']:.2f}",
-                "Rep/m": f"{rates['rpm']:.2f}",
-                "Rep/h": f"{rates['rph']:.2f}",
-            }
-        )
-
-        self.kill_box.update_content(
-            {
-                "Kill/s": f"{rates['kps']:.2f}",
-                "Kill/m": f"{rates['kpm']:.2f}",
-                "Kill/h": f"{rates['kph']:.2f}"
-            }
-        )
+        if self.full_redraw:
+            self.full_redraw = False
+            self.drawn_label = None
+            self.window.erase()
+            title = "Resource Monitor"
+            self.window.addstr(1, (width - len(title)) // 2, title, curses.A_BOLD | curses.color_pair(1) )
+            for box in self.boxes:
+                box.invalidate()
+
+        if self.session_label != self.drawn_label:
+            self.drawn_label = self.session_label
+            subtitle = f"< {self.session_label} >"
+            self.window.move(2, 0)
+            self.window.clrtoeol()
+            self.window.addstr(2, (width - len(subtitle)) // 2, subtitle, curses.color_pair(2))
+
+        self.update_boxes()
+
+        for box in self.boxes:
+            box.draw()
+
+        self.window.noutrefresh()
+
+    def update_boxes(self):
+        # The numbers come from the capture, this only formats them
+        snapshot = self.packet_capture.get_snapshot(self.selected_session, item_count=4) or EMPTY_SNAPSHOT
+        rates = snapshot["rates"]
+        self.elapsed_time = snapshot["session_time"]
+
+        self.gold_box.update_content(self.rate_content("Gold", rates["gold"]))
+        self.exp_box.update_content(self.rate_content("Exp", rates["exp"]))
+        self.rep_box.update_content(self.rate_content("Rep", rates["rep"]))
+        self.kill_box.update_content(self.rate_content("Kill", rates["kills"]))
 
         hours, remainder = divmod(int(self.elapsed_time), 3600)
         minutes, seconds = divmod(remainder, 60)
         self.stats_box.update_content(
             {
                 "Time": f"{hours}:{minutes}:{seconds}",
-                "Kills": f"{self.monster_kills}",
-                "Gold": f"{self.total_gold}",
-                "Exp": f"{self.total_exp}",
-                "Rep": f"{self.total_rep}",
+                "Kills": f"{snapshot['kills']}",
+                "Gold": f"{snapshot['gold']}",
+                "Exp": f"{snapshot['exp']}",
+                "Rep": f"{snapshot['rep']}",
+                "All-time Kills": f"{snapshot['all_time_kills']}",
             }
         )
-        sorted_items = sorted(
-            self.item_stats.items(),
-            key=lambda x: x[1]['last_drop_time'],
-            reverse=True
-        )
 
+        shown = snapshot["items"]
         drop_content = {}
-        for i, (item_name, stats) in enumerate(sorted_items[:5]):
+        for item_name, stats in shown.items():
+            all_time = stats["all_time_rate"]
             drop_content[item_name] = {
                 "Drop Rate": f"{stats['estimated_drop_rate']:.2f}%",
+                "All-time Rate": "N/A" if all_time is None else f"{all_time:.3f}%",
                 "Next Drop": f"~ {stats['kills_until_90']} kills",
-                "Drop/s": f"{stats['drops_per_second']:.2f}",
-                "Drop/m": f"{stats['drops_per_minute']:.2f}",
-                "Drop/h": f"{stats['drops_per_hour']:.2f}"
+                **self.rate_content("Drop", stats["rates"]),
             }
 
-    
         selected_drop = self.drop_box.get_selected_header()
-  
-        
-        for i, (item_name, stats) in enumerate(sorted_items[:5]):
-            if item_name == selected_drop:
-                # 95% confidence and 2% error rate 
-                rate = stats['estimated_drop_rate']
-                if rate > 0:
-                    logging.debug("IN SELECTED DROP BOX")
-                    logging.debug(f"HERE IS MY RATE {rate / 100}")
-                    p = rate / 100
-                    n = self.required_kills(p, self.z_score, self.margin_error)
-                    q = 1 - p
-                    logging.debug(f"N value: {n}")
-                    logging.debug(f"NP value: {n*p}")
-                    logging.debug(f"NQ value: {n * (1 - p)}")
-                    self.math_box.update_content(
-                        {
-                            "Assumed Drop Rate": f"{p * 100:.2f}%",
-                            "Kills till significance": f"{n}",
-                            "Drops assumed": f"{n * p}",
-                            "Not Drops assumed": f"{n * q}",
-                            "Variance of estimate": f"{n * p * q:.2f}",
-                            "Standard Deviation": f"{np.sqrt(n * p * q):.2f}",
-                            "Margin of Error": f"{self.margin_error}",
-                            "Z Score": f"{self.z_score}",
-                        }
-                    )
-                else:
-                    self.math_box.update_content(
-                        {
-                            "Assumed Drop Rate": f"{rate:.2f}%",
-                            "Kills till significance": "N/A",
-                            "Drops assumed": "N/A",
-                            "Not Drops assumed": "N/A",
-                            "Variance of estimate": "N/A",
-                            "Standard Deviation": "N/A",
-                            "Margin of Error": "N/A",
-                            "Z Score": "N/A",
-                        }
-                    )
-
-
+        stats = shown.get(selected_drop)
+        if stats is not None:
+            # 95% confidence and 2% error rate
+            p = stats['estimated_drop_rate'] / 100
+            if p > 0:
+                n = stats['required_kills']
+                q = 1 - p
+                self.math_box.update_content(
+                    {
+                        "Assumed Drop Rate": f"{p * 100:.2f}%",
+                        "Kills till significance": f"{n}",
+                        "Drops assumed": f"{n * p}",
+                        "Not Drops assumed": f"{n * q}",
+                        "Variance of estimate": f"{n * p * q:.2f}",
+                        "Standard Deviation": f"{math.sqrt(n * p * q):.2f}",
+                        "Margin of Error": f"{self.margin_error}",
+                        "Z Score": f"{self.z_score}",
+                    }
+                )
+            else:
+                self.math_box.update_content(
+                    {
+                        "Assumed Drop Rate": f"{p * 100:.2f}%",
+                        "Kills till significance": "N/A",
+                        "Drops assumed": "N/A",
+                        "Not Drops assumed": "N/A",
+                        "Variance of estimate": "N/A",
+                        "Standard Deviation": "N/A",
+                        "Margin of Error": "N/A",
+                        "Z Score": "N/A",
+                    }
+                )
 
         self.drop_box.update_content(drop_content)
-
-        self.math_box.draw()
-        self.gold_box.draw()
-        self.exp_box.draw()
-        self.drop_box.draw()
-        self.rep_box.draw()
-        self.kill_box.draw()
-        self.stats_box.draw()
-
-        self.window.refresh()
     
     def handle_input(self):
 
@@ -384,6 +252,12 @@ class DropsPage:
         elif key == curses.KEY_DOWN:
             self.drop_box.selected_index = (self.drop_box.selected_index + 1) % len(self.drop_box.headers)
 
+        elif key == curses.KEY_LEFT:
+            self.switch_session(-1)
+
+        elif key == curses.KEY_RIGHT:
+            self.switch_session(1)
+
         if key == ord("q"):
 
             return "quit"
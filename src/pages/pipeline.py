@@ -0,0 +1,132 @@
+import curses
+from typing import Optional
+
+from ..packet_capture import PacketCapture
+from ..ui import Box
+
+
+def _micros(seconds: float) -> str:
+    return f"{seconds * 1_000_000:.0f}us"
+
+
+def _size(nbytes: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if nbytes < 1024:
+            return f"{nbytes:.0f}{unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f}GB"
+
+
+class PipelinePage:
+    def __init__(self, window: "curses.window", packet_capture: PacketCapture):
+        self.window = window
+        self.packet_capture = packet_capture
+        self.full_redraw = True
+        self.setup_boxes()
+
+    def setup_boxes(self):
+        height, width = self.window.getmaxyx()
+        box_height = 10
+        box_width = width // 3 - 4
+
+        self.capture_box = Box(self.window, 3, 2, box_height, box_width, title="Capture")
+        self.stream_box = Box(self.window, 3, 2 + box_width + 4, box_height, box_width, title="Stream")
+        self.latency_box = Box(self.window, 3, 2 + (box_width + 4) * 2, box_height, box_width, title="Latency")
+        self.commands_box = Box(self.window, 4 + box_height, 2, box_height + 8, box_width, title="Commands")
+        self.buffers_box = Box(
+            self.window, 4 + box_height, 2 + box_width + 4, box_height + 8, box_width * 2 + 4, title="Buffers"
+        )
+
+    @property
+    def boxes(self):
+        return [self.capture_box, self.stream_box, self.latency_box, self.commands_box, self.buffers_box]
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def draw(self):
+        if self.full_redraw:
+            self.full_redraw = False
+            self.window.erase()
+            height, width = self.window.getmaxyx()
+            title = "Pipeline"
+            self.window.addstr(1, (width - len(title)) // 2, title, curses.A_BOLD | curses.color_pair(1))
+            for box in self.boxes:
+                box.invalidate()
+
+        metrics = self.packet_capture.get_metrics()
+        self.capture_box.update_content(
+            {
+                "Backend": metrics["backend_name"],
+                "Seen": f"{metrics['packets_seen']}",
+                "Filtered": f"{metrics['packets_filtered']}",
+                "Queued": f"{metrics['packets_queued']}",
+                "Dropped": f"{metrics['packets_dropped']}",
+                "Queue": f"{metrics['queue_depth']}/{metrics['queue_capacity']} (max {metrics['queue_high_water']})",
+                **{k.replace("_", " ").title(): str(v) for k, v in metrics["backend"].items()},
+            }
+        )
+        self.stream_box.update_content(
+            {
+                "Flows": f"{metrics['flows']}",
+                "Sessions": f"{metrics['sessions']}",
+                "Bytes": _size(metrics["bytes_extracted"]),
+                "Frames": f"{metrics['frames_extracted']}",
+                "Decode errors": f"{metrics['decode_errors']}",
+                "Duplicates": f"{metrics['duplicate_segments']}",
+                "Batches": f"{metrics['batches']}",
+                **{f"Store {k}": str(v) for k, v in metrics["store"].items()},
+            }
+        )
+
+        latency = metrics["capture_to_callback"]
+        batch = metrics["batch_processing"]
+        self.latency_box.update_content(
+            {
+                "Capture->callback p50": _micros(latency["p50"]),
+                "Capture->callback p90": _micros(latency["p90"]),
+                "Capture->callback p99": _micros(latency["p99"]),
+                "Capture->callback max": _micros(latency["max"]),
+                "Batch mean": _micros(batch["mean"]),
+                "Batch p99": _micros(batch["p99"]),
+                "UI wakeups": f"{metrics['ui_wakeups']}/{metrics['ui_notifications']}",
+            }
+        )
+
+        self.commands_box.update_content(
+            {
+                cmd: f"{stats['decoded']}/{stats['seen']} decoded"
+                for cmd, stats in self.packet_capture.get_decode_stats().items()
+            }
+        )
+        self.buffers_box.update_content(
+            {
+                **{
+                    name: f"{usage['items']}/{usage['capacity']}  {_size(usage['bytes'])} (peak {_size(usage['peak_bytes'])})"
+                    for name, usage in self.packet_capture.get_buffer_usage().items()
+                },
+                **{
+                    f"sub {name}": f"{sub['backlog']}/{sub['maxsize']}  lag {_micros(sub['last_lag'])} (max {_micros(sub['max_lag'])})  dropped {sub['dropped']}"
+                    for name, sub in metrics["subscribers"].items()
+                },
+                **{
+                    f"out {name}": f"backlog {out['backlog']}  written {out['written']}  dropped {out['dropped']}"
+                    for name, out in metrics["outputs"].items()
+                },
+            }
+        )
+
+        for box in self.boxes:
+            box.draw()
+
+        self.window.noutrefresh()
+
+    def handle_input(self) -> Optional[str | int]:
+        key = self.window.getch()
+        if key == ord("q"):
+            return "quit"
+        elif key == ord("\n"):
+            return ord("\n")
+        elif key == ord("p"):
+            return ord("p")
+        return None
@@ -1,8 +1,6 @@
 import curses
-
-from scapy.all import logging
+import logging
 from ..packet_capture import PacketCapture
-import toml
 from typing import Optional
 
 class ServerSelectionPage:
@@ -10,9 +8,17 @@ class ServerSelectionPage:
         self.window = window
         self.packet_capture = packet_capture
         self.selected_idx = 0
-        self.servers = list(packet_capture.servers.keys())
-        
+        self.servers = packet_capture.registry.names()
+        # Nothing here changes on its own, only redraw after a key press
+        self.full_redraw = True
+
+    def invalidate(self):
+        self.full_redraw = True
+
     def draw(self):
+        if not self.full_redraw:
+            return
+        self.full_redraw = False
         self.window.erase()
         height, width = self.window.getmaxyx()
 
@@ -45,14 +51,16 @@ class ServerSelectionPage:
         instructions = "Use ↑/↓ to select, Enter to confirm, q to quit"
         self.window.addstr(height - 2, (width - len(instructions)) // 2, instructions)
 
-        self.window.refresh()
+        self.window.noutrefresh()
 
     def handle_input(self) -> Optional[str|int]:
         key = self.window.getch()
         if key == curses.KEY_UP and self.selected_idx > 0:
             self.selected_idx -= 1
+            self.full_redraw = True
         elif key == curses.KEY_DOWN and self.selected_idx < len(self.servers) - 1:
             self.selected_idx += 1
+            self.full_redraw = True
         elif key in (curses.KEY_ENTER, 10, 13):  # Enter key
             selected_server = self.servers[self.selected_idx]
             logging.debug(f"Selected Server: {selected_server}")
@@ -0,0 +1,123 @@
+from typing import Dict, List, Optional
+
+# name -> window length in seconds
+WINDOWS = {"1m": 60.0, "5m": 300.0, "1h": 3600.0}
+BUCKETS_PER_WINDOW = 60
+
+
+class WindowedCounter:
+    """Sum of the values added over the last `window` seconds.
+
+    Values land in fixed-width time buckets arranged in a ring, a running
+    total is kept alongside so adding and reading are both O(1) (clearing
+    buckets the clock has moved past is amortised over the events).
+    """
+
+    def __init__(self, window: float, buckets: int = BUCKETS_PER_WINDOW):
+        self.window = window
+        self.width = window / buckets
+        self.counts: List[float] = [0.0] * buckets
+        self.total = 0.0
+        self.head: Optional[int] = None
+
+    def _advance(self, now: float):
+        index = int(now // self.width)
+        if self.head is None:
+            self.head = index
+            return
+        steps = index - self.head
+        if steps <= 0:
+            return
+
+        size = len(self.counts)
+        if steps >= size:
+            self.counts = [0.0] * size
+            self.total = 0.0
+        else:
+            for i in range(self.head + 1, index + 1):
+                slot = i % size
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0.0
+        self.head = index
+
+    def add(self, value: float, now: float):
+        self._advance(now)
+        self.counts[self.head % len(self.counts)] += value
+        self.total += value
+
+    def sum(self, now: float) -> float:
+        self._advance(now)
+        # Float drift from repeated subtraction can leave tiny negatives
+        return max(self.total, 0.0)
+
+
+class MetricRates:
+    def __init__(self):
+        self.windows = {name: WindowedCounter(length) for name, length in WINDOWS.items()}
+        self.total = 0.0
+
+    def add(self, value: float, now: float):
+        self.total += value
+        for counter in self.windows.values():
+            counter.add(value, now)
+
+
+class RateEngine:
+    """Rolling 1m/5m/1h rates plus a whole-session rate for named metrics.
+
+    The session rate is over active time only, gaps longer than
+    idle_timeout between events don't count, so going AFK doesn't drag the
+    average down and nothing ever has to be wiped.
+    """
+
+    def __init__(self, idle_timeout: float = 60.0):
+        self.idle_timeout = idle_timeout
+        self.metrics: Dict[str, MetricRates] = {}
+        self.start_time: Optional[float] = None
+        self.last_event: Optional[float] = None
+        self.active_time = 0.0
+
+    def add(self, metric: str, value: float, now: float):
+        if self.start_time is None:
+            self.start_time = now
+        elif now > self.last_event:
+            self.active_time += min(now - self.last_event, self.idle_timeout)
+        if self.last_event is None or now > self.last_event:
+            self.last_event = now
+
+        rates = self.metrics.get(metric)
+        if rates is None:
+            rates = self.metrics[metric] = MetricRates()
+        rates.add(value, now)
+
+    def session_time(self, now: float) -> float:
+        if self.last_event is None:
+            return 0.0
+        return self.active_time + min(max(now - self.last_event, 0.0), self.idle_timeout)
+
+    def total(self, metric: str) -> float:
+        rates = self.metrics.get(metric)
+        return rates.total if rates else 0.0
+
+    def rates(self, metric: str, now: float) -> Dict[str, float]:
+        """Per-second rate for each window and the session."""
+        result = {name: 0.0 for name in WINDOWS}
+        result["session"] = 0.0
+        rates = self.metrics.get(metric)
+        if rates is None or self.start_time is None:
+            return result
+
+        since_start = now - self.start_time
+        for name, counter in rates.windows.items():
+            # Early on a window isn't full yet, don't divide by time that hasn't happened
+            span = min(counter.window, since_start)
+            if span > 0:
+                result[name] = counter.sum(now) / span
+
+        session = self.session_time(now)
+        if session > 0:
+            result["session"] = rates.total / session
+        return result
+
+    def forget(self, metric: str):
+        self.metrics.pop(metric, None)
@@ -0,0 +1,181 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+# (src ip, src port, dst ip, dst port)
+FlowKey = Tuple[str, int, str, int]
+
+SEQ_MOD = 1 << 32
+
+
+def seq_diff(a: int, b: int) -> int:
+    """Signed distance from b to a in 32 bit sequence space."""
+    d = (a - b) % SEQ_MOD
+    return d - SEQ_MOD if d >= SEQ_MOD // 2 else d
+
+
+class TCPFlow:
+    def __init__(self, next_seq: int):
+        self.next_seq = next_seq
+        # seq -> payload for segments that arrived ahead of next_seq
+        self.pending: Dict[int, bytes] = {}
+        self.pending_bytes = 0
+        self.last_seen = time.time()
+        # When the hole in front of pending opened, None while there isn't one
+        self.gap_since: Optional[float] = None
+        self.duplicates = 0
+        self.gaps_skipped = 0
+
+
+class TCPStreamReassembler:
+    """Puts each flow's segments back in order.
+
+    A missing segment is waited for until the hole is gap_timeout seconds
+    old, or max_pending_segments or max_pending_bytes are held behind it,
+    then delivery continues from the earliest segment we do have. Packets
+    dropped before they reach us are never retransmitted to us.
+    """
+
+    def __init__(
+        self,
+        max_pending_bytes: int = 1 << 20,
+        flow_timeout: float = 600.0,
+        gap_timeout: float = 1.0,
+        max_pending_segments: int = 128,
+    ):
+        self.flows: Dict[FlowKey, TCPFlow] = {}
+        self.max_pending_bytes = max_pending_bytes
+        self.flow_timeout = flow_timeout
+        self.gap_timeout = gap_timeout
+        self.max_pending_segments = max_pending_segments
+        self.duplicate_segments = 0
+        self.skipped_bytes = 0
+
+    def feed(self, key: FlowKey, seq: int, payload: bytes, syn: bool = False, fin: bool = False) -> bytes:
+        """Add a segment and return whatever in-order bytes it made available."""
+        flow = self.flows.get(key)
+        if flow is None or syn:
+            # Joining mid-stream is the common case, trust the first segment we see
+            flow = TCPFlow(seq + 1 if syn else seq)
+            self.flows[key] = flow
+            if syn:
+                seq += 1
+        now = time.time()
+        flow.last_seen = now
+
+        out = self._accept(flow, seq, payload, now)
+
+        if fin:
+            self.close(key)
+        return out
+
+    def _accept(self, flow: TCPFlow, seq: int, payload: bytes, now: float) -> bytes:
+        if not payload:
+            return b""
+
+        offset = seq_diff(flow.next_seq, seq)
+        if offset >= len(payload):
+            # Everything in this segment has already been delivered
+            flow.duplicates += 1
+            self.duplicate_segments += 1
+            return b""
+
+        if offset > 0:
+            # Retransmit overlapping the delivered edge, keep only the new tail
+            seq = flow.next_seq
+            payload = payload[offset:]
+
+        chunks: List[bytes] = []
+        if seq != flow.next_seq:
+            self._buffer(flow, seq, payload)
+        else:
+            chunks.append(payload)
+            flow.next_seq = (flow.next_seq + len(payload)) % SEQ_MOD
+
+        if flow.pending:
+            self._drain(flow, chunks)
+            if chunks:
+                # Delivery moved on, anything still held is behind a newer hole
+                flow.gap_since = None
+        self._check_gap(flow, chunks, now)
+        return b"".join(chunks)
+
+    def _buffer(self, flow: TCPFlow, seq: int, payload: bytes):
+        """Hold an out-of-order segment until the bytes before it arrive."""
+        existing = flow.pending.get(seq)
+        if existing is not None and len(existing) >= len(payload):
+            flow.duplicates += 1
+            self.duplicate_segments += 1
+            return
+
+        flow.pending[seq] = payload
+        flow.pending_bytes += len(payload) - (len(existing) if existing else 0)
+
+    def _check_gap(self, flow: TCPFlow, chunks: List[bytes], now: float):
+        """Skip the hole in front of pending once it's clearly not being filled."""
+        if not flow.pending:
+            flow.gap_since = None
+            return
+        if flow.gap_since is None:
+            flow.gap_since = now
+        if (
+            now - flow.gap_since < self.gap_timeout
+            and len(flow.pending) <= self.max_pending_segments
+            and flow.pending_bytes <= self.max_pending_bytes
+        ):
+            return
+
+        # The missing segment is not coming back, give up on the hole
+        # and continue from the earliest segment we do have
+        earliest = min(flow.pending, key=lambda s: seq_diff(s, flow.next_seq))
+        skipped = seq_diff(earliest, flow.next_seq)
+        logging.debug(f"Skipping {skipped} missing bytes in flow")
+        self.skipped_bytes += skipped
+        flow.gaps_skipped += 1
+        flow.next_seq = earliest
+        self._drain(flow, chunks)
+        # Whatever is still held is behind a newer hole
+        flow.gap_since = now if flow.pending else None
+
+    def _drain(self, flow: TCPFlow, chunks: List[bytes]):
+        while flow.pending:
+            ready: Optional[int] = flow.next_seq if flow.next_seq in flow.pending else None
+            if ready is None:
+                for seq in flow.pending:
+                    if seq_diff(flow.next_seq, seq) >= 0:
+                        ready = seq
+                        break
+            if ready is None:
+                return
+
+            payload = flow.pending.pop(ready)
+            flow.pending_bytes -= len(payload)
+            offset = seq_diff(flow.next_seq, ready)
+            if offset >= len(payload):
+                flow.duplicates += 1
+                self.duplicate_segments += 1
+                continue
+            payload = payload[offset:]
+            chunks.append(payload)
+            flow.next_seq = (flow.next_seq + len(payload)) % SEQ_MOD
+
+    def close(self, key: FlowKey):
+        self.flows.pop(key, None)
+
+    def expire(self, now: Optional[float] = None) -> Dict[FlowKey, bytes]:
+        """Drop idle flows and skip holes that timed out while nothing arrived.
+
+        Returns the bytes each flow delivered because of a skipped hole.
+        """
+        now = now or time.time()
+        released: Dict[FlowKey, bytes] = {}
+        for key, flow in list(self.flows.items()):
+            if now - flow.last_seen > self.flow_timeout:
+                logging.debug(f"Expiring idle flow {key}")
+                del self.flows[key]
+            elif flow.gap_since is not None and now - flow.gap_since >= self.gap_timeout:
+                chunks: List[bytes] = []
+                self._check_gap(flow, chunks, now)
+                if chunks:
+                    released[key] = b"".join(chunks)
+        return released
@@ -0,0 +1,73 @@
+import sys
+from collections import deque
+from itertools import islice
+from typing import Callable, Deque, Dict, Generic, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RingBuffer(Generic[T]):
+    """Fixed capacity history, the oldest entry is dropped once full.
+
+    A capacity of 0 keeps nothing. Sizes are estimates, callers that know what
+    an entry came from (e.g. the frame it was decoded from) pass its size to
+    append, otherwise sizeof is used.
+    """
+
+    def __init__(self, capacity: int, sizeof: Optional[Callable[[T], int]] = None):
+        if capacity < 0:
+            raise ValueError(f"RingBuffer capacity can't be negative, got {capacity}")
+        self.capacity = capacity
+        self.items: Deque[T] = deque(maxlen=capacity)
+        self.sizes: Deque[int] = deque(maxlen=capacity)
+        self.sizeof = sizeof or sys.getsizeof
+        self.nbytes = 0
+        self.peak_nbytes = 0
+        self.evicted = 0
+
+    def append(self, item: T, size: Optional[int] = None):
+        if not self.capacity:
+            self.evicted += 1
+            return
+        if len(self.items) == self.capacity:
+            self.nbytes -= self.sizes[0]
+            self.evicted += 1
+        if size is None:
+            size = self.sizeof(item)
+        self.items.append(item)
+        self.sizes.append(size)
+        self.nbytes += size
+        if self.nbytes > self.peak_nbytes:
+            self.peak_nbytes = self.nbytes
+
+    def tail(self, count: int) -> List[T]:
+        """The newest count entries, oldest first."""
+        if count >= len(self.items):
+            return list(self.items)
+        return list(islice(self.items, len(self.items) - count, None))
+
+    def clear(self):
+        self.items.clear()
+        self.sizes.clear()
+        self.nbytes = 0
+
+    def usage(self) -> Dict[str, int]:
+        return {
+            "items": len(self.items),
+            "capacity": self.capacity,
+            "bytes": self.nbytes,
+            "peak_bytes": self.peak_nbytes,
+            "evicted": self.evicted,
+        }
+
+    def __getitem__(self, index: int) -> T:
+        return self.items[index]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __bool__(self) -> bool:
+        return bool(self.items)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self.items)
@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import socket
+import struct
+import time
+from dataclasses import dataclass
+from threading import Thread
+from typing import Any, Dict, FrozenSet, List, Optional
+
+# Where each server was last seen, for when servers.json can't be resolved
+# and nothing has been cached yet. Multiple servers have the same IP.
+KNOWN_ADDRESSES = {
+    "Artix": "172.65.160.131",
+    "Swordhaven (EU)": "172.65.207.70",
+    "Yokai (SEA)": "172.65.236.72",
+    "Yorumi": "172.65.249.41",
+    "Twilly": "172.65.210.123",
+    "Safiria": "172.65.249.3",
+    "Galanoth": "172.65.249.3",
+    "Alteon": "172.65.235.85",
+    "Gravelyn": "172.65.235.85",
+    "Twig": "172.65.235.85",
+    "Sir Ver": "172.65.220.106",
+    "Espada": "172.65.220.106",
+    "Sepulchure": "172.65.220.106",
+}
+
+_ADDRESS = struct.Struct("!I")
+
+
+def pack_ip(ip: str) -> int:
+    """IPv4 address as the integer PacketRecord.src_addr holds."""
+    return _ADDRESS.unpack(socket.inet_aton(ip))[0]
+
+
+@dataclass(frozen=True)
+class GameServer:
+    name: str
+    host: str
+    port: int
+    players: int = 0
+    max_players: int = 0
+    online: bool = True
+    ip: Optional[str] = None
+
+
+class ServerRegistry:
+    """Game servers from servers.json with their hostnames resolved.
+
+    Addresses come from cache_path, or KNOWN_ADDRESSES, straight away so
+    startup never waits on DNS. Hosts missing from the cache or older than
+    cache_ttl seconds are looked up on a background thread, which swaps the
+    resolved servers in when it's done. wait() gives it up to
+    resolve_timeout seconds, for anything that can't pick up addresses later.
+    """
+
+    def __init__(
+        self,
+        path: str = "servers.json",
+        cache_path: str = "server_cache.json",
+        cache_ttl: float = 86400,
+        resolve: bool = True,
+        resolve_timeout: float = 2.0,
+    ):
+        self.path = path
+        self.cache_path = cache_path
+        self.cache_ttl = cache_ttl
+        self.resolve_timeout = resolve_timeout
+        self.servers: Dict[str, GameServer] = {}
+        self.resolver: Optional[Thread] = None
+        self.load(resolve)
+
+    @classmethod
+    def from_config(cls, conf: Dict[str, Any]) -> "ServerRegistry":
+        servers = conf.get("servers", {})
+        return cls(
+            path=servers.get("path", "servers.json"),
+            cache_path=servers.get("cache", "server_cache.json"),
+            cache_ttl=servers.get("cache_ttl", 86400),
+            resolve=servers.get("resolve", True),
+            resolve_timeout=servers.get("resolve_timeout", 2.0),
+        )
+
+    def load(self, resolve: bool = True):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f).get("servers", [])
+        except (OSError, ValueError) as e:
+            logging.warning(f"Couldn't read {self.path}, using known server addresses: {e}")
+            entries = [{"sName": name, "sIP": "", "iPort": 5588} for name in KNOWN_ADDRESSES]
+
+        cache = self._read_cache()
+        self.servers = self._build(entries, {host: cached["ip"] for host, cached in cache.items()})
+        if resolve:
+            self.resolver = Thread(target=self._resolve_all, args=(entries, cache), name="server-resolver", daemon=True)
+            self.resolver.start()
+
+    def _resolve_all(self, entries: List[Dict[str, Any]], cache: Dict[str, Dict[str, Any]]):
+        now = time.time()
+        stale = [
+            host
+            for host in {entry.get("sIP", "") for entry in entries}
+            if host and (host not in cache or now - cache[host]["resolved"] >= self.cache_ttl)
+        ]
+        if not stale:
+            return
+
+        changed = False
+        for host in stale:
+            ip = self._resolve(host)
+            if ip is not None:
+                cache[host] = {"ip": ip, "resolved": now}
+                changed = True
+        if not changed:
+            # Stale beats nothing when DNS is down, and that's already in use
+            return
+        self._write_cache(cache)
+        self.servers = self._build(entries, {host: cached["ip"] for host, cached in cache.items()})
+        logging.debug(f"Resolved {len(stale)} server hosts")
+
+    @staticmethod
+    def _build(entries: List[Dict[str, Any]], addresses: Dict[str, str]) -> Dict[str, GameServer]:
+        servers = {}
+        for entry in entries:
+            name = entry["sName"]
+            host = entry.get("sIP", "")
+            servers[name] = GameServer(
+                name=name,
+                host=host,
+                port=entry.get("iPort", 5588),
+                players=entry.get("iCount", 0),
+                max_players=entry.get("iMax", 0),
+                online=bool(entry.get("bOnline", 1)),
+                ip=addresses.get(host) or KNOWN_ADDRESSES.get(name),
+            )
+        return servers
+
+    @staticmethod
+    def _resolve(host: str) -> Optional[str]:
+        try:
+            return socket.gethostbyname(host)
+        except OSError as e:
+            logging.debug(f"Couldn't resolve {host}: {e}")
+            return None
+
+    def _read_cache(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_cache(self, cache: Dict[str, Dict[str, Any]]):
+        # Written next to it then swapped in, a crash never leaves half a file
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(cache, f, indent=4)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logging.warning(f"Couldn't write {self.cache_path}: {e}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the background lookup is done, False if it still isn't after timeout."""
+        resolver = self.resolver
+        if resolver is None:
+            return True
+        resolver.join(self.resolve_timeout if timeout is None else timeout)
+        return not resolver.is_alive()
+
+    def names(self) -> List[str]:
+        return list(self.servers)
+
+    def get(self, name: Optional[str]) -> Optional[GameServer]:
+        return self.servers.get(name) if name is not None else None
+
+    def addresses(self, name: Optional[str] = None) -> List[str]:
+        """IP of the named server, or of every server when name isn't one."""
+        # The resolver may swap in new servers meanwhile, read them once
+        servers = self.servers
+        server = servers.get(name) if name is not None else None
+        if server is not None and server.ip:
+            return [server.ip]
+        return sorted({server.ip for server in servers.values() if server.ip})
+
+    def source_set(self, name: Optional[str] = None) -> FrozenSet[int]:
+        """addresses() packed, matched against PacketRecord.src_addr for every packet."""
+        return frozenset(pack_ip(ip) for ip in self.addresses(name))
@@ -0,0 +1,66 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .drop_tracker import DropTracker
+from .framing import FrameExtractor
+from .reassembly import FlowKey
+
+# Client side of the connection, (ip, port)
+SessionKey = Tuple[str, int]
+
+
+def session_key(flow: FlowKey, server_port: int) -> SessionKey:
+    src, sport, dst, dport = flow
+    if sport == server_port:
+        return (dst, dport)
+    return (src, sport)
+
+
+class ClientSession:
+    """State for one game client's connection.
+
+    Both directions of the connection share a session, packets only ever
+    touch their own session so more clients don't slow the others down.
+    """
+
+    def __init__(self, key: SessionKey, max_buffer_size: int, tracker_factory: Callable[[], DropTracker]):
+        self.key = key
+        self.label = f"{key[0]}:{key[1]}"
+        self.max_buffer_size = max_buffer_size
+        self.framers: Dict[FlowKey, FrameExtractor] = {}
+        # Built on the first kill or drop, most connections never need one
+        self._tracker_factory = tracker_factory
+        self._tracker: Optional[DropTracker] = None
+        self.latest_stats: Dict[str, Any] = {}
+        self.frames = 0
+        self.bytes = 0
+        self.first_seen = 0.0
+        self.last_seen = 0.0
+        self.closed = False
+
+    @property
+    def tracker(self) -> DropTracker:
+        if self._tracker is None:
+            self._tracker = self._tracker_factory()
+        return self._tracker
+
+    @property
+    def has_tracker(self) -> bool:
+        return self._tracker is not None
+
+    def framer(self, flow: FlowKey) -> FrameExtractor:
+        framer = self.framers.get(flow)
+        if framer is None:
+            framer = self.framers[flow] = FrameExtractor(self.max_buffer_size)
+        return framer
+
+    def summary(self) -> Dict[str, Any]:
+        tracker = self._tracker
+        return {
+            "label": self.label,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "kills": tracker.monster_kills if tracker else 0,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "closed": self.closed,
+        }
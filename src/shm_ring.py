@@ -0,0 +1,121 @@
+import struct
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional
+
+# capacity, head, tail, then counters the producer publishes for metrics
+_FIELDS = ("capacity", "head", "tail", "dropped", "oversized", "packets", "bytes")
+_HEADER = struct.Struct("<" + "Q" * len(_FIELDS))
+_OFFSETS = {name: i * 8 for i, name in enumerate(_FIELDS)}
+_U64 = struct.Struct("<Q")
+# Header padded to its own cache line
+DATA_OFFSET = 64
+
+_LENGTH = struct.Struct("<I")
+# Length that tells the reader the rest of the buffer is unused, go back to the start
+_WRAP = 0xFFFFFFFF
+
+
+def max_record(capacity: int) -> int:
+    """Largest record a ring of capacity bytes can always take once it has drained."""
+    return capacity // 2 - _LENGTH.size
+
+
+class SharedRing:
+    """Single producer, single consumer ring of byte records in shared memory.
+
+    head and tail only ever grow, the producer alone writes head and the
+    consumer alone writes tail, so neither side needs a lock. Records are a
+    u32 length then the bytes, a record that doesn't fit before the end of
+    the buffer starts again at the beginning. That can waste up to a record's
+    length, so only records of up to max_record bytes are sure to find room.
+    """
+
+    def __init__(self, name: Optional[str] = None, capacity: int = 8 << 20):
+        if name is None:
+            self.shm = SharedMemory(create=True, size=DATA_OFFSET + capacity)
+            self.owner = True
+            self.buf = self.shm.buf
+            self.buf[:DATA_OFFSET] = bytes(DATA_OFFSET)
+            self._set("capacity", capacity)
+        else:
+            self.shm = SharedMemory(name=name)
+            self.owner = False
+            # A spawned child shares its parent's resource tracker, which
+            # already knows about the segment, the owner alone unlinks it
+            self.buf = self.shm.buf
+        self.capacity = self._get("capacity")
+        self.max_record = max_record(self.capacity)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def _get(self, field: str) -> int:
+        return _U64.unpack_from(self.buf, _OFFSETS[field])[0]
+
+    def _set(self, field: str, value: int):
+        _U64.pack_into(self.buf, _OFFSETS[field], value)
+
+    def add(self, field: str, amount: int = 1):
+        """Bump a counter, only the producer may call this."""
+        self._set(field, self._get(field) + amount)
+
+    def counters(self) -> dict:
+        return dict(zip(_FIELDS, _HEADER.unpack_from(self.buf, 0)))
+
+    def used(self) -> int:
+        return self._get("head") - self._get("tail")
+
+    def write(self, record: bytes) -> bool:
+        """Append a record, False if there's no room for it right now."""
+        if len(record) > self.max_record:
+            raise ValueError(f"record of {len(record)} bytes is larger than the ring can hold")
+        size = _LENGTH.size + len(record)
+        capacity = self.capacity
+
+        head = self._get("head")
+        free = capacity - (head - self._get("tail"))
+        pos = head % capacity
+        waste = capacity - pos if pos + size > capacity else 0
+        if waste + size > free:
+            return False
+
+        if waste:
+            if waste >= _LENGTH.size:
+                _LENGTH.pack_into(self.buf, DATA_OFFSET + pos, _WRAP)
+            head += waste
+            pos = 0
+        start = DATA_OFFSET + pos
+        _LENGTH.pack_into(self.buf, start, len(record))
+        self.buf[start + _LENGTH.size : start + size] = record
+        # Published last, the consumer never sees a half written record
+        self._set("head", head + size)
+        return True
+
+    def read(self, limit: int) -> List[bytes]:
+        """Up to limit records, oldest first."""
+        records: List[bytes] = []
+        capacity = self.capacity
+        head = self._get("head")
+        tail = self._get("tail")
+        while tail < head and len(records) < limit:
+            pos = tail % capacity
+            if capacity - pos < _LENGTH.size:
+                tail += capacity - pos
+                continue
+            (length,) = _LENGTH.unpack_from(self.buf, DATA_OFFSET + pos)
+            if length == _WRAP:
+                tail += capacity - pos
+                continue
+            start = DATA_OFFSET + pos + _LENGTH.size
+            records.append(bytes(self.buf[start : start + length]))
+            tail += _LENGTH.size + length
+        if records or tail != self._get("tail"):
+            self._set("tail", tail)
+        return records
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
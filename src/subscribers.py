@@ -0,0 +1,161 @@
+import inspect
+import logging
+import time
+from collections import OrderedDict, deque
+from threading import Condition, Thread
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+class Subscription:
+    """One consumer of game events with its own bounded queue.
+
+    publish() never blocks the parser: once maxsize events are waiting the
+    oldest is dropped and counted. With coalesce only the newest event of
+    each cmd and session is kept, for consumers that just want the latest
+    state. Events are delivered on a thread of the subscription's own, or
+    on an asyncio loop when one is given, where the callback may also be a
+    coroutine function.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        callback: Callable[[Any], Any],
+        cmds: List[str],
+        maxsize: int = 1000,
+        coalesce: bool = False,
+        loop: Optional["asyncio.AbstractEventLoop"] = None,
+    ):
+        self.name = name
+        self.callback = callback
+        self.cmds = cmds
+        self.maxsize = maxsize
+        self.coalesce = coalesce
+        self.loop = loop
+        self.executor = "asyncio" if loop is not None else "thread"
+        self._events: Deque[Any] = deque()
+        self._latest: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._ready = Condition()
+        self._scheduled = False
+        self.closed = False
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.errors = 0
+        # Seconds between an event being published and its callback starting
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+        self._thread: Optional[Thread] = None
+        if loop is None:
+            self._thread = Thread(target=self._run, name=f"subscriber-{name}", daemon=True)
+            self._thread.start()
+
+    def backlog(self) -> int:
+        return len(self._latest) if self.coalesce else len(self._events)
+
+    def publish(self, event: Any):
+        if self.closed:
+            return
+        item = (time.perf_counter(), event)
+        with self._ready:
+            self.published += 1
+            if self.coalesce:
+                key = (event.cmd, event.session)
+                if key in self._latest:
+                    self.coalesced += 1
+                    # Keeps its place in line, only the event is newer
+                    self._latest[key] = item
+                else:
+                    self._drop_oldest(self._latest)
+                    self._latest[key] = item
+            else:
+                self._drop_oldest(self._events)
+                self._events.append(item)
+
+            if self.loop is None:
+                self._ready.notify()
+                return
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            self.loop.call_soon_threadsafe(self._drain_async)
+        except RuntimeError:
+            # Loop already closed, nothing is ever going to read these
+            self.close()
+
+    def _drop_oldest(self, pending):
+        if len(pending) < self.maxsize:
+            return
+        self.dropped += 1
+        if isinstance(pending, OrderedDict):
+            pending.popitem(last=False)
+        else:
+            pending.popleft()
+
+    def _take(self) -> List[Tuple[float, Any]]:
+        if self.coalesce:
+            items = list(self._latest.values())
+            self._latest.clear()
+        else:
+            items = list(self._events)
+            self._events.clear()
+        return items
+
+    def _deliver(self, items: List[Tuple[float, Any]]):
+        for published, event in items:
+            lag = time.perf_counter() - published
+            self.last_lag = lag
+            if lag > self.max_lag:
+                self.max_lag = lag
+            try:
+                result = self.callback(event)
+                if inspect.isawaitable(result):
+                    import asyncio
+
+                    asyncio.ensure_future(result, loop=self.loop)
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"Subscriber {self.name} failed on {event.cmd}: {e}", exc_info=True)
+            self.delivered += 1
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self.closed and not self.backlog():
+                    self._ready.wait()
+                if self.closed:
+                    return
+                items = self._take()
+            self._deliver(items)
+
+    def _drain_async(self):
+        with self._ready:
+            self._scheduled = False
+            items = self._take()
+        self._deliver(items)
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "executor": self.executor,
+            "backlog": self.backlog(),
+            "maxsize": self.maxsize,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+        }
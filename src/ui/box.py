@@ -1,7 +1,22 @@
 import curses
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+
+@lru_cache(maxsize=None)
+def border_rows(width: int, selected: bool = False) -> Tuple[str, str, str]:
+    """Top, middle and bottom rows of a box, middle rows blank the inside too."""
+    inner = width - 2
+    top = "─" * inner
+    if selected:
+        middle_x = width // 2 - 1
+        top = top[:middle_x] + "┼" + top[middle_x + 1:]
+    return "╭" + top + "╮", "│" + " " * inner + "│", "╰" + top + "╯"
+
 
 class Box:
+    """Bordered key/value panel, only redrawn when something about it changed."""
+
     def __init__(self, window: "curses.window", y: int, x: int, height: int, width: int, title: Optional[str] = None):
         self.window = window
         self.y = y
@@ -10,49 +25,59 @@ class Box:
         self.width = width
         self.content: Dict[str, str] = {}
         self.full_content: Optional[Dict[str, str]] = {}
-        self.selected = False  # Whether the box is currently selected
+        self._selected = False  # Whether the box is currently selected
         self.title = title
+        self.dirty = True
 
-    def draw(self):
-        if self.selected:
-            border_attr = curses.color_pair(1) | curses.A_BOLD
-        else:
-            border_attr = curses.color_pair(2) | curses.A_NORMAL 
-        middle_x = self.width // 2   
+    @property
+    def selected(self) -> bool:
+        return self._selected
+
+    @selected.setter
+    def selected(self, value: bool):
+        if value != self._selected:
+            self._selected = value
+            self.dirty = True
+
+    def invalidate(self):
+        self.dirty = True
 
+    def resize(self, y: int, x: int, height: int, width: int):
+        if (y, x, height, width) != (self.y, self.x, self.height, self.width):
+            self.y, self.x, self.height, self.width = y, x, height, width
+            self.dirty = True
+
+    def draw_border(self, attr: int, selected: bool = False):
+        top, middle, bottom = border_rows(self.width, selected)
         for i in range(self.height):
-            for j in range(self.width):
-                if i == 0 and j == 0:  
-                    char = "╭"
-                elif i == 0 and j == self.width - 1:  
-                    char = "╮"
-                elif i == self.height - 1 and j == 0:  
-                    char = "╰"
-                elif i == self.height - 1 and j == self.width - 1:  
-                    char = "╯"
-                elif i == 0 or i == self.height - 1:  
-                    if self.selected and j == middle_x:
-                        char = "┼"
-                    else:
-                        char = "─"
-                elif j == 0 or j == self.width - 1: 
-                    char = "│"
-                else:
-                    continue 
-                try:
-                    self.window.addch(self.y + i, self.x + j, char, border_attr)
-                except curses.error:
-                    pass
+            row = top if i == 0 else bottom if i == self.height - 1 else middle
+            try:
+                self.window.addstr(self.y + i, self.x, row, attr)
+            except curses.error:
+                # Writing the bottom right cell of the screen always "fails"
+                pass
 
         if self.title and len(self.title) < self.width - 4:
             try:
-                title_x = self.x + 2
-                self.window.addstr(self.y, title_x, self.title, border_attr)
-            except:
+                self.window.addstr(self.y, self.x + 2, self.title, attr)
+            except curses.error:
                 pass
+
+    def draw(self, force: bool = False) -> bool:
+        """Draws the box if it changed since last time, returns whether it did."""
+        if not (self.dirty or force):
+            return False
+        self.dirty = False
+
+        if self.selected:
+            border_attr = curses.color_pair(1) | curses.A_BOLD
+        else:
+            border_attr = curses.color_pair(2) | curses.A_NORMAL
+        self.draw_border(border_attr, self.selected)
+
         content_y = self.y + 1
         for key, value in self.content.items():
-            if content_y < self.y + self.height - 1:  
+            if content_y < self.y + self.height - 1:
                 try:
                     if self.selected:
                         self.window.addstr(content_y, self.x + 1, f"{key}:", curses.color_pair(2) | curses.A_BOLD )
@@ -68,58 +93,41 @@ class Box:
                         content_y += 1
                 except curses.error:
                     pass
-
+        return True
 
     def update_content(self, content: Dict[str, str], full_content: Optional[Dict[str, str]] = None):
-        self.content = content
+        if content != self.content:
+            self.content = content
+            self.dirty = True
         if full_content is not None:
             self.full_content = full_content
 
 
-class DropBox:
+class DropBox(Box):
     def __init__(self, window: "curses.window", y: int, x: int, height: int, width: int, title: Optional[str] = None):
-        self.window = window
-        self.y = y
-        self.x = x
-        self.height = height
-        self.width = width
+        super().__init__(window, y, x, height, width, title)
         self.content: Dict[str, Dict[str, str]] = {}
-        self.title = title
         self.indent = "  "
-        self.selected_index = 0  
+        self._selected_index = 0
         self.headers = []
 
-    def draw(self):
-        border_attr = curses.A_NORMAL
-        middle_x = self.width // 2   
+    @property
+    def selected_index(self) -> int:
+        return self._selected_index
 
-        for i in range(self.height):
-            for j in range(self.width):
-                if i == 0 and j == 0:  
-                    char = "╭"
-                elif i == 0 and j == self.width - 1:  
-                    char = "╮"
-                elif i == self.height - 1 and j == 0:  
-                    char = "╰"
-                elif i == self.height - 1 and j == self.width - 1:  
-                    char = "╯"
-                elif i == 0 or i == self.height - 1:  
-                    char = "─"
-                elif j == 0 or j == self.width - 1: 
-                    char = "│"
-                else:
-                    continue 
-                try:
-                    self.window.addch(self.y + i, self.x + j, char, curses.color_pair(2) | border_attr)
-                except curses.error:
-                    pass
+    @selected_index.setter
+    def selected_index(self, value: int):
+        if value != self._selected_index:
+            self._selected_index = value
+            self.dirty = True
 
-        if self.title and len(self.title) < self.width - 4:
-            try:
-                title_x = self.x + 2
-                self.window.addstr(self.y, title_x, self.title,  curses.color_pair(2) | border_attr)
-            except:
-                pass
+    def draw(self, force: bool = False) -> bool:
+        if not (self.dirty or force):
+            return False
+        self.dirty = False
+
+        border_attr = curses.A_NORMAL
+        self.draw_border(curses.color_pair(2) | border_attr)
 
         content_y = self.y + 1
         for i, (header, stats) in enumerate(self.content.items()):
@@ -128,7 +136,7 @@ class DropBox:
                     header_style = curses.color_pair(2) | curses.A_REVERSE | curses.A_BOLD if i == self.selected_index else curses.color_pair(2) | curses.A_BOLD
                     self.window.addstr(content_y, self.x + 1, header[:self.width-2], header_style)
                     content_y += 1
-                    
+
                     for key, value in stats.items():
                         if content_y < self.y + self.height - 2:
                             self.window.addstr(content_y, self.x + 1, f"{self.indent}{key}:", curses.color_pair(2) )
@@ -139,13 +147,13 @@ class DropBox:
                     content_y += 1
                 except curses.error:
                     pass
+        return True
 
     def update_content(self, content: Dict[str, Dict[str, str]]):
-        self.content = content
-        self.headers = list(content.keys())
-
-    
-
+        if content != self.content:
+            self.content = content
+            self.headers = list(content.keys())
+            self.dirty = True
 
     def get_selected_header(self) -> Optional[str]:
         if self.headers:
@@ -0,0 +1,169 @@
+import socket
+import struct
+
+import pytest
+
+from src.backends import PcapFileBackend, build_bpf_filter, compile_bpf, parse_ipv4_tcp
+
+SERVER = "172.65.160.131"
+CLIENT = "192.168.1.20"
+ETHERNET = b"\x00" * 12 + b"\x08\x00"
+
+
+def ipv4_tcp(src=SERVER, dst=CLIENT, sport=5588, dport=50000, seq=1, flags=0x18, payload=b"", proto=6, frag=0):
+    tcp = struct.pack("!HHIIBBHHH", sport, dport, seq, 0, 5 << 4, flags, 65535, 0, 0)
+    total = 20 + len(tcp) + len(payload)
+    ip = struct.pack(
+        "!BBHHHBBH4s4s", 0x45, 0, total, 0, frag, 64, proto, 0, socket.inet_aton(src), socket.inet_aton(dst)
+    )
+    return ip + tcp + payload
+
+
+def run_bpf(program, packet: bytes) -> int:
+    """Just enough of a classic BPF interpreter for what compile_bpf emits."""
+    a = x = pc = 0
+    while True:
+        code, jt, jf, k = program[pc]
+        pc += 1
+        if code == 0x30:
+            a = packet[k]
+        elif code == 0x28:
+            a = struct.unpack_from("!H", packet, k)[0]
+        elif code == 0x20:
+            a = struct.unpack_from("!I", packet, k)[0]
+        elif code == 0x48:
+            a = struct.unpack_from("!H", packet, x + k)[0]
+        elif code == 0xB1:
+            x = 4 * (packet[k] & 0x0F)
+        elif code == 0x15:
+            pc += jt if a == k else jf
+        elif code == 0x45:
+            pc += jt if a & k else jf
+        elif code == 0x06:
+            return k
+        else:
+            raise AssertionError(f"unexpected opcode {code:#x}")
+
+
+def test_parse_ipv4_tcp():
+    record = parse_ipv4_tcp(ETHERNET + ipv4_tcp(seq=42, payload=b"hello"), 14, 1.5)
+    assert (record.src, record.sport, record.dst, record.dport) == (SERVER, 5588, CLIENT, 50000)
+    assert record.seq == 42
+    assert record.payload == b"hello"
+    assert record.timestamp == 1.5
+    assert record.src_addr == int.from_bytes(socket.inet_aton(SERVER), "big")
+
+
+def test_parse_trims_ethernet_padding():
+    record = parse_ipv4_tcp(ipv4_tcp(payload=b"hi") + b"\x00" * 6, 0, 0.0)
+    assert record.payload == b"hi"
+
+
+def test_parse_skips_non_tcp_and_fragments():
+    assert parse_ipv4_tcp(ipv4_tcp(proto=17), 0, 0.0) is None
+    assert parse_ipv4_tcp(ipv4_tcp(frag=5), 0, 0.0) is None
+    assert parse_ipv4_tcp(b"\x45" * 10, 0, 0.0) is None
+
+
+def test_build_bpf_filter():
+    assert build_bpf_filter([], 5588) == "tcp src port 5588"
+    assert build_bpf_filter(["1.2.3.4", "5.6.7.8"], 5588) == "tcp src port 5588 and (src host 1.2.3.4 or src host 5.6.7.8)"
+
+
+@pytest.mark.parametrize(
+    "packet, accepted",
+    [
+        (ipv4_tcp(), True),
+        (ipv4_tcp(src="172.65.207.70"), True),
+        (ipv4_tcp(src="10.0.0.1"), False),
+        (ipv4_tcp(sport=443), False),
+        (ipv4_tcp(src=CLIENT, dst=SERVER, sport=50000, dport=5588), False),
+        (ipv4_tcp(proto=17), False),
+        (ipv4_tcp(frag=0x10), False),
+    ],
+)
+def test_compile_bpf(packet, accepted):
+    program = compile_bpf([SERVER, "172.65.207.70"], 5588)
+    assert (run_bpf(program, packet) > 0) == accepted
+
+
+def test_compile_bpf_jumps_stay_in_the_program():
+    program = compile_bpf([f"10.0.0.{i}" for i in range(50)], 5588)
+    for pc, (code, jt, jf, _) in enumerate(program):
+        if code in (0x15, 0x45):
+            assert pc + 1 + jt < len(program)
+            assert pc + 1 + jf < len(program)
+
+
+def write_pcap(path, packets, nanos=False):
+    magic = 0xA1B23C4D if nanos else 0xA1B2C3D4
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", magic, 2, 4, 0, 0, 65535, 1))
+        for ts, frame in packets:
+            frac = 10**9 if nanos else 10**6
+            f.write(struct.pack("<IIII", int(ts), round(ts % 1 * frac), len(frame), len(frame)))
+            f.write(frame)
+
+
+def pcapng_block(block_type: int, body: bytes, endian: str = "<") -> bytes:
+    body += b"\x00" * (-len(body) % 4)
+    length = len(body) + 12
+    return struct.pack(endian + "II", block_type, length) + body + struct.pack(endian + "I", length)
+
+
+def write_pcapng(path, packets, tsresol=None, endian="<"):
+    options = b""
+    if tsresol is not None:
+        options = struct.pack(endian + "HH", 9, 1) + bytes([tsresol]) + b"\x00" * 3 + b"\x00" * 4
+    with open(path, "wb") as f:
+        f.write(pcapng_block(0x0A0D0D0A, struct.pack(endian + "IHHq", 0x1A2B3C4D, 1, 0, -1), endian))
+        f.write(pcapng_block(1, struct.pack(endian + "HHI", 1, 0, 65535) + options, endian))
+        units = 10 ** (tsresol if tsresol is not None else 6)
+        for ts, frame in packets:
+            stamp = round(ts * units)
+            body = struct.pack(endian + "IIIII", 0, stamp >> 32, stamp & 0xFFFFFFFF, len(frame), len(frame)) + frame
+            f.write(pcapng_block(6, body, endian))
+        f.write(pcapng_block(3, struct.pack(endian + "I", 0) + ETHERNET + ipv4_tcp(payload=b"simple"), endian))
+
+
+FRAMES = [(1700000000.25, ETHERNET + ipv4_tcp(seq=1, payload=b"a")), (1700000001.5, ETHERNET + ipv4_tcp(seq=2, payload=b"b"))]
+
+
+@pytest.mark.parametrize("nanos", [False, True])
+def test_pcap(tmp_path, nanos):
+    path = tmp_path / "capture.pcap"
+    write_pcap(path, FRAMES, nanos)
+    records = list(PcapFileBackend(str(path)).records())
+    assert [r.payload for r in records] == [b"a", b"b"]
+    assert records[1].timestamp == pytest.approx(1700000001.5)
+
+
+@pytest.mark.parametrize("tsresol, endian", [(None, "<"), (9, "<"), (None, ">")])
+def test_pcapng(tmp_path, tsresol, endian):
+    path = tmp_path / "capture.pcapng"
+    write_pcapng(path, FRAMES, tsresol, endian)
+    records = list(PcapFileBackend(str(path)).records())
+    assert [r.payload for r in records] == [b"a", b"b", b"simple"]
+    assert records[0].timestamp == pytest.approx(1700000000.25)
+    assert records[1].timestamp == pytest.approx(1700000001.5)
+
+
+def test_vlan_tagged_frames(tmp_path):
+    path = tmp_path / "vlan.pcap"
+    write_pcap(path, [(1.0, b"\x00" * 12 + b"\x81\x00\x00\x01\x08\x00" + ipv4_tcp(payload=b"tagged"))])
+    assert [r.payload for r in PcapFileBackend(str(path)).records()] == [b"tagged"]
+
+
+def test_not_a_capture(tmp_path):
+    path = tmp_path / "junk.bin"
+    path.write_bytes(b"nope" * 10)
+    with pytest.raises(ValueError):
+        list(PcapFileBackend(str(path)).records())
+
+
+def test_replay_stops_when_asked(tmp_path):
+    path = tmp_path / "capture.pcap"
+    write_pcap(path, FRAMES)
+    seen = []
+    PcapFileBackend(str(path)).run(seen.append, lambda: len(seen) >= 1)
+    assert len(seen) == 1
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from src.decoders import TYPED_COMMANDS, get_typed_decoders
+
+FRAMES = {
+    "addGoldExp": {"cmd": "addGoldExp", "id": 7, "typ": "m", "intGold": 120, "intExp": 900, "iRep": 250},
+    "dropItem": {
+        "cmd": "dropItem",
+        "items": {"101": {"ItemID": 101, "sName": "Bone Dust", "iQty": 2}, "102": {"iQty": 1}, "103": {"sName": "Orb"}},
+    },
+    "ct": {
+        "cmd": "ct",
+        "a": [
+            {"cmd": "aura+", "auras": [{"nam": "Eclipse", "isNew": True}, {"nam": "Old"}]},
+            {"cmd": "aura-", "aura": {"nam": "Eclipse"}},
+            {"cmd": "aura-"},
+        ],
+        "p": {"Player": {"intHP": 10}},
+    },
+    "stu": {"cmd": "stu", "sta": {"$STR": 10}},
+}
+
+
+def frame(obj):
+    return json.dumps({"t": "xt", "b": {"r": -1, "o": obj}}).encode()
+
+
+def test_only_msgspec_decodes_into_structs():
+    assert get_typed_decoders("orjson") == {}
+    assert get_typed_decoders("json") == {}
+
+
+@pytest.mark.parametrize("cmd", sorted(FRAMES))
+def test_typed_decoder_matches_the_dict_path(cmd):
+    pytest.importorskip("msgspec")
+    typed = get_typed_decoders("msgspec")
+    assert set(typed) == set(TYPED_COMMANDS)
+
+    message = typed[cmd](frame(FRAMES[cmd]))
+    expected = TYPED_COMMANDS[cmd](FRAMES[cmd])
+    if cmd == "ct":
+        assert message.aura_changes == expected.aura_changes
+        assert message.obj == FRAMES[cmd]
+    else:
+        assert message == expected
+
+
+def test_typed_decoder_rejects_unexpected_types():
+    msgspec = pytest.importorskip("msgspec")
+    typed = get_typed_decoders("msgspec")
+    with pytest.raises(msgspec.DecodeError):
+        typed["addGoldExp"](frame({"cmd": "addGoldExp", "intGold": "lots"}))
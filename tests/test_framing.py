@@ -0,0 +1,43 @@
+from src.framing import FrameExtractor
+
+
+def test_splits_on_nul():
+    framer = FrameExtractor()
+    assert framer.feed(b'{"a":1}\x00{"b":2}\x00') == [b'{"a":1}', b'{"b":2}']
+    assert len(framer) == 0
+
+
+def test_frame_split_across_segments():
+    framer = FrameExtractor()
+    assert framer.feed(b'{"a":') == []
+    assert framer.feed(b'1}\x00{"b"') == [b'{"a":1}']
+    assert framer.feed(b":2}\x00") == [b'{"b":2}']
+
+
+def test_empty_frames_are_skipped():
+    framer = FrameExtractor()
+    assert framer.feed(b"\x00\x00%xt%1%\x00") == [b"%xt%1%"]
+
+
+def test_brace_counting_until_a_terminator_is_seen():
+    framer = FrameExtractor()
+    assert framer.feed(b'junk{"a":{"b":1}}{"c":') == [b'{"a":{"b":1}}']
+    assert framer.feed(b"2}") == [b'{"c":2}']
+
+
+def test_braces_inside_strings_are_ignored():
+    framer = FrameExtractor()
+    assert framer.feed(b'{"a":"}{\\"}"}') == [b'{"a":"}{\\"}"}']
+
+
+def test_brace_state_survives_a_split_inside_a_string():
+    framer = FrameExtractor()
+    assert framer.feed(b'{"a":"x\\') == []
+    assert framer.feed(b'"}"}') == [b'{"a":"x\\"}"}']
+
+
+def test_overflow_drops_the_buffer():
+    framer = FrameExtractor(max_buffer_size=8)
+    assert framer.feed(b'{"a":"12345') == []
+    assert framer.dropped_bytes == 11
+    assert framer.feed(b"ok\x00") == [b"ok"]
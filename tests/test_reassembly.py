@@ -0,0 +1,109 @@
+from src.reassembly import SEQ_MOD, TCPStreamReassembler, seq_diff
+
+KEY = ("172.65.160.131", 5588, "192.168.1.20", 50000)
+
+
+def test_seq_diff_wraps():
+    assert seq_diff(5, SEQ_MOD - 5) == 10
+    assert seq_diff(SEQ_MOD - 5, 5) == -10
+    assert seq_diff(100, 100) == 0
+
+
+def test_in_order_delivery():
+    r = TCPStreamReassembler()
+    assert r.feed(KEY, 1000, b"abc") == b"abc"
+    assert r.feed(KEY, 1003, b"def") == b"def"
+
+
+def test_syn_starts_after_isn():
+    r = TCPStreamReassembler()
+    assert r.feed(KEY, 999, b"", syn=True) == b""
+    assert r.feed(KEY, 1000, b"abc") == b"abc"
+
+
+def test_out_of_order_is_held_until_the_hole_fills():
+    r = TCPStreamReassembler()
+    r.feed(KEY, 1000, b"aa")
+    assert r.feed(KEY, 1004, b"cc") == b""
+    assert r.feed(KEY, 1002, b"bb") == b"bbcc"
+    assert not r.flows[KEY].pending
+
+
+def test_sequence_wraparound():
+    r = TCPStreamReassembler()
+    start = SEQ_MOD - 2
+    assert r.feed(KEY, start, b"ab") == b"ab"
+    assert r.flows[KEY].next_seq == 0
+    assert r.feed(KEY, 2, b"ef") == b""
+    assert r.feed(KEY, 0, b"cd") == b"cdef"
+
+
+def test_duplicate_segment_is_dropped():
+    r = TCPStreamReassembler()
+    r.feed(KEY, 1000, b"abc")
+    assert r.feed(KEY, 1000, b"abc") == b""
+    assert r.duplicate_segments == 1
+
+
+def test_overlapping_retransmit_keeps_only_new_bytes():
+    r = TCPStreamReassembler()
+    r.feed(KEY, 1000, b"abcd")
+    assert r.feed(KEY, 1002, b"cdef") == b"ef"
+
+
+def test_overlapping_pending_segments():
+    r = TCPStreamReassembler()
+    r.feed(KEY, 1000, b"a")
+    r.feed(KEY, 1003, b"defg")
+    r.feed(KEY, 1005, b"fghi")
+    assert r.feed(KEY, 1001, b"bc") == b"bcdefghi"
+
+
+def test_gap_skipped_after_max_pending_segments():
+    r = TCPStreamReassembler(max_pending_segments=3)
+    r.feed(KEY, 0, b"x" * 10)
+    out = b"".join(r.feed(KEY, 20 + i * 10, b"y" * 10) for i in range(4))
+    assert out == b"y" * 40
+    assert r.skipped_bytes == 10
+    assert r.flows[KEY].gaps_skipped == 1
+
+
+def test_gap_skipped_after_max_pending_bytes():
+    r = TCPStreamReassembler(max_pending_bytes=15)
+    r.feed(KEY, 0, b"x" * 10)
+    assert r.feed(KEY, 20, b"y" * 10) == b""
+    assert r.feed(KEY, 30, b"z" * 10) == b"y" * 10 + b"z" * 10
+
+
+def test_gap_skipped_on_timeout_when_next_segment_arrives(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("src.reassembly.time.time", lambda: clock[0])
+    r = TCPStreamReassembler(gap_timeout=1.0)
+    r.feed(KEY, 0, b"x" * 10)
+    assert r.feed(KEY, 20, b"y") == b""
+    clock[0] += 2
+    assert r.feed(KEY, 21, b"z") == b"yz"
+
+
+def test_expire_releases_held_data_of_a_quiet_flow(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("src.reassembly.time.time", lambda: clock[0])
+    r = TCPStreamReassembler(gap_timeout=1.0)
+    r.feed(KEY, 0, b"x")
+    r.feed(KEY, 5, b"held")
+    assert r.expire(clock[0] + 0.5) == {}
+    assert r.expire(clock[0] + 1.5) == {KEY: b"held"}
+    assert r.flows[KEY].gap_since is None
+
+
+def test_expire_drops_idle_flows():
+    r = TCPStreamReassembler(flow_timeout=10)
+    r.feed(KEY, 0, b"x")
+    r.expire(r.flows[KEY].last_seen + 11)
+    assert KEY not in r.flows
+
+
+def test_fin_closes_the_flow():
+    r = TCPStreamReassembler()
+    assert r.feed(KEY, 0, b"bye", fin=True) == b"bye"
+    assert KEY not in r.flows
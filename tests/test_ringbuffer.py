@@ -0,0 +1,33 @@
+import pytest
+
+from src.ringbuffer import RingBuffer
+
+
+def test_oldest_entry_is_evicted():
+    buffer = RingBuffer(2, sizeof=len)
+    for item in (b"a", b"bb", b"ccc"):
+        buffer.append(item)
+    assert list(buffer) == [b"bb", b"ccc"]
+    assert buffer.usage() == {"items": 2, "capacity": 2, "bytes": 5, "peak_bytes": 5, "evicted": 1}
+
+
+def test_given_size_is_used_instead_of_sizeof():
+    buffer = RingBuffer(2)
+    buffer.append({"stats": {}}, 40)
+    buffer.append({"stats": {}}, 60)
+    buffer.append({"stats": {}}, 10)
+    assert buffer.nbytes == 70
+    assert buffer.peak_nbytes == 100
+
+
+def test_capacity_zero_keeps_nothing():
+    buffer = RingBuffer(0, sizeof=len)
+    buffer.append(b"abc")
+    assert len(buffer) == 0
+    assert buffer.usage()["bytes"] == 0
+    assert buffer.usage()["evicted"] == 1
+
+
+def test_negative_capacity_is_rejected():
+    with pytest.raises(ValueError):
+        RingBuffer(-1)
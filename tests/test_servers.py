@@ -0,0 +1,33 @@
+import json
+import threading
+
+from src.servers import ServerRegistry
+
+
+def registry(tmp_path, monkeypatch, resolve):
+    path = tmp_path / "servers.json"
+    path.write_text(json.dumps({"servers": [{"sName": "Test", "sIP": "test.example", "iPort": 5588}]}))
+    monkeypatch.setattr(ServerRegistry, "_resolve", staticmethod(resolve))
+    return ServerRegistry(str(path), str(tmp_path / "cache.json"), resolve_timeout=0.05)
+
+
+def test_wait_returns_once_resolved(tmp_path, monkeypatch):
+    servers = registry(tmp_path, monkeypatch, lambda host: "10.0.0.1")
+    assert servers.wait()
+    assert servers.addresses("Test") == ["10.0.0.1"]
+    assert json.loads((tmp_path / "cache.json").read_text())["test.example"]["ip"] == "10.0.0.1"
+
+
+def test_wait_gives_up_after_the_timeout(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def slow(host):
+        release.wait(5)
+        return "10.0.0.2"
+
+    servers = registry(tmp_path, monkeypatch, slow)
+    assert not servers.wait()
+    assert servers.addresses("Test") == []
+    release.set()
+    assert servers.wait(5)
+    assert servers.addresses("Test") == ["10.0.0.2"]
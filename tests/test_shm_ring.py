@@ -0,0 +1,80 @@
+import pytest
+
+from src.shm_ring import SharedRing, max_record
+
+
+@pytest.fixture
+def ring():
+    ring = SharedRing(capacity=64)
+    yield ring
+    ring.close()
+
+
+def test_records_come_back_in_order(ring):
+    assert ring.write(b"one")
+    assert ring.write(b"two")
+    assert ring.read(10) == [b"one", b"two"]
+    assert ring.read(10) == []
+    assert ring.used() == 0
+
+
+def test_read_limit(ring):
+    for i in range(3):
+        ring.write(bytes([i]))
+    assert ring.read(2) == [b"\x00", b"\x01"]
+    assert ring.read(2) == [b"\x02"]
+
+
+def test_full_ring_refuses_writes(ring):
+    while ring.write(b"x" * 10):
+        pass
+    assert ring.read(1) == [b"x" * 10]
+    assert ring.write(b"x" * 10)
+
+
+def test_wraps_around_the_end(ring):
+    seen = []
+    for i in range(40):
+        record = bytes([i]) * (5 + i % 7)
+        assert ring.write(record)
+        seen.extend(ring.read(10))
+        assert seen[-1] == record
+    assert len(seen) == 40
+
+
+def test_wrap_with_less_than_a_length_left():
+    ring = SharedRing(capacity=32)
+    try:
+        # 14 + 16 bytes leave 2 before the end, too few for a length or a wrap marker
+        assert ring.write(b"x" * 10)
+        assert ring.write(b"x" * 12)
+        assert ring.read(2) == [b"x" * 10, b"x" * 12]
+        assert ring.write(b"yy")
+        assert ring.read(1) == [b"yy"]
+    finally:
+        ring.close()
+
+
+def test_max_record_always_fits_once_drained(ring):
+    for pos in range(ring.capacity):
+        ring.write(b"z" * (pos % 9))
+        ring.read(10)
+        assert ring.write(b"m" * ring.max_record)
+        assert ring.read(1) == [b"m" * ring.max_record]
+
+
+def test_oversized_record_raises(ring):
+    assert ring.max_record == max_record(64)
+    with pytest.raises(ValueError):
+        ring.write(b"x" * (ring.max_record + 1))
+
+
+def test_second_handle_shares_the_ring(ring):
+    other = SharedRing(ring.name)
+    try:
+        other.write(b"from child")
+        other.add("packets", 3)
+        assert ring.read(1) == [b"from child"]
+        assert ring.counters()["packets"] == 3
+    finally:
+        other.close()